@@ -1,4 +1,4 @@
-// Copyright (c) 2019, NVIDIA CORPORATION. All rights reserved.
+// Copyright (c) 2019-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -43,7 +43,7 @@ The function should not modify input tensors.
 .. warning::
   Currently, this operator can be used only in pipelines with the
   ``exec_async=False`` and ``exec_pipelined=False`` values specified and should only be
-  used for prototyping and debugging.
+  used for prototyping and debugging, unless it is run with ``parallel=True``.
 
 .. warning::
   This operator is not compatible with TensorFlow integration.
@@ -57,7 +57,19 @@ The function should not modify input tensors.
 once per batch or separately for every sample in the batch.
 
 If set to True, the function will receive its arguments as lists of NumPy or CuPy arrays,
-for CPU and GPU backend, respectively.)code", false);
+for CPU and GPU backend, respectively.)code", false)
+        .AddOptionalArg("parallel", R"code(Runs the function in the Python workers of the pipeline.
+
+The function is run by a pool of ``py_num_workers`` processes (or threads, if the pipeline's
+``py_start_method`` is ``"thread"``), started along with the workers of the parallel external
+sources, so it can be used in pipelines with asynchronous and pipelined execution.
+The inputs are passed to the workers and the outputs are passed back through the shared memory.
+If ``batch_processing`` is False, the batch is split between the workers, otherwise the whole
+batch is processed by a single worker.
+
+Only CPU operators with at least one input and one output can be run in parallel. With the ``spawn``
+start method, the function must be picklable with the pipeline's ``py_callback_pickler``.)code",
+          false);
 
 DALI_SCHEMA(TorchPythonFunction)
         .DocStr(R"code(Executes a function that is operating on Torch tensors.
@@ -0,0 +1,148 @@
+// Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//     http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+#include "dali/operators/reader/loader/binary_index.h"
+#include <errno.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <cstring>
+#include <fstream>
+#include "dali/core/error_handling.h"
+
+namespace dali {
+
+namespace {
+
+constexpr char kMagic[8] = {'D', 'A', 'L', 'I', '_', 'I', 'D', 'X'};
+constexpr uint32_t kVersion = 1;
+constexpr size_t kHeaderSize = sizeof(kMagic) + 2 * sizeof(uint32_t) + sizeof(uint64_t);
+
+/**
+ * @brief Reads the consecutive fields of the mapped file, checking that they fit in it
+ */
+class MappedFileReader {
+ public:
+  MappedFileReader(const uint8_t *data, size_t size, const std::string &path)
+      : data_(data), size_(size), path_(path) {}
+
+  template <typename T>
+  T Read() {
+    T value;
+    std::memcpy(&value, Get(sizeof(T)), sizeof(T));
+    return value;
+  }
+
+  void Skip(size_t n) {
+    Get(n);
+  }
+
+  span<const uint64_t> ReadArray(uint64_t count) {
+    DALI_ENFORCE(count <= (size_ - pos_) / sizeof(uint64_t),
+                 make_string("Binary index file \"", path_, "\" is truncated"));
+    return make_cspan(reinterpret_cast<const uint64_t *>(Get(count * sizeof(uint64_t))), count);
+  }
+
+  span<const char> ReadRemaining() {
+    size_t count = size_ - pos_;
+    return make_cspan(reinterpret_cast<const char *>(Get(count)), count);
+  }
+
+ private:
+  const uint8_t *Get(size_t n) {
+    DALI_ENFORCE(n <= size_ - pos_,
+                 make_string("Binary index file \"", path_, "\" is truncated"));
+    const uint8_t *ptr = data_ + pos_;
+    pos_ += n;
+    return ptr;
+  }
+
+  const uint8_t *data_;
+  size_t size_;
+  size_t pos_ = 0;
+  const std::string &path_;
+};
+
+}  // namespace
+
+bool BinaryIndex::IsBinaryIndex(const std::string &path) {
+  std::ifstream file(path, std::ios::binary);
+  char magic[sizeof(kMagic)];
+  return file.read(magic, sizeof(magic)) && std::memcmp(magic, kMagic, sizeof(kMagic)) == 0;
+}
+
+BinaryIndex::BinaryIndex(const std::string &path) {
+  int fd = open(path.c_str(), O_RDONLY);
+  DALI_ENFORCE(fd >= 0, make_string("Failed to open file ", path, ": ", std::strerror(errno)));
+  struct stat s;
+  if (fstat(fd, &s) < 0) {
+    close(fd);
+    DALI_FAIL(make_string("Failed to read the size of file ", path, ": ", std::strerror(errno)));
+  }
+  size_t size = s.st_size;
+  if (size < kHeaderSize) {
+    close(fd);
+    DALI_FAIL(make_string("Binary index file \"", path, "\" is truncated"));
+  }
+  // the mapping is shared, so that the pages are reused by the readers of the same file
+  void *p = mmap(nullptr, size, PROT_READ, MAP_SHARED, fd, 0);
+  close(fd);
+  DALI_ENFORCE(p != MAP_FAILED,
+               make_string("Failed to map file ", path, ": ", std::strerror(errno)));
+  mapping_ = std::shared_ptr<const uint8_t>(static_cast<const uint8_t *>(p),
+                                            [size](const uint8_t *p) {
+                                              munmap(const_cast<uint8_t *>(p), size);
+                                            });
+
+  MappedFileReader reader(mapping_.get(), size, path);
+  reader.Skip(sizeof(kMagic));
+  auto version = reader.Read<uint32_t>();
+  DALI_ENFORCE(version == kVersion,
+               make_string("Unsupported version of the binary index file \"", path, "\" (",
+                           version, ")."));
+  flags_ = reader.Read<uint32_t>();
+  DALI_ENFORCE((flags_ & ~(kPerFileRecords | kSampleComponents)) == 0,
+               make_string("Unsupported flags of the binary index file \"", path, "\" (", flags_,
+                           ")."));
+  num_records_ = reader.Read<uint64_t>();
+  if (flags_ & kPerFileRecords) {
+    file_num_records_ = reader.ReadArray(reader.Read<uint64_t>());
+    uint64_t total = 0;
+    for (auto n : file_num_records_)
+      total += n;
+    DALI_ENFORCE(total == num_records_,
+                 make_string("Malformed binary index file \"", path, "\" - the numbers of the ",
+                             "records of the files don't sum up to the number of the records"));
+  }
+  size_t num_entries = num_records_;
+  if (flags_ & kSampleComponents) {
+    num_entries = reader.Read<uint64_t>();
+    sample_num_components_ = reader.ReadArray(num_records_);
+    uint64_t total = 0;
+    for (auto n : sample_num_components_)
+      total += n;
+    DALI_ENFORCE(total == num_entries,
+                 make_string("Malformed binary index file \"", path, "\" - the numbers of the ",
+                             "components of the samples don't sum up to the number of the ",
+                             "components"));
+  }
+  offsets_ = reader.ReadArray(num_entries);
+  sizes_ = reader.ReadArray(num_entries);
+  if (flags_ & kSampleComponents) {
+    names_ = reader.ReadRemaining();
+  }
+}
+
+}  // namespace dali
@@ -0,0 +1,108 @@
+// Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//     http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+#ifndef DALI_OPERATORS_READER_LOADER_BINARY_INDEX_H_
+#define DALI_OPERATORS_READER_LOADER_BINARY_INDEX_H_
+
+#include <cstdint>
+#include <memory>
+#include <string>
+
+#include "dali/core/api_helper.h"
+#include "dali/core/span.h"
+
+namespace dali {
+
+/**
+ * @brief Binary index of the records in the data files, mapped into the memory.
+ *
+ * The index is used directly from the mapping, so opening it doesn't depend on the number
+ * of the records and the mapped pages are shared, through the page cache, by all the readers
+ * using the same index file. The layout of the file (little endian) is:
+ *
+ *     char   magic[8] = "DALI_IDX"
+ *     uint32 version = 1
+ *     uint32 flags
+ *     uint64 num_records
+ *     // if flags & kPerFileRecords
+ *     uint64 num_files
+ *     uint64 file_num_records[num_files]
+ *     // if flags & kSampleComponents
+ *     uint64 num_components
+ *     uint64 sample_num_components[num_records]
+ *     // n = num_components if flags & kSampleComponents, num_records otherwise
+ *     uint64 offsets[n]
+ *     uint64 sizes[n]
+ *     // if flags & kSampleComponents, the NUL terminated extension and file name of the components
+ *     char   names[]
+ *
+ * Without any flags, the file describes the records of a single data file, as written by
+ * `tools/tfrecord2idx`. The files can be converted from the text indices with `tools/idx2bin.py`.
+ */
+class DLL_PUBLIC BinaryIndex {
+ public:
+  /// The records are split between consecutive data files
+  static constexpr uint32_t kPerFileRecords = 1;
+  /// Every record (sample) consists of a number of components, as in webdataset
+  static constexpr uint32_t kSampleComponents = 2;
+
+  /**
+   * @brief Checks if the file starts with the binary index signature.
+   */
+  static bool IsBinaryIndex(const std::string &path);
+
+  explicit BinaryIndex(const std::string &path);
+
+  uint32_t flags() const {
+    return flags_;
+  }
+
+  size_t num_records() const {
+    return num_records_;
+  }
+
+  span<const uint64_t> file_num_records() const {
+    return file_num_records_;
+  }
+
+  span<const uint64_t> sample_num_components() const {
+    return sample_num_components_;
+  }
+
+  span<const uint64_t> offsets() const {
+    return offsets_;
+  }
+
+  span<const uint64_t> sizes() const {
+    return sizes_;
+  }
+
+  span<const char> names() const {
+    return names_;
+  }
+
+ private:
+  std::shared_ptr<const uint8_t> mapping_;
+  uint32_t flags_ = 0;
+  size_t num_records_ = 0;
+  span<const uint64_t> file_num_records_;
+  span<const uint64_t> sample_num_components_;
+  span<const uint64_t> offsets_;
+  span<const uint64_t> sizes_;
+  span<const char> names_;
+};
+
+}  // namespace dali
+
+#endif  // DALI_OPERATORS_READER_LOADER_BINARY_INDEX_H_
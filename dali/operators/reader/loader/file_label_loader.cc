@@ -12,7 +12,10 @@
 // See the License for the specific language governing permissions and
 // limitations under the License.
 
+#include <functional>
 #include <memory>
+#include <string>
+#include <utility>
 
 #include "dali/core/common.h"
 #include "dali/operators/reader/loader/file_label_loader.h"
@@ -48,29 +51,61 @@ void FileLabelLoader::ReadSample(ImageLabelWrapper &image_label) {
     return;
   }
 
-  auto current_image = FileStream::Open(filesystem::join_path(file_root_, image_pair.first),
+  ReadImage(image_label.image, image_pair.first);
+  image_label.image.SetMeta(meta);
+}
+
+std::function<void(int)> FileLabelLoader::PrepareReadSample(ImageLabelWrapper &image_label) {
+  auto image_pair = image_label_pairs_[current_index_++];
+
+  // handle wrap-around
+  MoveToNextShard(current_index_);
+
+  // copy the label
+  image_label.label = image_pair.second;
+  DALIMeta meta;
+  meta.SetSourceInfo(image_pair.first);
+  meta.SetSkipSample(false);
+
+  // if image is cached, skip loading
+  if (ShouldSkipImage(image_pair.first)) {
+    meta.SetSkipSample(true);
+    image_label.image.Reset();
+    image_label.image.SetMeta(meta);
+    image_label.image.Resize({0}, DALI_UINT8);
+    return {};
+  }
+
+  // the files are opened and read by the I/O threads, the name is copied as the list
+  // of the files can be reshuffled when the reader moves to the next epoch
+  return [this, &image_label, image_name = std::move(image_pair.first), meta](int) {
+    ReadImage(image_label.image, image_name);
+    image_label.image.SetMeta(meta);
+  };
+}
+
+void FileLabelLoader::ReadImage(Tensor<CPUBackend> &image, const std::string &image_name) {
+  auto current_image = FileStream::Open(filesystem::join_path(file_root_, image_name),
                                         read_ahead_, !copy_read_data_);
   Index image_size = current_image->Size();
 
   if (copy_read_data_) {
-    if (image_label.image.shares_data()) {
-      image_label.image.Reset();
+    if (image.shares_data()) {
+      image.Reset();
     }
-    image_label.image.Resize({image_size}, DALI_UINT8);
+    image.Resize({image_size}, DALI_UINT8);
     // copy the image
-    Index ret = current_image->Read(image_label.image.mutable_data<uint8_t>(), image_size);
-    DALI_ENFORCE(ret == image_size, make_string("Failed to read file: ", image_pair.first));
+    Index ret = current_image->Read(image.mutable_data<uint8_t>(), image_size);
+    DALI_ENFORCE(ret == image_size, make_string("Failed to read file: ", image_name));
   } else {
     auto p = current_image->Get(image_size);
-    DALI_ENFORCE(p != nullptr, make_string("Failed to read file: ", image_pair.first));
+    DALI_ENFORCE(p != nullptr, make_string("Failed to read file: ", image_name));
     // Wrap the raw data in the Tensor object.
-    image_label.image.ShareData(p, image_size, false, {image_size}, DALI_UINT8);
+    image.ShareData(p, image_size, false, {image_size}, DALI_UINT8);
   }
 
   // close the file handle
   current_image->Close();
-
-  image_label.image.SetMeta(meta);
 }
 
 Index FileLabelLoader::SizeImpl() {
@@ -1,4 +1,4 @@
-// Copyright (c) 2017-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -20,6 +20,7 @@
 #include <errno.h>
 
 #include <fstream>
+#include <functional>
 #include <string>
 #include <tuple>
 #include <utility>
@@ -127,6 +128,10 @@ class DLL_PUBLIC FileLabelLoader : public Loader<CPUBackend, ImageLabelWrapper>
  protected:
   Index SizeImpl() override;
 
+  std::function<void(int)> PrepareReadSample(ImageLabelWrapper &tensor) override;
+
+  void ReadImage(Tensor<CPUBackend> &image, const std::string &image_name);
+
   void PrepareMetadataImpl() override {
     if (image_label_pairs_.empty()) {
       if (!has_file_list_arg_ && !has_files_arg_) {
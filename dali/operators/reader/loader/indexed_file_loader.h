@@ -15,14 +15,19 @@
 #ifndef DALI_OPERATORS_READER_LOADER_INDEXED_FILE_LOADER_H_
 #define DALI_OPERATORS_READER_LOADER_INDEXED_FILE_LOADER_H_
 
+#include <algorithm>
 #include <vector>
 #include <string>
 #include <tuple>
 #include <fstream>
+#include <functional>
 #include <memory>
+#include <utility>
 
 #include "dali/core/common.h"
+#include "dali/operators/reader/loader/binary_index.h"
 #include "dali/operators/reader/loader/loader.h"
+#include "dali/operators/reader/loader/permutation.h"
 #include "dali/util/file.h"
 
 namespace dali {
@@ -33,26 +38,61 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
     : Loader(options),
       uris_(options.GetRepeatedArgument<std::string>("path")),
       index_uris_(options.GetRepeatedArgument<std::string>("index_path")),
-      current_index_(0), current_file_index_(0), current_file_(nullptr) {
+      current_index_(0), current_file_index_(0), current_file_(nullptr),
+      max_coalesced_read_size_(options.GetArgument<int>("max_coalesced_read_size")),
+      shuffle_after_epoch_(options.GetArgument<bool>("shuffle_after_epoch")),
+      shuffle_chunk_size_(options.GetArgument<int>("shuffle_chunk_size")) {
+    DALI_ENFORCE(max_coalesced_read_size_ >= 0,
+                 "max_coalesced_read_size needs to be non-negative");
+    DALI_ENFORCE(shuffle_chunk_size_ >= 0, "shuffle_chunk_size needs to be non-negative");
+    /*
+     * The same as in the FileLoader, `shuffle_after_epoch` makes every shard look differently
+     * after each epoch, so it implies `stick_to_shard`, while being exclusive with it
+     */
+    DALI_ENFORCE(!(shuffle_after_epoch_ && stick_to_shard_),
+                 "shuffle_after_epoch and stick_to_shard cannot be both true");
+    DALI_ENFORCE(!(shuffle_after_epoch_ && shuffle_),
+                 "shuffle_after_epoch and random_shuffle cannot be both true");
+    DALI_ENFORCE(!(shuffle_after_epoch_ && shuffle_chunk_size_ > 0),
+                 "shuffle_after_epoch and shuffle_chunk_size cannot be used together");
+    // the chunks are shuffled the same way, random_shuffle additionally mixes the chunks read
+    DALI_ENFORCE(!(shuffle_chunk_size_ > 0 && stick_to_shard_),
+                 "shuffle_chunk_size and stick_to_shard cannot be used together");
+    if (shuffle_after_epoch_) {
+      // the whole dataset is shuffled, record by record
+      shuffle_chunk_size_ = 1;
     }
+    if (shuffle_chunk_size_ > 0) {
+      stick_to_shard_ = true;
+    }
+  }
 
   void ReadSample(Tensor<CPUBackend>& tensor) override {
+    if (copy_read_data_) {
+      // the same as a concurrent read, done in place
+      auto read = PrepareReadSample(tensor);
+      if (read) {
+        read(0);
+      }
+      return;
+    }
     MoveToNextShard(current_index_);
 
     int64 seek_pos, size;
     size_t file_index;
-    std::tie(seek_pos, size, file_index) = indices_[current_index_];
-    ++current_index_;
+    std::tie(seek_pos, size, file_index) = NextIndexEntry();
 
     std::string image_key = uris_[file_index] + " at index " + to_string(seek_pos);
     DALIMeta meta;
     meta.SetSourceInfo(image_key);
     meta.SetSkipSample(false);
 
+    // the shuffled records don't follow each other, they may be in any of the files
     if (file_index != current_file_index_) {
       current_file_->Close();
       current_file_ = FileStream::Open(uris_[file_index], read_ahead_, !copy_read_data_);
       current_file_index_ = file_index;
+      should_seek_ = true;
     }
 
     // if image is cached, skip loading
@@ -71,21 +111,10 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
     }
     next_seek_pos_ = seek_pos + size;
 
-    if (!copy_read_data_) {
-      auto p = current_file_->Get(size);
-      DALI_ENFORCE(p != nullptr, "Error reading from a file " + uris_[current_file_index_]);
-      // Wrap the raw data in the Tensor object.
-      tensor.ShareData(p, size, false, {size}, DALI_UINT8);
-    } else {
-      if (tensor.shares_data()) {
-        tensor.Reset();
-      }
-      tensor.Resize({size}, DALI_UINT8);
-
-      int64 n_read = current_file_->Read(reinterpret_cast<uint8_t*>(tensor.raw_mutable_data()),
-                          size);
-      DALI_ENFORCE(n_read == size, "Error reading from a file " + uris_[current_file_index_]);
-    }
+    auto p = current_file_->Get(size);
+    DALI_ENFORCE(p != nullptr, "Error reading from a file " + uris_[current_file_index_]);
+    // Wrap the raw data in the Tensor object.
+    tensor.ShareData(p, size, false, {size}, DALI_UINT8);
 
     tensor.SetMeta(meta);
     return;
@@ -95,12 +124,33 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
     if (current_file_ != nullptr) {
       current_file_->Close();
     }
+    for (auto &file : io_thread_files_) {
+      if (file.stream != nullptr) {
+        file.stream->Close();
+      }
+    }
   }
 
   virtual void ReadIndexFile(const std::vector<std::string>& index_uris) {
     DALI_ENFORCE(index_uris.size() == uris_.size(),
         "Number of index files needs to match the number of data files");
+    // the binary indices are used directly, unless they are mixed with the text ones
+    bool all_binary = std::all_of(index_uris.begin(), index_uris.end(),
+                                  BinaryIndex::IsBinaryIndex);
     for (size_t i = 0; i < index_uris.size(); ++i) {
+      if (BinaryIndex::IsBinaryIndex(index_uris[i])) {
+        BinaryIndex index(index_uris[i]);
+        DALI_ENFORCE(index.flags() == 0, make_string("Binary index file \"", index_uris[i],
+                     "\" should describe the records of a single data file"));
+        if (all_binary) {
+          AddMappedIndex(std::move(index), i);
+        } else {
+          for (size_t j = 0; j < index.num_records(); ++j) {
+            indices_.emplace_back(index.offsets()[j], index.sizes()[j], i);
+          }
+        }
+        continue;
+      }
       std::ifstream fin(index_uris[i]);
       DALI_ENFORCE(fin.good(), "Failed to open file " + index_uris[i]);
       int64 pos, size;
@@ -113,7 +163,202 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
 
  protected:
   Index SizeImpl() override {
-    return indices_.size();
+    return NumRecords();
+  }
+
+  size_t NumRecords() const {
+    return mapped_records_.empty() ? indices_.size() : mapped_records_end_.back();
+  }
+
+  /**
+   * @brief Returns the record read at the position `index` of the current epoch.
+   *
+   * With `shuffle_after_epoch` or `shuffle_chunk_size`, the records (or the chunks of the records)
+   * are visited in the order of a lazily computed permutation of the whole dataset, which is
+   * the same in all the shards and changes with every epoch. It doesn't need any memory nor
+   * the shuffling buffer.
+   */
+  size_t RecordIndex(size_t index) const {
+    return shuffle_chunk_size_ > 0 ? order_(index) : index;
+  }
+
+  /**
+   * @brief Returns the entry of the record at the current position and advances to the next one.
+   */
+  std::tuple<int64, int64, size_t> NextIndexEntry() {
+    size_t record = RecordIndex(current_index_);
+    TrackReadOrder(current_index_, record);
+    ++current_index_;
+    return IndexEntry(record);
+  }
+
+  /**
+   * @brief Returns the (offset, size, file index) of the record `index`.
+   */
+  std::tuple<int64, int64, size_t> IndexEntry(size_t index) const {
+    if (mapped_records_.empty()) {
+      return indices_[index];
+    }
+    size_t i = std::upper_bound(mapped_records_end_.begin(), mapped_records_end_.end(), index) -
+               mapped_records_end_.begin();
+    const auto &records = mapped_records_[i];
+    size_t record = index - (i > 0 ? mapped_records_end_[i - 1] : 0);
+    return std::tuple<int64, int64, size_t>(records.offsets[record], records.sizes[record],
+                                            records.file_index);
+  }
+
+  /**
+   * @brief Uses the records of the binary index directly from its mapping.
+   *
+   * The records of the index (or of its first file, if the index describes many of them)
+   * belong to the data file `file_index`.
+   */
+  void AddMappedIndex(BinaryIndex index, size_t file_index) {
+    DALI_ENFORCE(!(index.flags() & BinaryIndex::kSampleComponents),
+                 "Binary index files with the sample components are not supported by this reader");
+    auto offsets = index.offsets();
+    auto sizes = index.sizes();
+    std::vector<uint64_t> num_records = {index.num_records()};
+    if (index.flags() & BinaryIndex::kPerFileRecords) {
+      num_records.assign(index.file_num_records().begin(), index.file_num_records().end());
+    }
+    DALI_ENFORCE(file_index + num_records.size() <= uris_.size(),
+                 "Binary index file describes more data files than provided");
+    size_t begin = 0;
+    for (auto n : num_records) {
+      if (n > 0) {
+        size_t end = (mapped_records_end_.empty() ? 0 : mapped_records_end_.back()) + n;
+        mapped_records_.push_back({make_cspan(offsets.data() + begin, n),
+                                   make_cspan(sizes.data() + begin, n), file_index});
+        mapped_records_end_.push_back(end);
+      }
+      begin += n;
+      ++file_index;
+    }
+    mapped_indices_.push_back(std::move(index));
+  }
+
+  std::function<void(int)> PrepareReadSample(Tensor<CPUBackend>& tensor) override {
+    // the mapped data is shared without a copy, there is nothing to read concurrently
+    if (!copy_read_data_) {
+      ReadSample(tensor);
+      return {};
+    }
+    MoveToNextShard(current_index_);
+
+    int64 seek_pos, size;
+    size_t file_index;
+    std::tie(seek_pos, size, file_index) = NextIndexEntry();
+
+    std::string image_key = uris_[file_index] + " at index " + to_string(seek_pos);
+    DALIMeta meta;
+    meta.SetSourceInfo(image_key);
+    meta.SetSkipSample(false);
+
+    // if image is cached, skip loading
+    if (ShouldSkipImage(image_key)) {
+      meta.SetSkipSample(true);
+      tensor.Reset();
+      tensor.SetMeta(meta);
+      tensor.Resize({0}, DALI_UINT8);
+      return {};
+    }
+
+    // the record was read with the preceding ones, its data is shared without a copy
+    if (coalesced_read_ && file_index == coalesced_file_index_ &&
+        seek_pos >= coalesced_begin_ && seek_pos + size <= coalesced_end_) {
+      auto *data = coalesced_read_.get() + (seek_pos - coalesced_begin_);
+      tensor.ShareData(std::shared_ptr<void>(coalesced_read_, data), size, false, {size},
+                       DALI_UINT8);
+      tensor.SetMeta(meta);
+      return {};
+    }
+
+    int64 read_end = CoalescedReadEnd(current_index_ - 1);
+    if (read_end > seek_pos + size) {
+      // read the following records adjacent in the file at once, they share the buffer
+      int64 read_size = read_end - seek_pos;
+      coalesced_read_ = std::shared_ptr<uint8_t>(new uint8_t[read_size],
+                                                 std::default_delete<uint8_t[]>());
+      coalesced_file_index_ = file_index;
+      coalesced_begin_ = seek_pos;
+      coalesced_end_ = read_end;
+      tensor.ShareData(std::shared_ptr<void>(coalesced_read_, coalesced_read_.get()), size, false,
+                       {size}, DALI_UINT8);
+      tensor.SetMeta(meta);
+      return [this, buffer = coalesced_read_, file_index, seek_pos, read_size](int thread_idx) {
+        ReadRecord(thread_idx, file_index, seek_pos, buffer.get(), read_size);
+      };
+    }
+
+    if (tensor.shares_data()) {
+      tensor.Reset();
+    }
+    tensor.Resize({size}, DALI_UINT8);
+    tensor.SetMeta(meta);
+    uint8_t *data = tensor.mutable_data<uint8_t>();
+    return [this, data, file_index, seek_pos, size](int thread_idx) {
+      ReadRecord(thread_idx, file_index, seek_pos, data, size);
+    };
+  }
+
+  /**
+   * @brief Returns the end of the run of the records adjacent in the file, starting with
+   *        the record `index`, that fits in `max_coalesced_read_size_` bytes.
+   *
+   * The run doesn't go past the records read before moving to the next shard (or epoch).
+   */
+  int64 CoalescedReadEnd(size_t index) {
+    int64 begin, size;
+    size_t file_index;
+    std::tie(begin, size, file_index) = IndexEntry(RecordIndex(index));
+    int64 end = begin + size;
+    size_t shard_end = NumRecords();
+    if (stick_to_shard_ && shard_id_ + 1 < num_shards_) {
+      shard_end = start_index(shard_id_ + 1, num_shards_, shard_end);
+    }
+    for (size_t next = index + 1; next < shard_end; ++next) {
+      int64 next_pos, next_size;
+      size_t next_file_index;
+      std::tie(next_pos, next_size, next_file_index) = IndexEntry(RecordIndex(next));
+      if (next_file_index != file_index || next_pos != end ||
+          end + next_size - begin > max_coalesced_read_size_) {
+        break;
+      }
+      end += next_size;
+    }
+    return end;
+  }
+
+  /**
+   * @brief Reads the record of `size` bytes at `seek_pos` in the file `file_index`
+   *        using the files opened by the I/O thread `thread_idx`.
+   *
+   * If `records_span_files_` is set, a record that doesn't fit in the file is continued
+   * from the beginning of the next one.
+   */
+  void ReadRecord(int thread_idx, size_t file_index, int64 seek_pos, uint8_t *data, int64 size) {
+    auto &file = io_thread_files_[thread_idx];
+    int64 n_read = 0;
+    while (n_read < size) {
+      if (file.stream == nullptr || file.index != file_index) {
+        file.stream = FileStream::Open(uris_[file_index], read_ahead_, false);
+        file.index = file_index;
+        file.next_seek_pos = 0;
+      }
+      if (file.next_seek_pos != seek_pos) {
+        file.stream->Seek(seek_pos);
+      }
+      int64 n = file.stream->Read(data + n_read, size - n_read);
+      n_read += n;
+      file.next_seek_pos = seek_pos + n;
+      if (n_read < size) {
+        DALI_ENFORCE(records_span_files_ && file_index + 1 < uris_.size(),
+                     "Error reading from a file " + uris_[file_index]);
+        ++file_index;
+        seek_pos = 0;
+      }
+    }
   }
 
   void PrepareMetadataImpl() override {
@@ -122,10 +367,11 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
                                   static_cast<unsigned int>(initial_buffer_fill_));
     }
     copy_read_data_ = dont_use_mmap_ || !mmap_reserver_.CanShareMappedData();
+    io_thread_files_.resize(NumIOThreads());
 
     DALI_ENFORCE(!uris_.empty(), "No files specified.");
     ReadIndexFile(index_uris_);
-    DALI_ENFORCE(!indices_.empty(), "Content of index files should not be empty");
+    DALI_ENFORCE(NumRecords() > 0, "Content of index files should not be empty");
     current_file_index_ = INVALID_INDEX;
     Reset(true);
   }
@@ -138,7 +384,12 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
     } else {
       current_index_ = 0;
     }
-    std::tie(seek_pos, size, file_index) = indices_[current_index_];
+    current_epoch_++;
+    if (shuffle_chunk_size_ > 0) {
+      order_ = ChunkShuffledOrder(NumRecords(), shuffle_chunk_size_,
+                                  kDaliDataloaderSeed + current_epoch_);
+    }
+    std::tie(seek_pos, size, file_index) = IndexEntry(RecordIndex(current_index_));
     if (file_index != current_file_index_) {
       if (current_file_index_ != static_cast<size_t>(INVALID_INDEX)) {
         current_file_->Close();
@@ -151,7 +402,17 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
 
   std::vector<std::string> uris_;
   std::vector<std::string> index_uris_;
+  // the records of the text index files, see IndexEntry
   std::vector<std::tuple<int64, int64, size_t>> indices_;
+  // the records of the binary index files, used directly from their mappings
+  struct MappedRecords {
+    span<const uint64_t> offsets, sizes;
+    size_t file_index;
+  };
+  std::vector<BinaryIndex> mapped_indices_;
+  std::vector<MappedRecords> mapped_records_;
+  // the cumulative number of the records, for the lookup of the MappedRecords of a record
+  std::vector<size_t> mapped_records_end_;
   size_t current_index_;
   size_t current_file_index_;
   std::unique_ptr<FileStream> current_file_;
@@ -159,6 +420,29 @@ class IndexedFileLoader : public Loader<CPUBackend, Tensor<CPUBackend>> {
   static constexpr int INVALID_INDEX = -1;
   bool should_seek_ = false;
   int64 next_seek_pos_ = 0;
+  // whether a record can continue in the next file
+  bool records_span_files_ = false;
+
+  // the adjacent records read at once are kept in a shared buffer, see CoalescedReadEnd
+  int max_coalesced_read_size_;
+  std::shared_ptr<uint8_t> coalesced_read_;
+  size_t coalesced_file_index_ = 0;
+  int64 coalesced_begin_ = 0;
+  int64 coalesced_end_ = 0;
+
+  // the records are visited in a different random order in each epoch, see RecordIndex
+  bool shuffle_after_epoch_;
+  int shuffle_chunk_size_;
+  int current_epoch_ = 0;
+  ChunkShuffledOrder order_;
+
+  // the file currently read by each of the I/O threads
+  struct IOThreadFile {
+    size_t index = 0;
+    int64 next_seek_pos = 0;
+    std::unique_ptr<FileStream> stream;
+  };
+  std::vector<IOThreadFile> io_thread_files_;
 };
 
 }  // namespace dali
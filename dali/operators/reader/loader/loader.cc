@@ -1,4 +1,4 @@
-// Copyright (c) 2017-2018, NVIDIA CORPORATION. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -71,7 +71,56 @@ the file in memory.
 
 Mapping provides a small performance benefit when accessing a local file system, but most network file
 systems, do not provide optimum performance.
-)code", false);
+)code", false)
+  .AddOptionalArg("num_io_threads",
+      R"code(Number of threads that read the samples concurrently.
+
+A single thread reading one sample at a time cannot saturate storage with high latency or high
+internal parallelism, such as network file systems or NVMe arrays. The order of the samples and
+the sharding do not depend on this value.
+
+The file reader (``fn.readers.file``) reads the files concurrently. The TFRecord, RecordIO
+(``fn.readers.mxnet``) and webdataset readers read the records concurrently when they use plain
+file I/O instead of memory mapping (see ``dont_use_mmap``). The other readers read the samples
+one by one.)code", 1);
+
+DALI_SCHEMA(ChunkShuffleLoaderBase)
+  .AddOptionalArg("shuffle_chunk_size",
+      R"code(If greater than 0, the reader splits the dataset into chunks of that many consecutive
+samples and visits the chunks in a different random order in each epoch, reading each of them
+sequentially.
+
+It combines the sequential reading, with large reads that suit the storage with high latency or
+low random access performance (HDDs, network file systems), with the randomness of the order of
+the whole dataset. The order is the same in all the shards, so that each of them reads a different
+part of it. The chunks are computed on the fly, so they don't need any memory. The samples that
+don't fill a whole chunk at the end of the dataset are read last. To also mix the samples within
+the chunks, use ``random_shuffle`` with ``initial_fill`` of at least a few chunks.
+
+The order of the reads is reported in the reader metadata (see
+:meth:`nvidia.dali.Pipeline.reader_meta`). ``stick_to_shard`` cannot be used when this argument
+is set.)code", 0);
+
+DALI_SCHEMA(IndexedFileLoaderBase)
+  .AddOptionalArg("max_coalesced_read_size",
+      R"code(Maximum size, in bytes, of a single read of the records that are adjacent in the file.
+
+When the data is read with plain file I/O (see ``dont_use_mmap``), a run of records that are
+stored one after another is read with one large read instead of a read per record, and the records
+share the read buffer without a copy. This greatly reduces the number of reads for datasets with
+small records. If set to 0, each record is read separately.)code", 1 << 20)
+  .AddOptionalArg("shuffle_after_epoch",
+      R"code(If set to True, the reader visits the records of the entire dataset in a different
+random order in each epoch.
+
+Unlike ``random_shuffle``, which picks the samples randomly from a buffer of ``initial_fill``
+samples read in order, the order is a permutation of the whole dataset. It is computed on the fly,
+so it doesn't need any memory nor the initial buffer fill, and it is the same in all the shards,
+so that each of them reads a different part of the shuffled dataset.
+
+``stick_to_shard`` and ``random_shuffle`` cannot be used when this argument is set to True.)code",
+      false)
+  .AddParent("ChunkShuffleLoaderBase");
 
 size_t start_index(const size_t shard_id,
                    const size_t shard_num,
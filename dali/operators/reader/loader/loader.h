@@ -1,4 +1,4 @@
-// Copyright (c) 2017-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -15,6 +15,7 @@
 #ifndef DALI_OPERATORS_READER_LOADER_LOADER_H_
 #define DALI_OPERATORS_READER_LOADER_LOADER_H_
 
+#include <functional>
 #include <list>
 #include <map>
 #include <memory>
@@ -26,12 +27,14 @@
 #include <vector>
 #include <deque>
 #include <atomic>
+#include <cstdlib>
 
 #include "dali/core/nvtx.h"
 #include "dali/core/common.h"
 #include "dali/core/error_handling.h"
 #include "dali/pipeline/operator/op_spec.h"
 #include "dali/pipeline/data/tensor.h"
+#include "dali/pipeline/util/thread_pool.h"
 #include "dali/operators/decoder/cache/image_cache_factory.h"
 
 namespace dali {
@@ -73,9 +76,14 @@ class Loader {
       read_sample_counter_(0),
       returned_sample_counter_(0),
       pad_last_batch_(options.GetArgument<bool>("pad_last_batch")),
-      dont_use_mmap_(options.GetArgument<bool>("dont_use_mmap")) {
+      dont_use_mmap_(options.GetArgument<bool>("dont_use_mmap")),
+      num_io_threads_(options.GetArgument<int>("num_io_threads")) {
     DALI_ENFORCE(initial_empty_size_ > 0, "Batch size needs to be greater than 0");
     DALI_ENFORCE(num_shards_ > shard_id_, "num_shards needs to be greater than shard_id");
+    DALI_ENFORCE(num_io_threads_ > 0, "num_io_threads needs to be greater than 0");
+    if (num_io_threads_ > 1) {
+      io_thread_pool_ = std::make_unique<ThreadPool>(num_io_threads_, device_id_, false);
+    }
     // initialize a random distribution -- this will be
     // used to pick from our sample buffer
     std::seed_seq seq({seed_});
@@ -84,6 +92,7 @@ class Loader {
   }
 
   virtual ~Loader() {
+    io_thread_pool_.reset();
     sample_buffer_.clear();
     empty_tensors_.clear();
   }
@@ -130,7 +139,7 @@ class Loader {
       for (int i = 0; i < initial_buffer_fill_; ++i) {
         auto tensor_ptr = LoadTargetUniquePtr(new LoadTarget());
         PrepareEmpty(*tensor_ptr);
-        ReadSample(*tensor_ptr);
+        IssueReadSample(*tensor_ptr);
         IncreaseReadSampleCounter();
         sample_buffer_.push_back(std::move(tensor_ptr));
         ++shards_.back().end;
@@ -188,7 +197,7 @@ class Loader {
       tensor_ptr = std::move(empty_tensors_.back());
       empty_tensors_.pop_back();
     }
-    ReadSample(*tensor_ptr);
+    IssueReadSample(*tensor_ptr);
     IncreaseReadSampleCounter();
     std::swap(sample_buffer_[shards_.back().end % sample_buffer_.size()], tensor_ptr);
     ++shards_.back().end;
@@ -211,6 +220,22 @@ class Loader {
   // reads.
   virtual void ReadSample(LoadTarget& tensor) = 0;
 
+  /**
+   * @brief Waits until the reads issued by ReadOne are finished.
+   *
+   * With multiple I/O threads, the samples returned by ReadOne may be still being read, they can
+   * be used only after this call.
+   */
+  void WaitForReads(bool check_for_errors = true) {
+    if (io_thread_pool_) {
+      io_thread_pool_->WaitForWork(check_for_errors);
+    }
+  }
+
+  int NumIOThreads() const {
+    return num_io_threads_;
+  }
+
   void PrepareMetadata() {
     if (!loading_flag_) {
       std::lock_guard<std::mutex> l(prepare_metadata_mutex_);
@@ -248,11 +273,58 @@ class Loader {
     return stick_to_shard_;
   }
 
+  /**
+   * @brief Fraction of the samples read right after the preceding sample of the dataset,
+   *        or -1 if the loader doesn't track the order of the reads.
+   */
+  double SequentialReadRatio() const {
+    auto reads = tracked_reads_.load(std::memory_order_relaxed);
+    return reads ? 1.0 * sequential_reads_.load(std::memory_order_relaxed) / reads : -1;
+  }
+
+  /**
+   * @brief Mean distance between the position of a sample in the epoch and in the dataset,
+   *        relative to the size of the dataset, or -1 if the loader doesn't track the order
+   *        of the reads.
+   *
+   * It is 0 for the sequential reading and about 1/3 for a random permutation of the dataset.
+   * The shuffling buffer (`random_shuffle`) is not accounted for.
+   */
+  double ShuffleDisplacement() const {
+    auto reads = tracked_reads_.load(std::memory_order_relaxed);
+    return reads ? displacement_sum_.load(std::memory_order_relaxed) / reads : -1;
+  }
+
  protected:
   virtual Index SizeImpl() = 0;
 
   virtual void PrepareMetadataImpl() {}
 
+  /**
+   * @brief Advances to the next sample, like ReadSample, but returns the actual reading
+   *        of the data as a function to be run by one of the I/O threads, concurrently with
+   *        the reads of the other samples.
+   *
+   * The function is called with the index of the I/O thread, so it can use the state (e.g.
+   * the open files) of that thread. It may be empty if there's nothing left to read.
+   * Loaders that can't read the samples concurrently read them right away.
+   */
+  virtual std::function<void(int)> PrepareReadSample(LoadTarget& tensor) {
+    ReadSample(tensor);
+    return {};
+  }
+
+  void IssueReadSample(LoadTarget& tensor) {
+    if (!io_thread_pool_) {
+      ReadSample(tensor);
+      return;
+    }
+    auto read = PrepareReadSample(tensor);
+    if (read) {
+      io_thread_pool_->AddWork(std::move(read), 0, true);
+    }
+  }
+
   virtual void MoveToNextShard(Index current_index) {
     if (IsNextShard(current_index)) {
       Reset(stick_to_shard_);
@@ -292,6 +364,23 @@ class Loader {
     }
   }
 
+  /**
+   * @brief Records that the sample at the position `position` of the epoch is the sample
+   *        `index` of the dataset, for the statistics of the order of the reads.
+   */
+  void TrackReadOrder(Index position, Index index) {
+    auto reads = tracked_reads_.load(std::memory_order_relaxed);
+    if (index == last_read_index_ + 1) {
+      sequential_reads_.store(sequential_reads_.load(std::memory_order_relaxed) + 1,
+                              std::memory_order_relaxed);
+    }
+    double displacement = 1.0 * std::abs(position - index) / SizeImpl();
+    displacement_sum_.store(displacement_sum_.load(std::memory_order_relaxed) + displacement,
+                            std::memory_order_relaxed);
+    tracked_reads_.store(reads + 1, std::memory_order_relaxed);
+    last_read_index_ = index;
+  }
+
   bool ShouldSkipImage(const ImageCache::ImageKey& key) {
     if (!skip_cached_images_)
       return false;
@@ -369,6 +458,9 @@ class Loader {
   int virtual_shard_id_;
   // Keeps pointer to the last returned sample just in case it needs to be cloned
   LoadTargetSharedPtr last_sample_ptr_tmp;
+  // Number of threads reading the samples, see PrepareReadSample
+  int num_io_threads_;
+  std::unique_ptr<ThreadPool> io_thread_pool_;
 
   struct ShardBoundaries {
     Index start;
@@ -376,6 +468,16 @@ class Loader {
   };
 
   std::deque<ShardBoundaries> shards_;
+
+  /*
+   * Statistics of the order of the reads, see TrackReadOrder. They are updated only by the thread
+   * reading the samples and read by GetReaderMeta from any thread, so the updates are plain
+   * relaxed loads and stores, the atomics only keep the concurrent reads well defined.
+   */
+  std::atomic<int64_t> tracked_reads_{0};
+  std::atomic<int64_t> sequential_reads_{0};
+  std::atomic<double> displacement_sum_{0};
+  Index last_read_index_ = -1;
 };
 
 template<typename T, typename... Args>
@@ -1,4 +1,4 @@
-// Copyright (c) 2017, NVIDIA CORPORATION. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -13,6 +13,7 @@
 // limitations under the License.
 
 #include <gtest/gtest.h>
+#include <cstring>
 #include <memory>
 
 #include "dali/core/common.h"
@@ -91,7 +92,9 @@ TYPED_TEST(DataLoadStoreTest, RecordIOLoaderMmmap) {
             .AddArg("index_path", index_path)
             .AddArg("max_batch_size", 32)
             .AddArg("device_id", 0)
-            .AddArg("dont_use_mmap", dont_use_mmap)));
+            .AddArg("dont_use_mmap", dont_use_mmap)
+            // the records read at once share the buffer
+            .AddArg("max_coalesced_read_size", 0)));
 
     reader->PrepareMetadata();
     auto sample = reader->ReadOne(false);
@@ -110,7 +113,9 @@ TYPED_TEST(DataLoadStoreTest, TFRecordLoaderMmmap) {
             .AddArg("index_path", index_path)
             .AddArg("max_batch_size", 32)
             .AddArg("device_id", 0)
-            .AddArg("dont_use_mmap", dont_use_mmap)));
+            .AddArg("dont_use_mmap", dont_use_mmap)
+            // the records read at once share the buffer
+            .AddArg("max_coalesced_read_size", 0)));
 
     reader->PrepareMetadata();
     auto sample = reader->ReadOne(false);
@@ -118,6 +123,35 @@ TYPED_TEST(DataLoadStoreTest, TFRecordLoaderMmmap) {
   }
 }
 
+TYPED_TEST(DataLoadStoreTest, TFRecordLoaderCoalescedReads) {
+  std::vector<std::string> path = {testing::dali_extra_path() + "/db/tfrecord/train"};
+  std::vector<std::string> index_path = {testing::dali_extra_path() + "/db/tfrecord/train.idx"};
+  auto make_loader = [&](int max_coalesced_read_size) {
+    return InitLoader<IndexedFileLoader>(
+        OpSpec("TFRecordReader")
+        .AddArg("path", path)
+        .AddArg("index_path", index_path)
+        .AddArg("max_batch_size", 32)
+        .AddArg("device_id", 0)
+        .AddArg("dont_use_mmap", true)
+        .AddArg("max_coalesced_read_size", max_coalesced_read_size));
+  };
+  auto reader = make_loader(1 << 20);
+  auto ref_reader = make_loader(0);
+  bool any_shared = false;
+  for (int i = 0; i < 100; ++i) {
+    auto sample = reader->ReadOne(false);
+    auto ref_sample = ref_reader->ReadOne(false);
+    any_shared |= sample->shares_data();
+    EXPECT_FALSE(ref_sample->shares_data());
+    ASSERT_EQ(sample->size(), ref_sample->size());
+    EXPECT_EQ(std::memcmp(sample->data<uint8_t>(), ref_sample->data<uint8_t>(), sample->size()),
+              0);
+  }
+  // the records are stored one after another, so they are read at once
+  EXPECT_TRUE(any_shared);
+}
+
 TYPED_TEST(DataLoadStoreTest, CocoLoaderMmmap) {
   for (bool dont_use_mmap : {true, false}) {
     std::string file_root = testing::dali_extra_path() + "/db/coco/images";
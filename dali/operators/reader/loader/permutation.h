@@ -0,0 +1,134 @@
+// Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//     http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+#ifndef DALI_OPERATORS_READER_LOADER_PERMUTATION_H_
+#define DALI_OPERATORS_READER_LOADER_PERMUTATION_H_
+
+#include <array>
+#include <cassert>
+#include <cstdint>
+
+namespace dali {
+
+/**
+ * @brief Random permutation of the integers [0, size), computed lazily element by element.
+ *
+ * The permutation is a Feistel network, keyed with the `seed`, over the smallest domain of
+ * an even number of bits that contains the range. The values that fall outside of the range
+ * are encrypted again (cycle walking) until they get back into it, which keeps the mapping
+ * bijective. It takes constant memory and time, regardless of the size, so it can be used
+ * to visit large datasets in a random order without keeping the order in memory.
+ */
+class LazyPermutation {
+ public:
+  LazyPermutation() = default;
+
+  LazyPermutation(uint64_t size, uint64_t seed) : size_(size) {
+    int bits = 2;
+    while (bits < 64 && (uint64_t(1) << bits) < size) {
+      bits += 2;
+    }
+    half_bits_ = bits / 2;
+    half_mask_ = (uint64_t(1) << half_bits_) - 1;
+    for (auto &key : keys_) {
+      key = SplitMix64(seed);
+    }
+  }
+
+  uint64_t size() const {
+    return size_;
+  }
+
+  /**
+   * @brief Returns the element at the position `index` of the permutation.
+   */
+  uint64_t operator()(uint64_t index) const {
+    assert(index < size_);
+    // the domain is less than 4 times larger than the range, so it takes a few iterations at most
+    do {
+      index = Encrypt(index);
+    } while (index >= size_);
+    return index;
+  }
+
+ private:
+  static constexpr int kRounds = 4;
+
+  static uint64_t SplitMix64(uint64_t &state) {
+    uint64_t z = (state += 0x9E3779B97F4A7C15ull);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ull;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBull;
+    return z ^ (z >> 31);
+  }
+
+  uint64_t Round(uint64_t half, uint64_t key) const {
+    uint64_t z = (half ^ key) * 0xBF58476D1CE4E5B9ull;
+    z = (z ^ (z >> 31)) * 0x94D049BB133111EBull;
+    return (z ^ (z >> 29)) & half_mask_;
+  }
+
+  uint64_t Encrypt(uint64_t value) const {
+    uint64_t left = value >> half_bits_;
+    uint64_t right = value & half_mask_;
+    for (auto key : keys_) {
+      uint64_t next = left ^ Round(right, key);
+      left = right;
+      right = next;
+    }
+    return (left << half_bits_) | right;
+  }
+
+  uint64_t size_ = 0;
+  int half_bits_ = 1;
+  uint64_t half_mask_ = 1;
+  std::array<uint64_t, kRounds> keys_ = {};
+};
+
+/**
+ * @brief Order in which the samples of a dataset are visited, shuffled in chunks.
+ *
+ * The dataset is split into chunks of `chunk_size` consecutive samples, which are visited in
+ * a random order, each of them sequentially, so that the data is read with large sequential reads
+ * while the epochs still go through the dataset in a different order. The chunk size of 1 gives
+ * a random permutation of the whole dataset. The samples that don't fill a whole chunk at the end
+ * of the dataset are visited last.
+ */
+class ChunkShuffledOrder {
+ public:
+  ChunkShuffledOrder() = default;
+
+  ChunkShuffledOrder(uint64_t size, uint64_t chunk_size, uint64_t seed)
+      : chunk_size_(chunk_size), chunks_(size / chunk_size, seed) {
+    assert(chunk_size > 0);
+  }
+
+  /**
+   * @brief Returns the sample visited at the position `index`.
+   */
+  uint64_t operator()(uint64_t index) const {
+    uint64_t chunk = index / chunk_size_;
+    if (chunk >= chunks_.size()) {
+      return index;
+    }
+    return chunks_(chunk) * chunk_size_ + index % chunk_size_;
+  }
+
+ private:
+  uint64_t chunk_size_ = 1;
+  LazyPermutation chunks_;
+};
+
+}  // namespace dali
+
+#endif  // DALI_OPERATORS_READER_LOADER_PERMUTATION_H_
@@ -0,0 +1,87 @@
+// Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//     http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+#include <gtest/gtest.h>
+#include <vector>
+
+#include "dali/operators/reader/loader/permutation.h"
+
+namespace dali {
+
+TEST(LazyPermutationTest, IsPermutation) {
+  for (uint64_t size : {1, 2, 3, 4, 5, 17, 64, 100, 1000, 4097, 100000}) {
+    LazyPermutation permutation(size, 1234);
+    EXPECT_EQ(permutation.size(), size);
+    std::vector<int> visited(size, 0);
+    for (uint64_t i = 0; i < size; i++) {
+      auto value = permutation(i);
+      ASSERT_LT(value, size);
+      visited[value]++;
+    }
+    for (uint64_t i = 0; i < size; i++) {
+      EXPECT_EQ(visited[i], 1) << "value " << i << " of the permutation of size " << size;
+    }
+  }
+}
+
+TEST(LazyPermutationTest, DependsOnSeed) {
+  const uint64_t size = 1000;
+  LazyPermutation permutation(size, 1), same(size, 1), other(size, 2);
+  int num_same = 0, num_fixed = 0;
+  for (uint64_t i = 0; i < size; i++) {
+    EXPECT_EQ(permutation(i), same(i));
+    num_same += permutation(i) == other(i);
+    num_fixed += permutation(i) == i;
+  }
+  // a random permutation has a single fixed point on average
+  EXPECT_LT(num_same, 10);
+  EXPECT_LT(num_fixed, 10);
+}
+
+TEST(ChunkShuffledOrderTest, ShufflesChunks) {
+  const uint64_t chunk_size = 16;
+  for (uint64_t size : {5, 16, 100, 1024, 1000}) {
+    ChunkShuffledOrder order(size, chunk_size, 1234);
+    std::vector<int> visited(size, 0);
+    for (uint64_t i = 0; i < size; i++) {
+      auto value = order(i);
+      ASSERT_LT(value, size);
+      visited[value]++;
+      // the samples of a chunk are visited one after another
+      if (i % chunk_size != 0) {
+        EXPECT_EQ(value, order(i - 1) + 1);
+      } else {
+        EXPECT_EQ(value % chunk_size, 0u);
+      }
+    }
+    for (uint64_t i = 0; i < size; i++) {
+      EXPECT_EQ(visited[i], 1) << "sample " << i << " of the dataset of size " << size;
+    }
+    // the incomplete chunk is visited last
+    for (uint64_t i = size / chunk_size * chunk_size; i < size; i++) {
+      EXPECT_EQ(order(i), i);
+    }
+  }
+}
+
+TEST(ChunkShuffledOrderTest, SingleSampleChunks) {
+  const uint64_t size = 1000;
+  ChunkShuffledOrder order(size, 1, 1234);
+  LazyPermutation permutation(size, 1234);
+  for (uint64_t i = 0; i < size; i++) {
+    EXPECT_EQ(order(i), permutation(i));
+  }
+}
+
+}  // namespace dali
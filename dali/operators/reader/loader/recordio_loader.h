@@ -18,6 +18,7 @@
 #include <algorithm>
 #include <memory>
 #include <string>
+#include <utility>
 #include <vector>
 
 #include "dali/operators/reader/loader/indexed_file_loader.h"
@@ -30,20 +31,31 @@ class RecordIOLoader : public IndexedFileLoader {
  public:
   explicit RecordIOLoader(const OpSpec& options)
     : IndexedFileLoader(options) {
+    records_span_files_ = true;
   }
   ~RecordIOLoader() override {}
 
   void ReadIndexFile(const std::vector<std::string>& index_uris) override {
+    DALI_ENFORCE(index_uris.size() == 1,
+        "RecordIOReader supports only a single index file");
+    const std::string& path = index_uris[0];
+    if (BinaryIndex::IsBinaryIndex(path)) {
+      // the records are already split between the data files, no need to look at them
+      BinaryIndex index(path);
+      DALI_ENFORCE(index.flags() == BinaryIndex::kPerFileRecords &&
+                   index.file_num_records().size() == uris_.size(),
+                   make_string("Binary RecordIO index file \"", path, "\" should describe the "
+                               "records of all the ", uris_.size(), " data files"));
+      AddMappedIndex(std::move(index), 0);
+      return;
+    }
     std::vector<size_t> file_offsets;
     file_offsets.push_back(0);
-    for (std::string& path : uris_) {
-      auto tmp = FileStream::Open(path, read_ahead_, !copy_read_data_);
+    for (const std::string& data_path : uris_) {
+      auto tmp = FileStream::Open(data_path, read_ahead_, !copy_read_data_);
       file_offsets.push_back(tmp->Size() + file_offsets.back());
       tmp->Close();
     }
-    DALI_ENFORCE(index_uris.size() == 1,
-        "RecordIOReader supports only a single index file");
-    const std::string& path = index_uris[0];
     std::ifstream index_file(path);
     DALI_ENFORCE(index_file.good(),
         "Could not open RecordIO index file. Provided path: \"" + path + "\"");
@@ -79,20 +91,34 @@ class RecordIOLoader : public IndexedFileLoader {
   }
 
   void ReadSample(Tensor<CPUBackend>& tensor) override {
+    if (copy_read_data_) {
+      // the same as a concurrent read, done in place
+      auto read = PrepareReadSample(tensor);
+      if (read) {
+        read(0);
+      }
+      return;
+    }
     // if we moved to next shard wrap up
     MoveToNextShard(current_index_);
 
     int64 seek_pos, size;
     size_t file_index;
-    std::tie(seek_pos, size, file_index) = indices_[current_index_];
-
-    ++current_index_;
+    std::tie(seek_pos, size, file_index) = NextIndexEntry();
 
     std::string image_key = uris_[file_index] + " at index " + to_string(seek_pos);
     DALIMeta meta;
     meta.SetSourceInfo(image_key);
     meta.SetSkipSample(false);
 
+    // the shuffled records don't follow each other, they may be in any of the files
+    if (file_index != current_file_index_) {
+      current_file_->Close();
+      current_file_ = FileStream::Open(uris_[file_index], read_ahead_, !copy_read_data_);
+      current_file_index_ = file_index;
+      should_seek_ = true;
+    }
+
     // if image is cached, skip loading
     if (ShouldSkipImage(image_key)) {
       meta.SetSkipSample(true);
@@ -15,11 +15,13 @@
 #include "dali/operators/reader/loader/webdataset_loader.h"
 #include <cstddef>
 #include <cstring>
+#include <functional>
 #include <limits>
 #include <memory>
 #include <tuple>
 #include <utility>
 #include "dali/core/error_handling.h"
+#include "dali/operators/reader/loader/binary_index.h"
 #include "dali/operators/reader/loader/webdataset/tar_utils.h"
 #include "dali/pipeline/data/types.h"
 
@@ -128,6 +130,54 @@ inline void ParseIndexFile(std::vector<SampleDesc>& samples_container,
   }
 }
 
+inline void ParseBinaryIndexFile(std::vector<SampleDesc>& samples_container,
+                                 std::vector<ComponentDesc>& components_container,
+                                 const std::string& index_path) {
+  BinaryIndex index(index_path);
+  DALI_ENFORCE(index.flags() == BinaryIndex::kSampleComponents,
+               IndexFileErrMsg(index_path, 0,
+                               "the binary index file doesn't describe the sample components"));
+  auto offsets = index.offsets();
+  auto sizes = index.sizes();
+  auto names = index.names();
+  const char* name = names.begin();
+
+  // the extension and the file name of every component are stored as NUL terminated strings
+  auto next_name = [&](int64_t line) {
+    auto* end = static_cast<const char*>(std::memchr(name, '\0', names.end() - name));
+    DALI_ENFORCE(end != nullptr, IndexFileErrMsg(index_path, line, "missing component name"));
+    std::string result(name, end);
+    name = end + 1;
+    return result;
+  };
+
+  samples_container.reserve(samples_container.size() + index.num_records());
+  components_container.reserve(components_container.size() + offsets.size());
+  size_t component_index = 0;
+  for (size_t sample_index = 0; sample_index < index.num_records(); sample_index++) {
+    int64_t line = sample_index + 1;
+    samples_container.emplace_back();
+    auto& sample = samples_container.back();
+    sample.components =
+        VectorRange<ComponentDesc>(components_container, components_container.size());
+    sample.line_number = line;
+    DALI_ENFORCE(index.sample_num_components()[sample_index] > 0,
+                 IndexFileErrMsg(index_path, line, "no extensions provided for the sample"));
+    for (size_t i = 0; i < index.sample_num_components()[sample_index]; i++, component_index++) {
+      ComponentDesc component;
+      component.ext = next_name(line);
+      component.filename = next_name(line);
+      component.offset = offsets[component_index];
+      component.size = sizes[component_index];
+      DALI_ENFORCE(component.offset % kBlockSize == 0,
+                   IndexFileErrMsg(index_path, line, "tar offset is not a multiple of tar block ",
+                                   "size (", kBlockSize, ")"));
+      components_container.emplace_back(std::move(component));
+      sample.components.num++;
+    }
+  }
+}
+
 std::tuple<std::string, std::string> split_name(const std::string& filepath) {
   size_t dot_pos = filepath.find('.', filepath.rfind('/') + 1);
   return {filepath.substr(0, dot_pos), filepath.substr(dot_pos + 1)};
@@ -200,7 +250,8 @@ WebdatasetLoader::WebdatasetLoader(const OpSpec& spec)
       paths_(spec.GetRepeatedArgument<std::string>("paths")),
       index_paths_(spec.GetRepeatedArgument<std::string>("index_paths")),
       missing_component_behavior_(detail::wds::ParseMissingExtBehavior(
-          spec.GetArgument<std::string>("missing_component_behavior"))) {
+          spec.GetArgument<std::string>("missing_component_behavior"))),
+      shuffle_chunk_size_(spec.GetArgument<int>("shuffle_chunk_size")) {
   DALI_ENFORCE(paths_.size() == index_paths_.size() || index_paths_.size() == 0,
                make_string("The number of index files, if any, must match the number of archives ",
                "in the dataset"));
@@ -209,6 +260,13 @@ WebdatasetLoader::WebdatasetLoader(const OpSpec& spec)
                make_string("Invalid value for missing_component_behavior '",
                            spec.GetArgument<std::string>("missing_component_behavior"),
                            "' possible values are: skip, error, empty"));
+  DALI_ENFORCE(shuffle_chunk_size_ >= 0, "shuffle_chunk_size needs to be non-negative");
+  // the same as in the IndexedFileLoader, all the shards read their part of the shuffled chunks
+  DALI_ENFORCE(!(shuffle_chunk_size_ > 0 && stick_to_shard_),
+               "shuffle_chunk_size and stick_to_shard cannot be used together");
+  if (shuffle_chunk_size_ > 0) {
+    stick_to_shard_ = true;
+  }
 
   std::vector<std::string> samples_exts = spec.GetRepeatedArgument<std::string>("ext");
   ext_.reserve(samples_exts.size());
@@ -258,9 +316,15 @@ std::string WebdatasetLoader::GetSampleSource(const detail::wds::SampleDesc& sam
 }
 
 
-void WebdatasetLoader::ReadSample(vector<Tensor<CPUBackend>>& sample) {
+detail::wds::SampleDesc& WebdatasetLoader::CurrentSample() {
   MoveToNextShard(sample_index_);
-  detail::wds::SampleDesc& current_sample = samples_[sample_index_];
+  size_t index = shuffle_chunk_size_ > 0 ? order_(sample_index_) : sample_index_;
+  TrackReadOrder(sample_index_, index);
+  return samples_[index];
+}
+
+void WebdatasetLoader::ReadSample(vector<Tensor<CPUBackend>>& sample) {
+  detail::wds::SampleDesc& current_sample = CurrentSample();
   auto& current_wds_shard = wds_shards_[current_sample.wds_shard_index];
 
   for (auto& component : current_sample.components) {
@@ -289,25 +353,7 @@ void WebdatasetLoader::ReadSample(vector<Tensor<CPUBackend>>& sample) {
     }
     // Reading Data
     if (copy_read_data_) {
-      uint8_t* shared_tensor_data = nullptr;
-      bool shared_tensor_is_pinned = false;
-      for (auto& output : component.outputs) {
-        if (!shared_tensor_data) {
-          if (sample[output].shares_data()) {
-            sample[output].Reset();
-          }
-          sample[output].Resize(
-              {static_cast<int64_t>(component.size / sample[output].type_info().size())},
-              dtypes_[output]);
-          shared_tensor_data = reinterpret_cast<uint8_t*>(sample[output].raw_mutable_data());
-          shared_tensor_is_pinned = sample[output].is_pinned();
-        } else {
-          sample[output].ShareData(
-              shared_tensor_data, component.size, shared_tensor_is_pinned,
-              {static_cast<int64_t>(component.size / sample[output].type_info().size())},
-              sample[output].type());
-        }
-      }
+      uint8_t* shared_tensor_data = AllocateComponentOutputs(sample, component);
       DALI_ENFORCE(current_wds_shard->Read(shared_tensor_data, component.size) == component.size,
                    "Error reading from a file " + paths_[current_sample.wds_shard_index]);
     } else {
@@ -330,6 +376,94 @@ void WebdatasetLoader::ReadSample(vector<Tensor<CPUBackend>>& sample) {
   sample_index_++;
 }
 
+std::function<void(int)> WebdatasetLoader::PrepareReadSample(
+    vector<Tensor<CPUBackend>>& sample) {
+  // the mapped data is shared without a copy, there is nothing to read concurrently
+  if (!copy_read_data_) {
+    ReadSample(sample);
+    return {};
+  }
+  detail::wds::SampleDesc& current_sample = CurrentSample();
+  size_t wds_shard_index = current_sample.wds_shard_index;
+  auto& current_wds_shard = wds_shards_[wds_shard_index];
+
+  // (destination, offset, size) of the components to be read by the I/O thread
+  std::vector<std::tuple<uint8_t*, int64_t, size_t>> reads;
+  for (auto& component : current_sample.components) {
+    // Checking if the component data from the index file agrees with reality
+    DALI_ENFORCE(
+        component.offset < static_cast<int64_t>(current_wds_shard->Size()),
+        IndexFileErrMsg(index_paths_[wds_shard_index], current_sample.line_number,
+                        "offset is outside of the archive file"));
+
+    // Skipping cached samples
+    const std::string sample_key = make_string_delim(':', paths_[wds_shard_index],
+                                                     component.offset, component.filename);
+
+    if (ShouldSkipImage(sample_key)) {
+      DALIMeta meta;
+      meta.SetSourceInfo(sample_key);
+      meta.SetSkipSample(true);
+      for (auto& output : component.outputs) {
+        sample[output].Reset();
+        sample[output].SetMeta(meta);
+        sample[output].Resize({0}, dtypes_[output]);
+      }
+      continue;
+    }
+    reads.emplace_back(AllocateComponentOutputs(sample, component), component.offset,
+                       component.size);
+  }
+
+  // Setting non-filled outputs
+  for (auto& empty_output : current_sample.empty_outputs) {
+    sample[empty_output].Reset();
+    sample[empty_output].Resize({0}, dtypes_[empty_output]);
+  }
+  sample_index_++;
+
+  return [this, wds_shard_index, reads = std::move(reads)](int thread_idx) {
+    auto& file = io_thread_files_[thread_idx];
+    if (file.stream == nullptr || file.index != wds_shard_index) {
+      file.stream = FileStream::Open(paths_[wds_shard_index], read_ahead_, false);
+      file.index = wds_shard_index;
+    }
+    for (auto& read : reads) {
+      uint8_t* data;
+      int64_t offset;
+      size_t size;
+      std::tie(data, offset, size) = read;
+      file.stream->Seek(offset);
+      DALI_ENFORCE(file.stream->Read(data, size) == size,
+                   "Error reading from a file " + paths_[wds_shard_index]);
+    }
+  };
+}
+
+uint8_t* WebdatasetLoader::AllocateComponentOutputs(vector<Tensor<CPUBackend>>& sample,
+                                                    detail::wds::ComponentDesc& component) {
+  uint8_t* shared_tensor_data = nullptr;
+  bool shared_tensor_is_pinned = false;
+  for (auto& output : component.outputs) {
+    if (!shared_tensor_data) {
+      if (sample[output].shares_data()) {
+        sample[output].Reset();
+      }
+      sample[output].Resize(
+          {static_cast<int64_t>(component.size / sample[output].type_info().size())},
+          dtypes_[output]);
+      shared_tensor_data = reinterpret_cast<uint8_t*>(sample[output].raw_mutable_data());
+      shared_tensor_is_pinned = sample[output].is_pinned();
+    } else {
+      sample[output].ShareData(
+          shared_tensor_data, component.size, shared_tensor_is_pinned,
+          {static_cast<int64_t>(component.size / sample[output].type_info().size())},
+          sample[output].type());
+    }
+  }
+  return shared_tensor_data;
+}
+
 Index WebdatasetLoader::SizeImpl() {
   return samples_.size();
 }
@@ -339,6 +473,7 @@ void WebdatasetLoader::PrepareMetadataImpl() {
     mmap_reserver_ = FileStream::MappingReserver(static_cast<unsigned int>(paths_.size()));
   }
   copy_read_data_ = dont_use_mmap_ || !mmap_reserver_.CanShareMappedData();
+  io_thread_files_.resize(NumIOThreads());
 
   generate_index_ = index_paths_.size() == 0;
   if (generate_index_) {
@@ -377,6 +512,9 @@ void WebdatasetLoader::PrepareMetadataImpl() {
     if (generate_index_) {
       detail::wds::ParseTarFile(unfiltered_samples, unfiltered_components,
                                 wds_shards_[wds_shard_index]);
+    } else if (BinaryIndex::IsBinaryIndex(index_paths_[wds_shard_index])) {
+      detail::wds::ParseBinaryIndexFile(unfiltered_samples, unfiltered_components,
+                                        index_paths_[wds_shard_index]);
     } else {
       detail::wds::ParseIndexFile(unfiltered_samples, unfiltered_components,
                                   index_paths_[wds_shard_index]);
@@ -441,11 +579,16 @@ void WebdatasetLoader::PrepareMetadataImpl() {
       was_output_set.fill(false);
     }
   }
-  sample_index_ = start_index(shard_id_, num_shards_, samples_.size());
+  Reset(true);
 }
 
 void WebdatasetLoader::Reset(bool wrap_to_shard) {
   sample_index_ = wrap_to_shard ? start_index(shard_id_, num_shards_, samples_.size()) : 0;
+  current_epoch_++;
+  if (shuffle_chunk_size_ > 0) {
+    order_ = ChunkShuffledOrder(samples_.size(), shuffle_chunk_size_,
+                                kDaliDataloaderSeed + current_epoch_);
+  }
 }
 
 }  // namespace dali
@@ -1,4 +1,4 @@
-// Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+// Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -16,6 +16,7 @@
 #define DALI_OPERATORS_READER_LOADER_WEBDATASET_LOADER_H_
 
 #include <fstream>
+#include <functional>
 #include <memory>
 #include <set>
 #include <string>
@@ -25,6 +26,7 @@
 #include <vector>
 #include "dali/core/bitmask.h"
 #include "dali/operators/reader/loader/loader.h"
+#include "dali/operators/reader/loader/permutation.h"
 #include "dali/pipeline/data/tensor.h"
 #include "dali/util/file.h"
 
@@ -99,6 +101,7 @@ class DLL_PUBLIC WebdatasetLoader : public Loader<CPUBackend, vector<Tensor<CPUB
   Index SizeImpl() override;
   void PrepareMetadataImpl() override;
   void Reset(bool wrap_to_shard) override;
+  std::function<void(int)> PrepareReadSample(std::vector<Tensor<CPUBackend>>&) override;
 
   std::vector<std::string> paths_;
   std::vector<std::string> index_paths_;
@@ -115,11 +118,26 @@ class DLL_PUBLIC WebdatasetLoader : public Loader<CPUBackend, vector<Tensor<CPUB
 
   std::vector<std::unique_ptr<FileStream>> wds_shards_;
   size_t sample_index_ = 0;
+  // the chunks of the samples are visited in a different random order in each epoch
+  int shuffle_chunk_size_;
+  int current_epoch_ = 0;
+  ChunkShuffledOrder order_;
   FileStream::MappingReserver mmap_reserver_;
   std::once_flag multiple_files_single_component;
 
+  // the archive currently read by each of the I/O threads
+  struct IOThreadFile {
+    size_t index = 0;
+    std::unique_ptr<FileStream> stream;
+  };
+  std::vector<IOThreadFile> io_thread_files_;
+
   bool generate_index_ = true;
   std::string GetSampleSource(const detail::wds::SampleDesc& sample);
+  // moves to the next shard if needed and returns the sample at the current position
+  detail::wds::SampleDesc& CurrentSample();
+  uint8_t* AllocateComponentOutputs(std::vector<Tensor<CPUBackend>>& sample,
+                                    detail::wds::ComponentDesc& component);
 };
 
 }  // namespace dali
@@ -1,4 +1,4 @@
-// Copyright (c) 2017-2018, NVIDIA CORPORATION. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -30,9 +30,12 @@ DALI_SCHEMA(readers__MXNet)
       R"code(List (of length 1) that contains a path to the index (.idx) file.
 
 The file is generated by the MXNet's ``im2rec.py`` script with the RecordIO file. The list can
-also be generated by using the ``rec2idx`` script that is distributed with DALI.)code",
+also be generated by using the ``rec2idx`` script that is distributed with DALI. The index can be
+converted to the binary format, which is mapped into the memory instead of being parsed,
+with the ``idx2bin.py`` script.)code",
       DALI_STRING_VEC)
-  .AddParent("LoaderBase");
+  .AddParent("LoaderBase")
+  .AddParent("IndexedFileLoaderBase");
 
 
 // Deprecated alias
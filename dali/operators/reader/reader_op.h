@@ -1,4 +1,4 @@
-// Copyright (c) 2017-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -16,6 +16,7 @@
 #define DALI_OPERATORS_READER_READER_OP_H_
 
 #include <atomic>
+#include <chrono>
 #include <condition_variable>
 #include <memory>
 #include <string>
@@ -86,9 +87,17 @@ class DataReader : public Operator<Backend> {
     auto &curr_batch = prefetched_batch_queue_[curr_batch_producer_];
     curr_batch.clear();
     curr_batch.reserve(max_batch_size_);
-    for (int i = 0; i < max_batch_size_; ++i) {
-      curr_batch.push_back(loader_->ReadOne(i == 0));
+    try {
+      for (int i = 0; i < max_batch_size_; ++i) {
+        curr_batch.push_back(loader_->ReadOne(i == 0));
+      }
+    } catch (...) {
+      // don't leave the I/O threads reading when the error is propagated
+      loader_->WaitForReads(false);
+      throw;
     }
+    // the samples may be read concurrently by the loader's I/O threads
+    loader_->WaitForReads();
   }
 
   // Main prefetch work loop
@@ -97,7 +106,14 @@ class DataReader : public Operator<Backend> {
     ProducerWait();
     while (!finished_) {
       try {
+        auto start = std::chrono::steady_clock::now();
         Prefetch();
+        std::chrono::duration<double> prefetch_time = std::chrono::steady_clock::now() - start;
+        prefetch_time_.store(prefetch_time_.load(std::memory_order_relaxed) +
+                             prefetch_time.count(), std::memory_order_relaxed);
+        prefetched_samples_.store(prefetched_samples_.load(std::memory_order_relaxed) +
+                                  prefetched_batch_queue_[curr_batch_producer_].size(),
+                                  std::memory_order_relaxed);
       } catch (const std::exception& e) {
         ProducerStop(std::current_exception());
         return;
@@ -194,6 +210,12 @@ class DataReader : public Operator<Backend> {
     ret.shard_id = loader_->GetShardId();
     ret.pad_last_batch = loader_->PadLastBatch();
     ret.stick_to_shard = loader_->StickToShard();
+    double prefetch_time = prefetch_time_.load(std::memory_order_relaxed);
+    if (prefetch_time > 0) {
+      ret.read_throughput = prefetched_samples_.load(std::memory_order_relaxed) / prefetch_time;
+    }
+    ret.sequential_read_ratio = loader_->SequentialReadRatio();
+    ret.shuffle_displacement = loader_->ShuffleDisplacement();
     return ret;
   }
 
@@ -347,6 +369,10 @@ class DataReader : public Operator<Backend> {
 
   // keep track of how many samples have been processed over all threads.
   std::atomic<int> samples_processed_;
+  // time spent on reading the batches and the number of samples read, see GetReaderMeta,
+  // updated only by the prefetch thread, in the same way as the statistics of the Loader
+  std::atomic<double> prefetch_time_{0};
+  std::atomic<int64_t> prefetched_samples_{0};
 
   // stores any catched exceptions in the prefetch worker
   std::exception_ptr prefetch_error_;
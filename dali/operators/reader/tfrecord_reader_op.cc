@@ -1,4 +1,4 @@
-// Copyright (c) 2017-2018, NVIDIA CORPORATION. All rights reserved.
+// Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 //
 // Licensed under the Apache License, Version 2.0 (the "License");
 // you may not use this file except in compliance with the License.
@@ -44,8 +44,11 @@ DALI_SCHEMA(readers___TFRecordBase)
       R"code(List of paths to index files. There should be one index file for every TFRecord file.
 
 The index files can be obtained from TFRecord files by using the ``tfrecord2idx`` script
-that is distributed with DALI.)code",
-      DALI_STRING_VEC);
+that is distributed with DALI. The binary index files (``tfrecord2idx --format binary``, or
+converted from the text ones with the ``idx2bin.py`` script) are mapped into the memory instead
+of being parsed, so they are faster to open and their memory is shared between the processes.)code",
+      DALI_STRING_VEC)
+  .AddParent("IndexedFileLoaderBase");
 
 // Internal readers._tfrecord schema.
 DALI_SCHEMA(readers___TFRecord)
@@ -127,7 +127,8 @@ Example: "left.png;right.jpg")code",
             R"code(The list of the index files corresponding to the respective webdataset archives.
 
 Has to be the same length as the ``paths`` argument. In case it is not provided,
-it will be inferred automatically from the webdataset archive.)code",
+it will be inferred automatically from the webdataset archive. The index files can be
+converted to the binary format, which is faster to read, with the ``idx2bin.py`` script.)code",
             std::vector<std::string>())
     .AddOptionalArg(
         "missing_component_behavior",
@@ -145,7 +146,8 @@ Moreover, the tar file should be constructed so that it will only output a sampl
 divisible by the size of the data type.)code",
                     DALI_DATA_TYPE_VEC,
                     nullptr)  // default is a vector of uint8
-    .AddParent("LoaderBase");
+    .AddParent("LoaderBase")
+    .AddParent("ChunkShuffleLoaderBase");
 
 DALI_REGISTER_OPERATOR(readers__Webdataset, WebdatasetReader, CPU);
 
@@ -47,6 +47,10 @@ struct DLL_PUBLIC ReaderMeta {
   int shard_id = -1;              // shard id of given reader
   int pad_last_batch = -1;        // if given reader should pad last batch
   int stick_to_shard = -1;        // if given reader should stick to its shard
+  // statistics of the reading, -1 if not available
+  double read_throughput = -1;        // samples read per second spent on reading
+  double sequential_read_ratio = -1;  // fraction of samples read after the preceding one
+  double shuffle_displacement = -1;   // mean distance of a sample from its position in dataset
 
   DLL_PUBLIC operator bool() const {
     return epoch_size != -1 && epoch_size_padded != -1 && number_of_shards != -1 &&
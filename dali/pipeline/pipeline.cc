@@ -149,10 +149,15 @@ Pipeline::Pipeline(const string &serialized_pipe, int batch_size, int num_thread
   }
 
 Pipeline::~Pipeline() {
+  DeviceGuard dg(device_id_);
+  Shutdown();
+  graph_ = {};
+}
+
+void Pipeline::Shutdown() {
   DeviceGuard dg(device_id_);
   if (executor_)
     executor_->Shutdown();
-  graph_ = {};
 }
 
 void Pipeline::Init(int max_batch_size, int num_threads, int device_id, int64_t seed,
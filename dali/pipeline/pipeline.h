@@ -372,6 +372,14 @@ class DLL_PUBLIC Pipeline {
    */
   DLL_PUBLIC void ReleaseOutputs();
 
+  /**
+   * @brief Stops the executor and waits for its threads, without destroying the operators.
+   *
+   * It is called by the destructor, but can be called earlier to stop the execution
+   * in a different context than the one destroying the operators.
+   */
+  DLL_PUBLIC void Shutdown();
+
   /**
    * @brief serializes the pipe to a protobuf
    */
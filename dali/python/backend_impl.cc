@@ -14,6 +14,8 @@
 
 #include <cuda_runtime_api.h>
 #include <dlfcn.h>
+#include <algorithm>
+#include <vector>
 #include "dali/core/cuda_utils.h"
 #include "dali/core/device_guard.h"
 #if SHM_WRAPPER_ENABLED
@@ -100,6 +102,27 @@ std::vector<py::tuple> py_shape_list(const TensorList<Backend> &tl) {
   return ret;
 }
 
+/**
+ * @brief Returns the shapes of the samples of the `TensorList` as an array of shape
+ *        (num_samples, sample_dim) and the offsets of the samples (in elements) in the contiguous
+ *        buffer holding all of them as an array of num_samples + 1 elements.
+ */
+template <typename Backend>
+py::tuple py_shapes_and_offsets(const TensorList<Backend> &tl) {
+  const auto &shape = tl.shape();
+  ssize_t num_samples = shape.num_samples();
+  ssize_t sample_dim = shape.sample_dim();
+  py::array_t<int64_t> shapes(std::vector<ssize_t>{num_samples, sample_dim});
+  py::array_t<int64_t> offsets(num_samples + 1);
+  std::copy(shape.shapes.begin(), shape.shapes.end(), shapes.mutable_data());
+  int64_t *offsets_data = offsets.mutable_data();
+  offsets_data[0] = 0;
+  for (ssize_t i = 0; i < num_samples; i++) {
+    offsets_data[i + 1] = offsets_data[i] + shape.tensor_size(i);
+  }
+  return py::make_tuple(shapes, offsets);
+}
+
 static string TensorLayoutRepr(const TensorLayout &tl) {
   std::stringstream ss;
   ss << "nvidia.dali.types.TensorLayout('";
@@ -205,6 +228,36 @@ void FillTensorFromDlPack(py::capsule capsule, SourceDataType<SrcBackend> *batch
   batch->SetLayout(layout);
 }
 
+/**
+ * @brief DLPack resource that keeps a Python object alive as long as the consumer
+ *        of the DLPack tensor uses the memory.
+ *
+ * The memory itself is not owned - the owner object is used by the caller to learn when
+ * the consumer no longer needs the data.
+ */
+struct DLTensorPyOwnerResource : public DLTensorResource {
+  DLTensorPyOwnerResource(TensorShape<> shape, py::object owner)
+  : DLTensorResource(std::move(shape))
+  , owner(std::move(owner)) {}
+
+  ~DLTensorPyOwnerResource() override {
+    // the consumer may free the tensor in a thread that doesn't hold the GIL
+    py::gil_scoped_acquire gil;
+    owner = py::object();
+  }
+
+  py::object owner;
+};
+
+template <typename Backend>
+py::capsule TensorToDLPackCapsule(Tensor<Backend> &t, py::object owner) {
+  auto resource = std::make_unique<DLTensorPyOwnerResource>(t.shape(), std::move(owner));
+  auto dl_tensor = MakeDLTensor(t.raw_mutable_data(), t.type(),
+                                std::is_same<Backend, GPUBackend>::value, t.device_id(),
+                                std::move(resource));
+  return DLTensorToCapsule(std::move(dl_tensor));
+}
+
 template <typename TensorType>
 void FillTensorFromCudaArray(const py::object object, TensorType *batch, int device_id,
                              string layout) {
@@ -256,6 +309,24 @@ void FillTensorFromCudaArray(const py::object object, TensorType *batch, int dev
   batch->set_device_id(device_id);
 }
 
+/**
+ * @brief Stops the pipeline's executor without holding the GIL, as the executor's threads,
+ *        which are joined there, may need it to run parallel PythonFunctions.
+ *
+ * The operators are destroyed with the GIL held, as they may own Python objects.
+ */
+struct PipelineDeleter {
+  void operator()(Pipeline *p) const {
+    {
+      py::gil_scoped_release interpreter_unlock{};
+      p->Shutdown();
+    }
+    delete p;
+  }
+};
+
+using PipelinePtr = std::unique_ptr<Pipeline, PipelineDeleter>;
+
 void ExposeTensorLayout(py::module &m) {
   py::class_<TensorLayout> tl(m, "TensorLayout");
   tl.def(py::init([](string s) {
@@ -439,6 +510,17 @@ void ExposeTensor(py::module &m) {
       R"code(
       Returns the address of the first element of tensor.
       )code")
+    .def("_expose_dlpack_capsule", &TensorToDLPackCapsule<CPUBackend>,
+      "owner"_a = py::none(),
+      R"code(
+      Returns a DLPack capsule that is a view of the memory of this TensorCPU, without a copy.
+
+      The memory is not owned by the capsule and must be kept valid by the caller as long as
+      the consumer of the capsule uses it.
+
+      owner : object
+            Python object kept alive until the consumer of the capsule releases it.
+      )code")
     .def_property("__array_interface__", &ArrayInterfaceRepr<CPUBackend>, nullptr,
       R"code(
       Returns Array Interface representation of TensorCPU.
@@ -563,6 +645,17 @@ void ExposeTensor(py::module &m) {
       R"code(
       Returns the address of the first element of tensor.
       )code")
+    .def("_expose_dlpack_capsule", &TensorToDLPackCapsule<GPUBackend>,
+      "owner"_a = py::none(),
+      R"code(
+      Returns a DLPack capsule that is a view of the memory of this TensorGPU, without a copy.
+
+      The memory is not owned by the capsule and must be kept valid by the caller as long as
+      the consumer of the capsule uses it.
+
+      owner : object
+            Python object kept alive until the consumer of the capsule releases it.
+      )code")
     .def_property("__cuda_array_interface__",  &ArrayInterfaceRepr<GPUBackend>, nullptr,
       R"code(
       Returns CUDA Array Interface (Version 2) representation of TensorGPU.
@@ -820,6 +913,12 @@ void ExposeTensorList(py::module &m) {
       R"code(
       Shape of the tensor list.
       )code")
+    .def("_shapes_and_offsets", &py_shapes_and_offsets<CPUBackend>,
+      R"code(
+      Returns a tuple of NumPy arrays: the shapes of the samples, of shape
+      ``(num_samples, sample_dim)``, and the offsets (in elements) of the samples in the buffer
+      the `TensorList` is copied to with ``copy_to_external``, of ``num_samples + 1`` elements.
+      )code")
     .def("at", [](TensorList<CPUBackend> &tl, Index id) -> py::array {
           DALI_ENFORCE(IsValidType(tl.type()), "Cannot produce "
               "buffer info for tensor w/ invalid type.");
@@ -1061,6 +1160,12 @@ void ExposeTensorList(py::module &m) {
       R"code(
       Shape of the tensor list.
       )code")
+    .def("_shapes_and_offsets", &py_shapes_and_offsets<GPUBackend>,
+      R"code(
+      Returns a tuple of NumPy arrays: the shapes of the samples, of shape
+      ``(num_samples, sample_dim)``, and the offsets (in elements) of the samples in the buffer
+      the `TensorList` is copied to with ``copy_to_external``, of ``num_samples + 1`` elements.
+      )code")
     .def("__len__", [](TensorList<GPUBackend> &t) {
           return t.num_samples();
         })
@@ -1288,6 +1393,9 @@ py::dict ReaderMetaToDict(const ReaderMeta &meta) {
   d["shard_id"] = meta.shard_id;
   d["pad_last_batch"] = meta.pad_last_batch;
   d["stick_to_shard"] = meta.stick_to_shard;
+  d["read_throughput"] = meta.read_throughput;
+  d["sequential_read_ratio"] = meta.sequential_read_ratio;
+  d["shuffle_displacement"] = meta.shuffle_displacement;
   return d;
 }
 
@@ -1332,196 +1440,18 @@ void FeedPipeline(Pipeline *p, const string &name, py::list list, AccessOrder or
   p->SetExternalInput(name, tv, order, sync, use_copy_kernel);
 }
 
-PYBIND11_MODULE(backend_impl, m) {
-  dali::InitOperatorsLib();
-  m.doc() = "Python bindings for the C++ portions of DALI";
-
-  // DALI Init function
-  m.def("Init", &DALIInit);
-
-  ExposeBufferPolicyFunctions(m);
-
-  m.def("LoadLibrary", &PluginManager::LoadLibrary,
-    py::arg("lib_path"),
-    py::arg("global_symbols") = false);
-
-  m.def("GetCxx11AbiFlag", &GetCxx11AbiFlag);
-
-  m.def("IsDriverInitialized", [] {
-    // we just want to check if cuda has been loaded already
-    if (dlopen("libcuda.so", RTLD_NOLOAD | RTLD_NOW) ||
-        dlopen("libcuda.so.1", RTLD_NOLOAD | RTLD_NOW)) {
-      int place_holder = -1;
-      // call cuDeviceGetCount only if cuda is loaded, if not there is not point in calling
-      // a check that would load it
-      return CUDA_SUCCESS == cuDeviceGetCount(&place_holder);
-    }
-    return false;
-  });
-
-  m.def("GetCudaVersion", [] {
-    int version = -1;
-    auto ret = cudaDriverGetVersion(&version);
-    if (ret != cudaSuccess) {
-      return -1;
-    } else {
-      return version;
-    }
-  });
-
-  m.def("GetCufftVersion", [] {
-    int ret = -1;
-    try {
-      // we don't want to throw when it is not available, just return -1
-      ret = GetCufftVersion();
-    } catch (const std::runtime_error &) {}
-    return ret;
-  });
-
-  m.def("GetNppVersion", [] {
-    int ret = -1;
-    try {
-      // we don't want to throw when it is not available, just return -1
-      ret = GetNppVersion();
-    } catch (const std::runtime_error &) {}
-    return ret;
-  });
-
-  m.def("GetNvjpegVersion", [] {
-    int ret = -1;
-    try {
-      // we don't want to throw when it is not available, just return -1
-      ret = GetNvjpegVersion();
-    } catch (const std::runtime_error &) {}
-    return ret;
-  });
-
-#if SHM_WRAPPER_ENABLED
-
-  py::class_<SharedMem>(m, "SharedMem")
-      .def(py::init<int, int>())
-      .def_property_readonly("size", &SharedMem::size)
-      .def_property_readonly("handle", &SharedMem::handle)
-      .def("buf",
-           [](SharedMem *shm) {
-             if (shm == nullptr) {
-               throw py::value_error("Cannot create buffer - no shared memory object provided");
-             }
-             auto *ptr = shm->get_raw_ptr();
-             if (ptr == nullptr) {
-               throw py::value_error("Cannot create buffer - no memory has been mapped");
-             }
-             return py::memoryview::from_buffer(ptr, {shm->size()}, {sizeof(uint8_t)});
-           })
-      .def("resize", &SharedMem::resize)
-      .def("close_handle", &SharedMem::close_handle)
-      .def("close", &SharedMem::close);
-
-#endif
-
-  // Types
-  py::module types_m = m.def_submodule("types");
-  types_m.doc() = "Datatypes and options used by DALI";
-  types_m.add_object("CPU_ONLY_DEVICE_ID", PyLong_FromLong(CPU_ONLY_DEVICE_ID));
-
-  // DALIDataType
-  py::enum_<DALIDataType> dali_data_type(
-      types_m, "DALIDataType", "Object representing the data type of a Tensor.\n<SPHINX_IGNORE>");
-  dali_data_type
-    .value("NO_TYPE",       DALI_NO_TYPE)
-    .value("UINT8",         DALI_UINT8)
-    .value("UINT16",        DALI_UINT16)
-    .value("UINT32",        DALI_UINT32)
-    .value("UINT64",        DALI_UINT64)
-    .value("INT8",          DALI_INT8)
-    .value("INT16",         DALI_INT16)
-    .value("INT32",         DALI_INT32)
-    .value("INT64",         DALI_INT64)
-    .value("FLOAT16",       DALI_FLOAT16)
-    .value("FLOAT",         DALI_FLOAT)
-    .value("FLOAT64",       DALI_FLOAT64)
-    .value("BOOL",          DALI_BOOL)
-    .value("STRING",        DALI_STRING)
-    .value("_BOOL_VEC",     DALI_BOOL_VEC)
-    .value("_INT32_VEC",    DALI_INT_VEC)
-    .value("_STRING_VEC",   DALI_STRING_VEC)
-    .value("_FLOAT_VEC",    DALI_FLOAT_VEC)
-#ifdef DALI_BUILD_PROTO3
-    .value("FEATURE",       DALI_TF_FEATURE)
-    .value("_FEATURE_VEC",  DALI_TF_FEATURE_VEC)
-    .value("_FEATURE_DICT", DALI_TF_FEATURE_DICT)
-#endif  // DALI_BUILD_PROTO3
-    .value("IMAGE_TYPE",    DALI_IMAGE_TYPE)
-    .value("DATA_TYPE",     DALI_DATA_TYPE)
-    .value("INTERP_TYPE",   DALI_INTERP_TYPE)
-    .value("TENSOR_LAYOUT", DALI_TENSOR_LAYOUT)
-    .value("PYTHON_OBJECT", DALI_PYTHON_OBJECT)
-    .value("_TENSOR_LAYOUT_VEC", DALI_TENSOR_LAYOUT_VEC)
-    .value("_DATA_TYPE_VEC", DALI_DATA_TYPE_VEC)
-    .export_values();
-
-  // Placeholder data type allowing to use legacy __call__ method on dtype (to be deprecated).
-  py::class_<DALIDataTypePlaceholder>(types_m, "_DALIDataType", dali_data_type)
-      .def("__call__",
-           [](DALIDataTypePlaceholder self) {
-             auto deprecation_func =
-                 py::module::import("nvidia.dali.backend").attr("deprecation_warning");
-             deprecation_func("Calling '.dtype()' is deprecated, please use '.dtype' instead");
-             return FormatStrFromType(static_cast<DALIDataType>(self));
-           })
-      .def("__repr__", [](DALIDataTypePlaceholder self) {
-             return py::module::import("nvidia.dali.types")
-                 .attr("DALIDataType")
-                 .attr("__repr__")(static_cast<DALIDataType>(self));
-           })
-      .def("__str__", [](DALIDataTypePlaceholder self) {
-        return py::module::import("nvidia.dali.types")
-            .attr("DALIDataType")
-            .attr("__str__")(static_cast<DALIDataType>(self));
-      });
-
-  // DALIImageType
-  py::enum_<DALIImageType>(types_m, "DALIImageType", "Image type\n<SPHINX_IGNORE>")
-    .value("RGB", DALI_RGB)
-    .value("BGR", DALI_BGR)
-    .value("GRAY", DALI_GRAY)
-    .value("YCbCr", DALI_YCbCr)
-    .value("ANY_DATA", DALI_ANY_DATA)
-    .export_values();
-
-  // DALIInterpType
-  py::enum_<DALIInterpType>(types_m, "DALIInterpType", "Interpolation mode\n<SPHINX_IGNORE>")
-    .value("INTERP_NN", DALI_INTERP_NN)
-    .value("INTERP_LINEAR", DALI_INTERP_LINEAR)
-    .value("INTERP_CUBIC", DALI_INTERP_CUBIC)
-    .value("INTERP_LANCZOS3", DALI_INTERP_LANCZOS3)
-    .value("INTERP_TRIANGULAR", DALI_INTERP_TRIANGULAR)
-    .value("INTERP_GAUSSIAN", DALI_INTERP_GAUSSIAN)
-    .export_values();
-
-  // Operator node
-  py::class_<OpNode>(m, "OpNode")
-    .def("instance_name",
-        [](OpNode* node) {
-          return node->instance_name;
-        })
-    .def("name",
-        [](OpNode* node) {
-          return node->spec.name();
-        });
-
-  // Pipeline class
-  py::class_<Pipeline>(m, "Pipeline")
+void ExposePipeline(py::module &m) {
+  py::class_<Pipeline, PipelinePtr>(m, "Pipeline")
     .def(py::init(
             [](int batch_size, int num_threads, int device_id, int64_t seed = -1,
                 bool pipelined_execution = true, int prefetch_queue_depth = 2,
                 bool async_execution = true, size_t bytes_per_sample_hint = 0,
                 bool set_affinity = false, int max_num_stream = -1,
                 int default_cuda_stream_priority = 0) {
-              return std::make_unique<Pipeline>(
+              return PipelinePtr(new Pipeline(
                       batch_size, num_threads, device_id, seed, pipelined_execution,
                       prefetch_queue_depth, async_execution, bytes_per_sample_hint, set_affinity,
-                      max_num_stream, default_cuda_stream_priority);
+                      max_num_stream, default_cuda_stream_priority));
             }),
         "batch_size"_a,
         "num_threads"_a,
@@ -1543,11 +1473,11 @@ PYBIND11_MODULE(backend_impl, m) {
              bool async_execution = true, size_t bytes_per_sample_hint = 0,
              bool set_affinity = false, int max_num_stream = -1,
              int default_cuda_stream_priority = 0) {
-              return std::make_unique<Pipeline>(
+              return PipelinePtr(new Pipeline(
                                serialized_pipe,
                                batch_size, num_threads, device_id, pipelined_execution,
                                prefetch_queue_depth, async_execution, bytes_per_sample_hint,
-                               set_affinity, max_num_stream, default_cuda_stream_priority);
+                               set_affinity, max_num_stream, default_cuda_stream_priority));
             }),
         "serialized_pipe"_a,
         "batch_size"_a = -1,
@@ -1606,7 +1536,11 @@ PYBIND11_MODULE(backend_impl, m) {
     .def("Outputs",
         [](Pipeline *p) {
           DeviceWorkspace ws;
-          p->Outputs(&ws);
+          {
+            // the executor's threads may need the GIL to run parallel PythonFunctions
+            py::gil_scoped_release interpreter_unlock{};
+            p->Outputs(&ws);
+          }
 
           py::tuple outs(ws.NumOutput());
           for (int i = 0; i < ws.NumOutput(); ++i) {
@@ -1621,7 +1555,11 @@ PYBIND11_MODULE(backend_impl, m) {
     .def("ShareOutputs",
         [](Pipeline *p) {
           DeviceWorkspace ws;
-          p->ShareOutputs(&ws);
+          {
+            // the executor's threads may need the GIL to run parallel PythonFunctions
+            py::gil_scoped_release interpreter_unlock{};
+            p->ShareOutputs(&ws);
+          }
 
           py::tuple outs(ws.NumOutput());
           for (int i = 0; i < ws.NumOutput(); ++i) {
@@ -1727,6 +1665,187 @@ PYBIND11_MODULE(backend_impl, m) {
               "Operator " + op_name + "  not found or does not expose valid metadata.");
           return ReaderMetaToDict(meta);
         });
+}
+
+PYBIND11_MODULE(backend_impl, m) {
+  dali::InitOperatorsLib();
+  m.doc() = "Python bindings for the C++ portions of DALI";
+
+  // DALI Init function
+  m.def("Init", &DALIInit);
+
+  ExposeBufferPolicyFunctions(m);
+
+  m.def("LoadLibrary", &PluginManager::LoadLibrary,
+    py::arg("lib_path"),
+    py::arg("global_symbols") = false);
+
+  m.def("GetCxx11AbiFlag", &GetCxx11AbiFlag);
+
+  m.def("IsDriverInitialized", [] {
+    // we just want to check if cuda has been loaded already
+    if (dlopen("libcuda.so", RTLD_NOLOAD | RTLD_NOW) ||
+        dlopen("libcuda.so.1", RTLD_NOLOAD | RTLD_NOW)) {
+      int place_holder = -1;
+      // call cuDeviceGetCount only if cuda is loaded, if not there is not point in calling
+      // a check that would load it
+      return CUDA_SUCCESS == cuDeviceGetCount(&place_holder);
+    }
+    return false;
+  });
+
+  m.def("GetCudaVersion", [] {
+    int version = -1;
+    auto ret = cudaDriverGetVersion(&version);
+    if (ret != cudaSuccess) {
+      return -1;
+    } else {
+      return version;
+    }
+  });
+
+  m.def("GetCufftVersion", [] {
+    int ret = -1;
+    try {
+      // we don't want to throw when it is not available, just return -1
+      ret = GetCufftVersion();
+    } catch (const std::runtime_error &) {}
+    return ret;
+  });
+
+  m.def("GetNppVersion", [] {
+    int ret = -1;
+    try {
+      // we don't want to throw when it is not available, just return -1
+      ret = GetNppVersion();
+    } catch (const std::runtime_error &) {}
+    return ret;
+  });
+
+  m.def("GetNvjpegVersion", [] {
+    int ret = -1;
+    try {
+      // we don't want to throw when it is not available, just return -1
+      ret = GetNvjpegVersion();
+    } catch (const std::runtime_error &) {}
+    return ret;
+  });
+
+#if SHM_WRAPPER_ENABLED
+
+  py::class_<SharedMem>(m, "SharedMem")
+      .def(py::init<int, int>())
+      .def_property_readonly("size", &SharedMem::size)
+      .def_property_readonly("handle", &SharedMem::handle)
+      .def("buf",
+           [](SharedMem *shm) {
+             if (shm == nullptr) {
+               throw py::value_error("Cannot create buffer - no shared memory object provided");
+             }
+             auto *ptr = shm->get_raw_ptr();
+             if (ptr == nullptr) {
+               throw py::value_error("Cannot create buffer - no memory has been mapped");
+             }
+             return py::memoryview::from_buffer(ptr, {shm->size()}, {sizeof(uint8_t)});
+           })
+      .def("resize", &SharedMem::resize)
+      .def("close_handle", &SharedMem::close_handle)
+      .def("close", &SharedMem::close);
+
+#endif
+
+  // Types
+  py::module types_m = m.def_submodule("types");
+  types_m.doc() = "Datatypes and options used by DALI";
+  types_m.add_object("CPU_ONLY_DEVICE_ID", PyLong_FromLong(CPU_ONLY_DEVICE_ID));
+
+  // DALIDataType
+  py::enum_<DALIDataType> dali_data_type(
+      types_m, "DALIDataType", "Object representing the data type of a Tensor.\n<SPHINX_IGNORE>");
+  dali_data_type
+    .value("NO_TYPE",       DALI_NO_TYPE)
+    .value("UINT8",         DALI_UINT8)
+    .value("UINT16",        DALI_UINT16)
+    .value("UINT32",        DALI_UINT32)
+    .value("UINT64",        DALI_UINT64)
+    .value("INT8",          DALI_INT8)
+    .value("INT16",         DALI_INT16)
+    .value("INT32",         DALI_INT32)
+    .value("INT64",         DALI_INT64)
+    .value("FLOAT16",       DALI_FLOAT16)
+    .value("FLOAT",         DALI_FLOAT)
+    .value("FLOAT64",       DALI_FLOAT64)
+    .value("BOOL",          DALI_BOOL)
+    .value("STRING",        DALI_STRING)
+    .value("_BOOL_VEC",     DALI_BOOL_VEC)
+    .value("_INT32_VEC",    DALI_INT_VEC)
+    .value("_STRING_VEC",   DALI_STRING_VEC)
+    .value("_FLOAT_VEC",    DALI_FLOAT_VEC)
+#ifdef DALI_BUILD_PROTO3
+    .value("FEATURE",       DALI_TF_FEATURE)
+    .value("_FEATURE_VEC",  DALI_TF_FEATURE_VEC)
+    .value("_FEATURE_DICT", DALI_TF_FEATURE_DICT)
+#endif  // DALI_BUILD_PROTO3
+    .value("IMAGE_TYPE",    DALI_IMAGE_TYPE)
+    .value("DATA_TYPE",     DALI_DATA_TYPE)
+    .value("INTERP_TYPE",   DALI_INTERP_TYPE)
+    .value("TENSOR_LAYOUT", DALI_TENSOR_LAYOUT)
+    .value("PYTHON_OBJECT", DALI_PYTHON_OBJECT)
+    .value("_TENSOR_LAYOUT_VEC", DALI_TENSOR_LAYOUT_VEC)
+    .value("_DATA_TYPE_VEC", DALI_DATA_TYPE_VEC)
+    .export_values();
+
+  // Placeholder data type allowing to use legacy __call__ method on dtype (to be deprecated).
+  py::class_<DALIDataTypePlaceholder>(types_m, "_DALIDataType", dali_data_type)
+      .def("__call__",
+           [](DALIDataTypePlaceholder self) {
+             auto deprecation_func =
+                 py::module::import("nvidia.dali.backend").attr("deprecation_warning");
+             deprecation_func("Calling '.dtype()' is deprecated, please use '.dtype' instead");
+             return FormatStrFromType(static_cast<DALIDataType>(self));
+           })
+      .def("__repr__", [](DALIDataTypePlaceholder self) {
+             return py::module::import("nvidia.dali.types")
+                 .attr("DALIDataType")
+                 .attr("__repr__")(static_cast<DALIDataType>(self));
+           })
+      .def("__str__", [](DALIDataTypePlaceholder self) {
+        return py::module::import("nvidia.dali.types")
+            .attr("DALIDataType")
+            .attr("__str__")(static_cast<DALIDataType>(self));
+      });
+
+  // DALIImageType
+  py::enum_<DALIImageType>(types_m, "DALIImageType", "Image type\n<SPHINX_IGNORE>")
+    .value("RGB", DALI_RGB)
+    .value("BGR", DALI_BGR)
+    .value("GRAY", DALI_GRAY)
+    .value("YCbCr", DALI_YCbCr)
+    .value("ANY_DATA", DALI_ANY_DATA)
+    .export_values();
+
+  // DALIInterpType
+  py::enum_<DALIInterpType>(types_m, "DALIInterpType", "Interpolation mode\n<SPHINX_IGNORE>")
+    .value("INTERP_NN", DALI_INTERP_NN)
+    .value("INTERP_LINEAR", DALI_INTERP_LINEAR)
+    .value("INTERP_CUBIC", DALI_INTERP_CUBIC)
+    .value("INTERP_LANCZOS3", DALI_INTERP_LANCZOS3)
+    .value("INTERP_TRIANGULAR", DALI_INTERP_TRIANGULAR)
+    .value("INTERP_GAUSSIAN", DALI_INTERP_GAUSSIAN)
+    .export_values();
+
+  // Operator node
+  py::class_<OpNode>(m, "OpNode")
+    .def("instance_name",
+        [](OpNode* node) {
+          return node->instance_name;
+        })
+    .def("name",
+        [](OpNode* node) {
+          return node->spec.name();
+        });
+
+  ExposePipeline(m);
 
 #define DALI_OPSPEC_ADDARG(T) \
     .def("AddArg", \
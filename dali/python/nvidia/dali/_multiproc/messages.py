@@ -57,16 +57,21 @@ class WorkerArgs:
     `dedicated_task_queue`: Optional[ShmQueue]
         Queue with tasks for sources that are run solely in the given worker.
         If `dedicated_task_queue` is None, `general_task_queue` must be provided.
-    `result_queue`: ShmQueue
-        Queue to report any task done, no matter if dedicated or general.
+    `result_queue`: ShmRing
+        Worker's dedicated ring (of the pool's `ShmRingsQueue`) to report any task done, no matter
+        if dedicated or general.
     `setup_socket` : Optional[socket]
         Python wrapper around Unix socket used to pass file descriptors identifying shared memory chunk to child process.
         None if `start_method='fork'`
     `callback_pickler`
-        Optional custom pickler that was applied to serialize callbacks in `source_descs`"""
+        Optional custom pickler that was applied to serialize callbacks in `source_descs`
+    `control_conn` : Optional[multiprocessing.connection.Connection]
+        Connection kept open for the whole lifetime of a persistent worker, used to register
+        new sources (along with their shared memory chunks) in the running worker and to remove them.
+        None if the sources passed on initialization are the only sources run by the worker."""
 
     def __init__(self, *, worker_id, start_method, source_descs, shm_chunks, general_task_queue,
-                 dedicated_task_queue, result_queue, setup_socket, callback_pickler):
+                 dedicated_task_queue, result_queue, setup_socket, callback_pickler, control_conn=None):
         self.worker_id = worker_id
         self.start_method = start_method
         self.source_descs = source_descs
@@ -76,6 +81,7 @@ class WorkerArgs:
         self.result_queue = result_queue
         self.setup_socket = setup_socket
         self.callback_pickler = callback_pickler
+        self.control_conn = control_conn
 
 
 class SampleRange:
@@ -152,15 +158,59 @@ class TaskArgs:
     def make_batch(cls, batch_args):
         return cls(0, batch_args=batch_args)
 
-    def __init__(self, minibatch_i, sample_range : Optional[SampleRange]=None, batch_args=None):
+    @classmethod
+    def make_inputs(cls, sample_inputs):
+        if len(sample_inputs) <= 0:
+            raise RuntimeError("Cannot schedule empty batch")
+        return cls(0, sample_inputs=sample_inputs)
+
+    def __init__(self, minibatch_i, sample_range : Optional[SampleRange]=None, batch_args=None,
+                 sample_inputs=None, inputs_meta=None):
+        """
+        `sample_inputs` : Optional[list]
+            Inputs of the callback that processes data computed by the pipeline (a parallel
+            PythonFunction), a list with a tuple of arrays for every sample in the minibatch.
+        `inputs_meta` : Optional[nvidia.dali._multiproc.shared_batch.SharedBatchMeta]
+            Set instead of `sample_inputs` when the inputs were written into the shm chunk
+            assigned to the task.
+        """
         self.minibatch_i = minibatch_i
         self.sample_range = sample_range
         self.batch_args = batch_args
-        assert ((self.sample_range is None) != (self.batch_args is None))
+        self.sample_inputs = sample_inputs
+        self.inputs_meta = inputs_meta
+        assert sum(arg is not None for arg in (
+            self.sample_range, self.batch_args, self.sample_inputs, self.inputs_meta)) == 1
 
     def is_sample_mode(self):
         return self.sample_range is not None
 
+    def has_inputs(self):
+        return self.sample_inputs is not None or self.inputs_meta is not None
+
+
+class SampleOutDesc:
+    """
+    Describes the output arrays preallocated in shared memory chunk and passed to the parallel
+    external source callback run with ``sample_out=True``.
+    ----------
+    `is_multioutput` : bool
+        If True, the callback receives a tuple of arrays (one for each output of the external source),
+        otherwise it receives a single array.
+    `shapes` : Optional[List[tuple]]
+        Declared shapes of the arrays in a sample. If None, the shapes are inferred from the first
+        sample computed by the given worker.
+    `dtypes` : Optional[List[numpy.dtype]]
+        Declared types of the arrays in a sample. Must be specified iff `shapes` are specified.
+    """
+
+    def __init__(self, is_multioutput, shapes=None, dtypes=None):
+        assert (shapes is None) == (dtypes is None)
+        assert shapes is None or len(shapes) == len(dtypes)
+        self.is_multioutput = is_multioutput
+        self.shapes = shapes
+        self.dtypes = dtypes
+
 
 class ScheduledTask:
     """Message sent from the pool to a worker to schedule tasks for the worker
@@ -180,13 +230,18 @@ class ScheduledTask:
         is run in batch mode this simply wraps parameters that external source would pass to the
         source in non-parallel mode. In sample mode, it is (part of) the list of nvidia.dali.types.SampleInfo
         produced by the external source.
+    `shrink_to` : Optional[int]
+        If set, the worker should shrink the shm chunk assigned to the task to the given capacity
+        before computing the task. The main process uses it to release the memory of the chunks that
+        grew for a batch much larger than the recent batches.
     """
 
-    def __init__(self, context_i, scheduled_i, epoch_start, task : TaskArgs):
+    def __init__(self, context_i, scheduled_i, epoch_start, task : TaskArgs, shrink_to=None):
         self.context_i = context_i
         self.scheduled_i = scheduled_i
         self.epoch_start = epoch_start
         self.task = task
+        self.shrink_to = shrink_to
 
 
 class CompletedTask:
@@ -19,6 +19,7 @@ import threading
 import warnings
 import multiprocessing
 import copy
+import weakref
 from collections import deque
 from nvidia.dali import backend as _b
 from nvidia.dali import pickling
@@ -26,8 +27,9 @@ from nvidia.dali._utils.external_source_impl import SourceDescription, SourceKin
 from nvidia.dali._multiproc.worker import worker
 from nvidia.dali._multiproc.messages import ScheduledTask, TaskArgs, WorkerArgs
 from nvidia.dali._multiproc.shared_batch import deserialize_batch, import_numpy, read_shm_message, \
-    BufShmChunk, SharedBatchWriter, write_shm_message, _align_up as align_up
-from nvidia.dali._multiproc.shared_queue import ShmQueue
+    BufShmChunk, SharedBatchWriter, SharedBatchMeta, write_shm_message, shrink_shm_chunk, shm_size_class, \
+    _align_up as align_up
+from nvidia.dali._multiproc.shared_queue import ShmQueue, ShmRingsQueue
 
 
 """
@@ -54,8 +56,25 @@ ShmQueue instance with tasks related to any such source.
 If some source gets a dedicated worker assigned, the worker will receive a dedicated queue not shared with
 other workers and will receive all the dedicated tasks there.
 Thus, a worker can have up to two queues with tasks.
-Additionally there is a single result queue shared by all the workers, that is used to notify main
-process about completed tasks being ready for consumption by the main process.
+Additionally there is a single result queue (`ShmRingsQueue`), that is used to notify main
+process about completed tasks being ready for consumption by the main process. It consists of
+lock-free single-producer single-consumer rings, one for each worker, so that the workers
+do not contend for the access to the queue.
+`PythonWorkerPool` runs a persistent `ProcPool` that is not bound to any particular pipeline.
+Pipelines attach their sources to it and get a `WorkerPool` view of the pool, the sources are
+then registered in the already running workers (through connections kept open for
+the lifetime of the workers) instead of starting new processes. When the pipeline is no longer
+used, its sources are removed from the workers and the pool remains ready for the next pipeline.
+Workers grow the shm chunks (in power of two size classes) whenever a minibatch does not fit.
+`ShmChunkManager` tracks the sizes of recently received minibatches and asks a worker to shrink
+an oversized chunk when the chunk is reused, so that a single outlier batch does not inflate the shared
+memory usage for the rest of the run. Optionally, `WorkerPool` can be given a budget for the total
+capacity of the chunks, once it is exceeded, the pool stops prefetching new batches ahead.
+Callbacks that process the data computed by the pipeline (parallel `PythonFunction` operators) get
+their inputs through the same shm chunks: the main process writes the inputs into the chunk assigned
+to the task (with `SharedBatchWriter`, just as the workers write the results) and places the task
+description right after them. The worker copies the inputs out of the chunk before it writes
+the results there.
 """
 
 
@@ -66,7 +85,8 @@ class ShmChunkManager:
        Each ExternalSource callback gets its own buffer, first dimension is cycled
        over when scheduling and receiving consecutive batches, second dimension is used to separate minibatches."""
 
-    def __init__(self, shm_pool : List[BufShmChunk], queue_depth, initial_chunk_capacity, num_minibatches):
+    def __init__(self, shm_pool : List[BufShmChunk], queue_depth, initial_chunk_capacity, num_minibatches,
+                 shrink_window=None):
         if queue_depth < 1:
             raise RuntimeError("Prefetch queue must have at least one element")
         if initial_chunk_capacity < 1:
@@ -79,6 +99,10 @@ class ShmChunkManager:
             [self.allocate_chunk(self.initial_chunk_capacity) for _ in range(self.num_minibatches)]
             for _ in range(self.queue_depth)]
         self.chunks_ids = [chunk_id for dest_buf in self.chunks_ids_by_pos for chunk_id in dest_buf]
+        # Sizes of the most recently received minibatches, the largest of them (the high-water mark)
+        # determines how much the chunks can be shrunk. By default, the window spans the last
+        # two cycles over all the chunks.
+        self.recent_sizes = deque(maxlen=shrink_window or 2 * self.num_chunks)
 
     def allocate_chunk(self, capacity):
         chunk_id = len(self.shm_pool)
@@ -100,10 +124,45 @@ class ShmChunkManager:
     def get_chunks(self):
         return [self.get_chunk_by_id(chunk_id) for chunk_id in self.chunks_ids]
 
+    def detach_chunks(self):
+        """Moves the chunks out of the common `shm_pool`, so that the chunks live as long as
+        the manager does, while the ids of the chunks are not reused by other managers."""
+        shm_pool = self.shm_pool
+        self.shm_pool = {chunk_id: shm_pool[chunk_id] for chunk_id in self.chunks_ids}
+        for chunk_id in self.chunks_ids:
+            shm_pool[chunk_id] = None
+
     @property
     def num_chunks(self):
         return len(self.chunks_ids)
 
+    @property
+    def capacity(self):
+        """Total capacity of the chunks as last reported by the workers."""
+        return sum(self.get_chunk_by_id(chunk_id).capacity for chunk_id in self.chunks_ids)
+
+    @property
+    def high_water_mark(self):
+        return max(self.recent_sizes, default=0)
+
+    def record_usage(self, used_size):
+        """Records the number of bytes a worker used in a chunk to pass a minibatch."""
+        self.recent_sizes.append(used_size)
+
+    def get_shrink_target(self, shm_chunk_id, over_budget=False):
+        """Returns the capacity the chunk should be shrunk to before it is reused for the next task,
+        or None if the chunk should be left as it is. The target is the size class of the high-water mark
+        (but not less than the initial capacity). Normally, the chunk is shrunk only if it is more than
+        twice as large as the target, to avoid resizing the chunks back and forth, but if the memory
+        budget is exceeded any oversized chunk is shrunk."""
+        if len(self.recent_sizes) < self.recent_sizes.maxlen:
+            return None
+        target = max(shm_size_class(self.high_water_mark), self.initial_chunk_capacity)
+        capacity = self.get_chunk_by_id(shm_chunk_id).capacity
+        if capacity > (target if over_budget else 2 * target):
+            return target
+        return None
+
 class CallbackContext:
     """Keeps track of tasks and partially received results for a given source.
     Contains source description, dedicated ShmChunkManager instance and
@@ -293,8 +352,8 @@ class ProcPool:
     starts thread keeping track of running processes and initializes communication.
     """
 
-    def __init__(self, mp, workers_contexts : List[WorkerContext], result_queue : ShmQueue,
-                 general_task_queue : Optional[ShmQueue], callback_pickler):
+    def __init__(self, mp, workers_contexts : List[WorkerContext], result_queue : ShmRingsQueue,
+                 general_task_queue : Optional[ShmQueue], callback_pickler, persistent=False):
         start_method = mp.get_start_method()
         if not workers_contexts:
             raise RuntimeError("Cannot start a pool with no workers")
@@ -314,7 +373,9 @@ class ProcPool:
         self._general_task_queue = general_task_queue
         self._observer = None
         self._processes = []
+        self._control_conns = []
         write_sockets = []
+        workers_conns = []
         try:
             for worker_i, worker_context in enumerate(workers_contexts):
                 if start_method == "fork":
@@ -322,6 +383,12 @@ class ProcPool:
                 else:
                     read_socket, write_socket = socket.socketpair()
                     write_sockets.append(write_socket)
+                if not persistent:
+                    worker_conn = None
+                else:
+                    control_conn, worker_conn = mp.Pipe(duplex=True)
+                    self._control_conns.append(control_conn)
+                    workers_conns.append(worker_conn)
                 process_context = WorkerArgs(
                     worker_id=worker_i,
                     start_method=start_method,
@@ -329,16 +396,22 @@ class ProcPool:
                     shm_chunks=worker_context.shm_chunks,
                     general_task_queue=general_task_queue,
                     dedicated_task_queue=worker_context.dedicated_task_queue,
-                    result_queue=result_queue, setup_socket=read_socket,
-                    callback_pickler=callback_pickler
+                    result_queue=result_queue.rings[worker_i], setup_socket=read_socket,
+                    callback_pickler=callback_pickler, control_conn=worker_conn
                 )
                 process = mp.Process(target=worker, args=(process_context,))
                 self._processes.append(process)
             self._start_processes(mp, start_method, write_sockets)
+        except:
+            for conn in self._control_conns:
+                conn.close()
+            raise
         finally:
             for sock in write_sockets:
                 sock.shutdown(socket.SHUT_RDWR)
                 sock.close()
+            for conn in workers_conns:
+                conn.close()
 
     @classmethod
     def from_contexts(cls, contexts : List[CallbackContext], num_workers, start_method="fork", py_callback_pickler=None):
@@ -361,7 +434,7 @@ class ProcPool:
         scheduled_tasks_upper_bound = sum(context.shm_manager.num_chunks for context in contexts)
         # assure enough space for messages sent to confirm initialization of the workers
         result_queue_capacity = max(scheduled_tasks_upper_bound, num_workers)
-        result_queue = ShmQueue(mp, capacity=result_queue_capacity)
+        result_queue = ShmRingsQueue(num_workers, capacity=result_queue_capacity)
         callback_pickler = None if start_method == "fork" else pickling._CustomPickler.create(py_callback_pickler)
         worker_contexts = create_worker_contexts(mp, contexts, num_workers, callback_pickler)
         instance = None
@@ -377,12 +450,47 @@ class ProcPool:
         except:
             if instance is not None:
                 instance.close()
+            else:
+                result_queue.release()
+            raise
+
+    @classmethod
+    def create_persistent(cls, num_workers, start_method, callback_pickler, max_scheduled_tasks):
+        """Starts workers with no sources, the sources are registered later on with `register_sources`.
+        Each worker gets a dedicated task queue (for stateful sources that may be assigned to it
+        in the future) apart from the general task queue. As the queues cannot grow,
+        `max_scheduled_tasks` limits the total number of shm chunks used by all the sources registered
+        in the pool at the same time."""
+        mp = multiprocessing.get_context(start_method)
+        general_task_queue = ShmQueue(mp, capacity=max_scheduled_tasks)
+        result_queue = ShmRingsQueue(num_workers, capacity=max(max_scheduled_tasks, num_workers))
+        worker_contexts = [
+            WorkerContext({}, ShmQueue(mp, capacity=max_scheduled_tasks), [])
+            for _ in range(num_workers)]
+        instance = None
+        try:
+            instance = cls(mp, worker_contexts, result_queue, general_task_queue, callback_pickler,
+                           persistent=True)
+            general_task_queue.close_handle()
+            result_queue.close_handle()
+            for worker_context in worker_contexts:
+                worker_context.dedicated_task_queue.close_handle()
+            return instance
+        except:
+            if instance is not None:
+                instance.close()
+            else:
+                result_queue.release()
             raise
 
     @property
     def num_workers(self):
         return len(self._workers_contexts)
 
+    @property
+    def is_persistent(self):
+        return bool(self._control_conns)
+
     def pids(self):
         """Get pids of the processes started by this pool.
         """
@@ -393,16 +501,62 @@ class ProcPool:
             return
         self._observer.close()
         self._observer = None
+        self._result_queue.release()
+        for conn in self._control_conns:
+            conn.close()
+
+    def register_sources(self, workers_contexts : List[WorkerContext]):
+        """Passes new sources and corresponding shm chunks to the running persistent workers.
+        Returns once all the workers confirmed the registration."""
+        if self._observer is None:
+            raise RuntimeError("Cannot register sources in the pool that has been closed")
+        assert self.is_persistent and len(workers_contexts) == self.num_workers
+        for conn, process, worker_context in zip(self._control_conns, self._processes, workers_contexts):
+            conn.send(("register", (worker_context.source_descs, worker_context.shm_chunks)))
+            # NOTE the number and order of the handles must match the `shm_chunks` sent above
+            for shm_chunk in worker_context.shm_chunks:
+                multiprocessing.reduction.send_handle(conn, shm_chunk.handle, process.pid)
+        self._sync_control_requests("register")
+
+    def unregister_sources(self, context_ids, shm_chunk_ids):
+        """Removes the sources from the running persistent workers. The caller must make sure
+        there are no pending tasks for the sources."""
+        if self._observer is None:
+            raise RuntimeError("Cannot unregister sources from the pool that has been closed")
+        assert self.is_persistent
+        for conn in self._control_conns:
+            conn.send(("unregister", (context_ids, shm_chunk_ids)))
+        self._sync_control_requests("unregister")
+
+    def _sync_control_requests(self, request):
+        errors = []
+        # wait for all the workers to respond, even if some of them failed,
+        # so that no stale responses are left in the connections
+        for worker_id, conn in enumerate(self._control_conns):
+            try:
+                error = conn.recv()
+            except (EOFError, OSError):
+                error = "The worker process exited."
+            if error is not None:
+                errors.append("Worker {}: {}".format(worker_id, error))
+        if errors:
+            raise RuntimeError("Python workers failed to {} the sources:\n\n{}".format(
+                request, "\n".join(errors)))
 
     def wait_for_res(self):
         if self._observer is None:
             raise RuntimeError("Cannot receive data from the pool that has been closed")
         return self._result_queue.get(None)
 
-    def send(self, tasks : List[Tuple[BufShmChunk, Any]], dedicated_worker_id):
+    def send(self, tasks : List[Tuple[BufShmChunk, Any, int]], dedicated_worker_id):
+        """Sends the tasks to the workers, each task is a tuple of the shm chunk, the message
+        and the offset in the chunk at which the message is written. The message is placed at a non-zero
+        offset only if it follows the inputs of the task and only then the chunk can be resized to fit it."""
         if self._observer is None:
             raise RuntimeError("Cannot send tasks to the pool that has been closed")
-        shm_msg_descs = [write_shm_message(-1, shm_chunk, msg, 0, resize=False) for shm_chunk, msg in tasks]
+        shm_msg_descs = [
+            write_shm_message(-1, shm_chunk, msg, offset, resize=offset > 0)
+            for shm_chunk, msg, offset in tasks]
         if dedicated_worker_id is None:
             if self._general_task_queue.put(shm_msg_descs) is None:
                 raise RuntimeError("Sending tasks to workers failed")
@@ -423,12 +577,12 @@ class ProcPool:
 
     def _send_queue_handles(self, write_sockets):
         pid = os.getppid()
-        all_worker_queues = [self._result_queue]
+        for sock, ring in zip(write_sockets, self._result_queue.rings):
+            multiprocessing.reduction.send_handle(sock, ring.shm.handle, pid)
+            multiprocessing.reduction.send_handle(sock, self._result_queue.wakeup_fd, pid)
         if self._general_task_queue is not None:
-            all_worker_queues.append(self._general_task_queue)
-        for queue in all_worker_queues:
             for sock in write_sockets:
-                multiprocessing.reduction.send_handle(sock, queue.shm.handle, pid)
+                multiprocessing.reduction.send_handle(sock, self._general_task_queue.shm.handle, pid)
         for sock, worker_context in zip(write_sockets, self._workers_contexts):
             if worker_context.dedicated_task_queue is not None:
                 multiprocessing.reduction.send_handle(
@@ -481,7 +635,7 @@ class Observer:
         Queues that worker processes take tasks from. If `close` method is called and none of the processes
         exited abruptly so far, the queues will be used to notify the workers about closing to let the workers
         gracefully exit.
-    `result_queue` : ShmQueue
+    `result_queue` : ShmRingsQueue
         Queue where worker processes report completed tasks. It gets closed along with the worker processes,
         to prevent the main process blocking on waiting for results from the workers.
     """
@@ -542,7 +696,8 @@ class WorkerPool:
     """"Combines worker processes pool with callback contexts, can be used to schedule batches
     to be run on the workers and to receive resulting batches from the workers."""
 
-    def __init__(self, contexts : List[CallbackContext], pool : ProcPool):
+    def __init__(self, contexts : List[CallbackContext], pool : ProcPool, context_ids=None,
+                 shm_chunks_contexts=None, shm_budget=None):
         """
         Parameters
         ----------
@@ -551,20 +706,35 @@ class WorkerPool:
         `pool` : ProcPool
             ProcPool instance enabling basic communication with worker processes, it should be
             initialized with `contexts`.
+        `context_ids` : Optional[List[int]]
+            Ids that identify the `contexts` in the worker processes. If not provided,
+            the indices of the `contexts` in the list are used.
+        `shm_chunks_contexts` : Optional[dict]
+            Mapping of shm chunks ids to the contexts, common for all `WorkerPool` instances that use
+            the same `pool`, so that tasks completed for any of them can be received by any of them.
+        `shm_budget` : Optional[int]
+            Total capacity (in bytes) of the shm chunks, above which no more batches are scheduled
+            ahead for a source that already has a batch scheduled, and oversized chunks are shrunk
+            as soon as they are reused.
         """
         self.contexts = contexts
         self.pool = pool
+        self.shm_budget = shm_budget
+        self.context_ids = context_ids if context_ids is not None else list(range(len(contexts)))
         # shm chunks ids must be unique across the pool and each chunk must belong to exactly one context.
         # Thanks to that callback context can be identified by the id of shm chunk.
-        self.shm_chunks_contexts = {
-             chunk_id: context
+        if shm_chunks_contexts is None:
+            shm_chunks_contexts = {}
+        shm_chunks_contexts.update(
+             (chunk_id, context)
              for context in self.contexts
-             for chunk_id in context.shm_manager.chunks_ids}
+             for chunk_id in context.shm_manager.chunks_ids)
+        self.shm_chunks_contexts = shm_chunks_contexts
 
     @classmethod
     def from_groups(
             cls, groups, keep_alive_queue_size, start_method="fork", num_workers=1,
-            initial_chunk_size=1024 * 1024, py_callback_pickler=None):
+            initial_chunk_size=1024 * 1024, py_callback_pickler=None, shm_budget=None):
         """Creates new WorkerPool instance for given list of ExternalSource groups.
 
         Parameters
@@ -582,14 +752,14 @@ class WorkerPool:
             Number of workers to be created in ProcPool.
         `initial_chunk_size` : int
             Minimal initial size of each shared memory chunk, NOTE it must be enough to accommodate serialized `ScheduledTask` instance.
+        `shm_budget` : Optional[int]
+            Total capacity (in bytes) of the shared memory chunks that, when exceeded, stops the pool from
+            prefetching more batches ahead. None means no limit.
         """
         import_numpy()
-        if len(groups) == 0:
-            raise RuntimeError("Cannot create Python workers pool because there are no callbacks provided")
+        cls.check_groups(groups)
         if num_workers < 1:
             raise RuntimeError("Number of Python workers for parallel ExternalSource must be positive")
-        if any(group.source_desc.kind != SourceKind.CALLABLE and not group.batch for group in groups):
-            raise RuntimeError("Parallel external source with iterator or generator must run in batch mode")
         # iterators and generators are stateful and run always in the same dedicated worker
         num_cbs_dedicated = sum(cls.is_iterable_group(group) for group in groups)
         num_cbs_general = len(groups) - num_cbs_dedicated
@@ -601,17 +771,13 @@ class WorkerPool:
                 "there is less of them than ```py_num_workers```".format(
                     num_cbs_dedicated, "s" if num_cbs_dedicated > 1 else "", num_workers), Warning)
                 num_workers = num_cbs_dedicated
-        source_descs = [group.source_desc for group in groups]
+        source_descs = [cls.get_source_desc(group) for group in groups]
         dedicated_workers = cls.assign_dedicated_workers(groups, num_workers)
         # common list for all the chunks allocated by ShmChunkManagers of all sources in the pipeline
         shm_pool = []
         shm_managers = [
-            ShmChunkManager(
-                shm_pool,
-                keep_alive_queue_size + group.prefetch_queue_depth,
-                initial_chunk_size,
-                1 if group.batch else num_workers
-            ) for group in groups]
+            cls.create_shm_manager(group, shm_pool, keep_alive_queue_size, initial_chunk_size, num_workers)
+            for group in groups]
         contexts = [
             CallbackContext(source_desc, shm_manager, dedicated_worker_id)
             for source_desc, shm_manager, dedicated_worker_id
@@ -623,12 +789,27 @@ class WorkerPool:
             # passed to the workers processes
             for context in contexts:
                 context.shm_manager.close_handles()
-            return cls(contexts, pool)
+            return cls(contexts, pool, shm_budget=shm_budget)
         except:
             if pool is not None:
                 pool.close()
             raise
 
+    @classmethod
+    def check_groups(cls, groups):
+        if len(groups) == 0:
+            raise RuntimeError("Cannot create Python workers pool because there are no callbacks provided")
+        if any(group.source_desc.kind != SourceKind.CALLABLE and not group.batch for group in groups):
+            raise RuntimeError("Parallel external source with iterator or generator must run in batch mode")
+
+    @classmethod
+    def create_shm_manager(cls, group, shm_pool, keep_alive_queue_size, initial_chunk_size, num_workers):
+        return ShmChunkManager(
+            shm_pool,
+            keep_alive_queue_size + group.prefetch_queue_depth,
+            initial_chunk_size,
+            1 if group.batch else num_workers * group.minibatches_per_worker)
+
     @classmethod
     def assign_dedicated_workers(cls, groups, num_workers):
         def get_next_dedicated_worker():
@@ -639,6 +820,14 @@ class WorkerPool:
         next_dedicated_worker = get_next_dedicated_worker()
         return [next(next_dedicated_worker) if cls.is_iterable_group(group) else None for group in groups]
 
+    @classmethod
+    def get_source_desc(cls, group):
+        if group.sample_out_desc is None:
+            return group.source_desc
+        source_desc = copy.copy(group.source_desc)
+        source_desc.sample_out_desc = group.sample_out_desc
+        return source_desc
+
     @classmethod
     def is_iterable_group(cls, group):
         return group.source_desc.kind != SourceKind.CALLABLE
@@ -663,19 +852,33 @@ class WorkerPool:
             # or failed with an error, once user receives batch that raised the exception they should reset
             # the context before scheduling new tasks
             return False
-        minibatches = self._split_work(work_batch)
+        if context.task_queue and self.is_over_budget():
+            # back-pressure, keep only a single batch in flight until oversized chunks are shrunk
+            return False
+        minibatches = self.split_work(work_batch, context.shm_manager.num_minibatches)
         num_minibatches = len(minibatches)
         assert num_minibatches <= context.shm_manager.num_minibatches
         scheduled_i, dst_chunk_i = context.push_scheduled(num_minibatches)
         self._distribute(context_i, scheduled_i, dst_chunk_i, minibatches)
         return True
 
-    def _split_work(self, work_batch : TaskArgs):
-        if not work_batch.is_sample_mode():
+    @classmethod
+    def split_work(cls, work_batch : TaskArgs, num_minibatches):
+        """Splits the batch into at most `num_minibatches` contiguous minibatches of (nearly) equal sizes.
+        The minibatches are put in the task queue shared by the workers, where each worker takes
+        a next minibatch only when it is done with the previous one. Thus, if there are more minibatches
+        than workers, the workers that happen to get cheaper samples take over the remaining parts
+        of the batch, instead of waiting for the slowest worker to finish its fixed share of the batch.
+        """
+        if work_batch.sample_inputs is not None:
+            samples = work_batch.sample_inputs
+            make_minibatch = lambda minibatch_i, part: TaskArgs(minibatch_i, sample_inputs=part)
+        elif work_batch.is_sample_mode():
+            samples = work_batch.sample_range
+            make_minibatch = lambda minibatch_i, part: TaskArgs(minibatch_i, sample_range=part)
+        else:
             return [work_batch]
-        num_minibatches = self.pool.num_workers
-        sample_range = work_batch.sample_range
-        samples_num = len(sample_range)
+        samples_num = len(samples)
         chunk_size = samples_num // num_minibatches
         remainder = samples_num % num_minibatches
         queued_no = 0
@@ -684,22 +887,45 @@ class WorkerPool:
             worker_chunk = chunk_size + (minibatch_i < remainder)
             if worker_chunk == 0:
                 break
-            sample_slice = sample_range[queued_no:queued_no + worker_chunk]
-            minibatch = TaskArgs(minibatch_i, sample_range=sample_slice)
-            minibatches.append(minibatch)
+            minibatches.append(make_minibatch(minibatch_i, samples[queued_no:queued_no + worker_chunk]))
             queued_no += worker_chunk
         return minibatches
 
+    def shm_usage(self):
+        """Total capacity of the shm chunks used by the pool."""
+        return sum(context.shm_manager.capacity for context in self.contexts)
+
+    def is_over_budget(self):
+        return self.shm_budget is not None and self.shm_usage() > self.shm_budget
+
     def _distribute(self, context_i, scheduled_i, dst_chunk_i, minibatches):
         context = self.contexts[context_i]
-        scheduled_tasks = [(
-            context.shm_manager.get_chunk_by_dest(dst_chunk_i, minibatch_i),
-            ScheduledTask(context_i, scheduled_i, context.epoch_start, task))
-            for minibatch_i, task in enumerate(minibatches)
-        ]
+        shm_manager = context.shm_manager
+        over_budget = self.is_over_budget()
+        scheduled_tasks = []
+        for minibatch_i, task in enumerate(minibatches):
+            shm_chunk = shm_manager.get_chunk_by_dest(dst_chunk_i, minibatch_i)
+            shrink_to = shm_manager.get_shrink_target(shm_chunk.shm_chunk_id, over_budget)
+            offset = 0
+            if task.sample_inputs is not None and len(task.sample_inputs[0]) > 0:
+                # the chunk must be shrunk before the inputs are written into it, not by the worker
+                if shrink_to is not None:
+                    shrink_shm_chunk(shm_chunk, shrink_to)
+                    shrink_to = None
+                task, offset = self._write_inputs(shm_chunk, task)
+            scheduled_tasks.append((shm_chunk, ScheduledTask(
+                self.context_ids[context_i], scheduled_i, context.epoch_start, task, shrink_to), offset))
         dedicated_worker_id = context.dedicated_worker_id
         self.pool.send(scheduled_tasks, dedicated_worker_id)
 
+    @classmethod
+    def _write_inputs(cls, shm_chunk, task : TaskArgs):
+        """Writes the inputs of the task into the `shm_chunk`, returns the task that refers to the
+        written inputs and the offset in the chunk past the inputs."""
+        sbw = SharedBatchWriter(shm_chunk, task.sample_inputs)
+        inputs_task = TaskArgs(task.minibatch_i, inputs_meta=SharedBatchMeta.from_writer(sbw))
+        return inputs_task, sbw.total_size
+
     def _sync_and_discard(self, context_i):
         context = self.contexts[context_i]
         assert not context.epoch_synced
@@ -710,6 +936,17 @@ class WorkerPool:
             except StopIteration:
                 pass
 
+    def discard_scheduled(self):
+        """Waits for all the tasks scheduled so far and discards their results."""
+        for context_i, context in enumerate(self.contexts):
+            context.reset()
+            while context.task_queue:
+                try:
+                    self.receive_batch(context_i)
+                except Exception:
+                    pass
+            context.epoch_synced = True
+
     def receive_batch(self, context_i):
         """Returns the next produced batch (in the order of schedule_batch calls) for the
         ``context_i``th callaback.
@@ -740,6 +977,8 @@ class WorkerPool:
             context = self.shm_chunks_contexts[completed_task_meta.shm_chunk_id]
             shm_chunk = context.shm_manager.get_chunk_by_id(completed_task_meta.shm_chunk_id)
             completed_task = read_shm_message(shm_chunk, completed_task_meta)
+            # the completed task description is placed right after the minibatch
+            context.shm_manager.record_usage(completed_task_meta.offset + completed_task_meta.num_bytes)
             context.process_task(shm_chunk, completed_task)
 
     def pids(self):
@@ -756,3 +995,188 @@ class WorkerPool:
 
     def close(self):
         self.pool.close()
+
+
+class _AttachedWorkerPool(WorkerPool):
+    """`WorkerPool` view of the `PythonWorkerPool` with the sources of a single pipeline.
+    Closing it removes the sources from the workers, but leaves the workers running."""
+
+    def __init__(self, worker_pool, contexts, context_ids):
+        super().__init__(contexts, worker_pool._proc_pool, context_ids, worker_pool._shm_chunks_contexts,
+                         worker_pool._shm_budget)
+        self._worker_pool = worker_pool
+
+    def shm_usage(self):
+        if self._worker_pool is None:
+            return super().shm_usage()
+        # the budget is common for all the pipelines attached to the pool
+        return self._worker_pool.shm_usage()
+
+    def close(self):
+        if self._worker_pool is None:
+            return
+        worker_pool, self._worker_pool = self._worker_pool, None
+        worker_pool._detach(self)
+
+
+class PythonWorkerPool:
+    """Pool of Python worker processes that run callbacks of parallel ``ExternalSource`` operators
+    and that can be shared by many pipelines.
+
+    Starting the workers is costly, especially with ``spawn`` start method. A pipeline created with
+    ``py_worker_pool`` set to an instance of this class does not start its own workers. Instead,
+    when its workers would be started, the pipeline registers its callbacks in the running workers
+    of the pool and removes them once the pipeline is garbage collected. Thus, the same processes
+    can serve any number of pipelines, created at the same time or one after another.
+
+    The callbacks are always serialized when registered in the workers (regardless of the
+    ``start_method``), so they must be picklable with the ``py_callback_pickler``.
+    Pipelines sharing the pool must be run from the same thread.
+
+    Parameters
+    ----------
+    `num_workers` : int, default = 1
+        Number of the worker processes.
+    `start_method` : str, default = "fork"
+        Method of starting the worker processes, either ``"fork"`` or ``"spawn"``.
+        The pool using ``"fork"`` must be created before the CUDA context is acquired in the process,
+        but the pipelines can be attached to it at any point.
+    `py_callback_pickler` : module or tuple, default = None
+        Pickler used to serialize the callbacks, see :class:`Pipeline` for the details.
+        If None, DALI's customized pickle is used.
+    `max_scheduled_tasks` : int, default = 1024
+        Limits the total number of shared memory chunks used by all the pipelines attached to
+        the pool at the same time. Each parallel ``ExternalSource`` uses
+        ``(prefetch_queue_depth + keep_alive_queue_size) * num_minibatches`` chunks, where
+        ``num_minibatches`` is 1 in batch mode and ``num_workers * minibatches_per_worker`` otherwise.
+    `shm_budget` : int, optional, default = None
+        Total capacity (in bytes) of shared memory used by all the pipelines attached to the pool.
+        When exceeded, the pipelines stop prefetching batches ahead until the oversized shared memory
+        chunks are shrunk. None means no limit.
+    """
+
+    def __init__(self, num_workers=1, start_method="fork", py_callback_pickler=None,
+                 max_scheduled_tasks=1024, shm_budget=None):
+        import_numpy()
+        if num_workers < 1:
+            raise RuntimeError("Number of Python workers for parallel ExternalSource must be positive")
+        if start_method not in ("fork", "spawn"):
+            raise ValueError("Unsupported start method: {}".format(start_method))
+        self._start_method = start_method
+        self._max_scheduled_tasks = max_scheduled_tasks
+        self._shm_budget = shm_budget
+        if py_callback_pickler is None:
+            py_callback_pickler = pickling._DaliPickle
+        self._callback_pickler = pickling._CustomPickler.create(py_callback_pickler)
+        self._shm_pool = []
+        self._shm_chunks_contexts = {}
+        self._num_attached_chunks = 0
+        self._next_context_id = 0
+        self._next_dedicated_worker = 0
+        self._proc_pool = ProcPool.create_persistent(
+            num_workers, start_method, self._callback_pickler, max_scheduled_tasks)
+        self._finalizer = weakref.finalize(self, lambda pool : pool.close(), self._proc_pool)
+
+    @property
+    def num_workers(self):
+        return self._proc_pool.num_workers
+
+    @property
+    def start_method(self):
+        return self._start_method
+
+    def pids(self):
+        """Get pids of the processes started by this pool.
+        """
+        return self._proc_pool.pids()
+
+    def shm_usage(self):
+        """Total capacity of the shm chunks used by all the attached pipelines."""
+        return sum(shm_chunk.capacity for shm_chunk in self._shm_pool if shm_chunk is not None)
+
+    def close(self):
+        """Stops the worker processes. Pipelines attached to the pool cannot be run afterwards."""
+        self._finalizer()
+
+    def attach(self, groups, keep_alive_queue_size, initial_chunk_size=1024 * 1024) -> WorkerPool:
+        """Registers the callbacks of the given ExternalSource groups in the workers and returns
+        `WorkerPool` that can be used to schedule and receive the batches for the groups.
+        Closing returned `WorkerPool` removes the callbacks from the workers.
+        See `WorkerPool.from_groups` for the description of the parameters.
+        """
+        if not self._finalizer.alive:
+            raise RuntimeError("Cannot attach the sources to the pool that has been closed")
+        WorkerPool.check_groups(groups)
+        num_workers = self.num_workers
+        shm_managers = [
+            WorkerPool.create_shm_manager(
+                group, self._shm_pool, keep_alive_queue_size, initial_chunk_size, num_workers)
+            for group in groups]
+        contexts = [
+            CallbackContext(WorkerPool.get_source_desc(group), shm_manager, self._get_dedicated_worker(group))
+            for group, shm_manager in zip(groups, shm_managers)]
+        context_ids = list(range(self._next_context_id, self._next_context_id + len(contexts)))
+        self._next_context_id += len(contexts)
+        num_chunks = sum(shm_manager.num_chunks for shm_manager in shm_managers)
+        if self._num_attached_chunks + num_chunks > self._max_scheduled_tasks:
+            for shm_manager in shm_managers:
+                shm_manager.detach_chunks()
+            raise RuntimeError(
+                "Cannot attach the sources to the Python workers pool: the sources need {} shared memory "
+                "chunks, but only {} out of {} are available. Consider increasing `max_scheduled_tasks` "
+                "of the pool.".format(num_chunks, self._max_scheduled_tasks - self._num_attached_chunks,
+                                      self._max_scheduled_tasks))
+        try:
+            self._proc_pool.register_sources(self._create_workers_contexts(contexts, context_ids))
+        except:
+            # some workers may have registered the sources while others have not, the pool
+            # cannot be reliably used anymore
+            self.close()
+            raise
+        for shm_manager in shm_managers:
+            shm_manager.close_handles()
+        self._num_attached_chunks += num_chunks
+        return _AttachedWorkerPool(self, contexts, context_ids)
+
+    def _get_dedicated_worker(self, group):
+        if not WorkerPool.is_iterable_group(group):
+            return None
+        worker_id = self._next_dedicated_worker
+        self._next_dedicated_worker = (worker_id + 1) % self.num_workers
+        return worker_id
+
+    def _create_workers_contexts(self, contexts, context_ids):
+        source_descs = []
+        for context in contexts:
+            source_desc = copy.copy(context.source_desc)
+            source_desc.source = self._callback_pickler.dumps(source_desc.source)
+            source_descs.append(source_desc)
+        workers_contexts = []
+        for worker_id in range(self.num_workers):
+            worker_cb_contexts = [
+                i for i, context in enumerate(contexts)
+                if context.dedicated_worker_id is None or context.dedicated_worker_id == worker_id]
+            worker_sources = {context_ids[i] : source_descs[i] for i in worker_cb_contexts}
+            worker_shm_chunks = [
+                shm_chunk
+                for i in worker_cb_contexts
+                    for shm_chunk in contexts[i].shm_manager.get_chunks()]
+            workers_contexts.append(WorkerContext(worker_sources, None, worker_shm_chunks))
+        return workers_contexts
+
+    def _detach(self, worker_pool : WorkerPool):
+        shm_chunks_ids = [
+            chunk_id for context in worker_pool.contexts for chunk_id in context.shm_manager.chunks_ids]
+        try:
+            if self._finalizer.alive:
+                worker_pool.discard_scheduled()
+                self._proc_pool.unregister_sources(worker_pool.context_ids, shm_chunks_ids)
+        except:
+            self.close()
+            raise
+        finally:
+            for chunk_id in shm_chunks_ids:
+                del self._shm_chunks_contexts[chunk_id]
+            for context in worker_pool.contexts:
+                context.shm_manager.detach_chunks()
+            self._num_attached_chunks -= len(shm_chunks_ids)
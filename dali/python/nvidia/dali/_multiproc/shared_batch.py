@@ -1,4 +1,4 @@
-# Copyright (c) 2020-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2020-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -15,6 +15,7 @@
 import os
 from nvidia.dali._multiproc import shared_mem
 from nvidia.dali._multiproc.messages import ShmMessageDesc
+from nvidia.dali._multiproc.struct_message import Structure
 from nvidia.dali._utils.external_source_impl import \
         assert_cpu_sample_data_type as _assert_cpu_sample_data_type, \
         sample_to_numpy as _sample_to_numpy
@@ -117,15 +118,105 @@ class SampleMeta:
 
 
 class SharedBatchMeta:
-    """Describes offset within shared memory chunk and size of serialized list of `SampleMeta` instances"""
+    """Describes offset within shared memory chunk and size of serialized samples' meta data.
 
-    def __init__(self, meta_offset, meta_size):
+    The meta data is either a binary, fixed-layout array of sample descriptions
+    (``meta_format=SharedBatchMeta.BINARY``), or a pickled list of `SampleMeta` instances
+    (``meta_format=SharedBatchMeta.PICKLED``) used as a fallback for samples of irregular nesting."""
+
+    PICKLED = 0
+    BINARY = 1
+
+    def __init__(self, meta_offset, meta_size, meta_format=PICKLED):
         self.meta_offset = meta_offset
         self.meta_size = meta_size
+        self.meta_format = meta_format
 
     @classmethod
     def from_writer(cls, writer):
-        return cls(writer.data_size, writer.meta_data_size)
+        return cls(writer.data_size, writer.meta_data_size, writer.meta_format)
+
+
+class BinaryBatchMetaHeader(Structure):
+    """
+    Header of the binary encoded batch meta data. It is followed by `num_arrays` records
+    of `sample_meta_dtype(max_ndim)` type, one for each array in the batch.
+    ----------
+    `num_arrays` : unsigned long long int
+        Total number of arrays in the batch.
+    `num_fields` : int
+        Number of arrays in a single sample or -1 if samples are plain arrays.
+    `container` : int
+        Identifies the type of the sample if it is a tuple (`_CONTAINER_TUPLE`) or list (`_CONTAINER_LIST`)
+        of arrays.
+    `max_ndim` : int
+        The largest dimensionality of the arrays in the batch, determines the size of the records.
+    """
+    _fields = ("num_arrays", "Q"), ("num_fields", "i"), ("container", "i"), ("max_ndim", "i")
+
+
+_CONTAINER_TUPLE = 0
+_CONTAINER_LIST = 1
+_containers = {tuple: _CONTAINER_TUPLE, list: _CONTAINER_LIST}
+_containers_types = {code: container for container, code in _containers.items()}
+_META_RECORD_ALIGNMENT = 8
+_DTYPE_CODE_LEN = 8
+_sample_meta_dtypes = {}
+_dtypes_by_code = {}
+
+
+def sample_meta_dtype(max_ndim):
+    """NumPy record type used to describe a single array in the binary encoded batch meta data."""
+    max_ndim = max(max_ndim, 1)
+    record_dtype = _sample_meta_dtypes.get(max_ndim)
+    if record_dtype is None:
+        record_dtype = np.dtype([
+            ('offset', '=u8'), ('nbytes', '=u8'), ('ndim', '=u4'), ('dtype', 'S{}'.format(_DTYPE_CODE_LEN)),
+            ('shape', '=u8', (max_ndim,))])
+        _sample_meta_dtypes[max_ndim] = record_dtype
+    return record_dtype
+
+
+def _dtype_from_code(code):
+    dtype = _dtypes_by_code.get(code)
+    if dtype is None:
+        dtype = np.dtype(code.decode())
+        _dtypes_by_code[code] = dtype
+    return dtype
+
+
+def _get_batch_layout(batch):
+    """Checks if the samples in the batch share common, flat structure that can be
+    described with binary meta data. Returns the number of arrays per sample (-1 if samples
+    are plain arrays) and the container type of the sample, or None if the batch needs to fall back
+    to the pickled meta data."""
+    first_sample = batch[0]
+    if not isinstance(first_sample, (tuple, list)):
+        if any(isinstance(sample, (tuple, list)) for sample in batch):
+            return None
+        return -1, _CONTAINER_TUPLE
+    sample_type = type(first_sample)
+    if sample_type not in _containers:
+        return None
+    num_fields = len(first_sample)
+    for sample in batch:
+        if type(sample) is not sample_type or len(sample) != num_fields:
+            return None
+        if any(isinstance(array, (tuple, list)) for array in sample):
+            return None
+    return num_fields, _containers[sample_type]
+
+
+def _has_simple_dtype(np_array):
+    """Checks if the array's type can be described with a dtype code in binary meta data"""
+    dtype = np_array.dtype
+    return dtype.names is None and dtype.subdtype is None and len(dtype.str) <= _DTYPE_CODE_LEN
+
+
+def _flatten_batch(batch, num_fields):
+    if num_fields == -1:
+        return batch
+    return [array for sample in batch for array in sample]
 
 
 def deserialize_sample(buffer: BufShmChunk, sample):
@@ -150,6 +241,31 @@ def deserialize_sample_meta(buffer: BufShmChunk, shared_batch_meta: SharedBatchM
     return samples_meta
 
 
+def deserialize_binary_batch(buffer: BufShmChunk, shared_batch_meta: SharedBatchMeta):
+    """Builds the samples described by binary encoded meta data.
+
+    All the records are decoded at once into Python lists, so the only per-sample work left
+    is the construction of the NumPy views into the shared memory chunk."""
+    sbm = shared_batch_meta
+    buf = buffer.buf
+    header = BinaryBatchMetaHeader().unpack_from(buf, sbm.meta_offset)
+    records_offset = sbm.meta_offset + _align_up(header.get_size(), _META_RECORD_ALIGNMENT)
+    records = np.frombuffer(
+        buf, dtype=sample_meta_dtype(header.max_ndim), count=header.num_arrays, offset=records_offset)
+    offsets = records['offset'].tolist()
+    ndims = records['ndim'].tolist()
+    dtypes = [_dtype_from_code(code) for code in records['dtype'].tolist()]
+    shapes = records['shape'].tolist()
+    arrays = [
+        np.ndarray(shape[:ndim], dtype=dtype, buffer=buf, offset=offset)
+        for offset, ndim, dtype, shape in zip(offsets, ndims, dtypes, shapes)]
+    num_fields = header.num_fields
+    if num_fields == -1:
+        return arrays
+    container = _containers_types[header.container]
+    return [container(arrays[i:i + num_fields]) for i in range(0, len(arrays), num_fields)]
+
+
 def deserialize_batch(buffer: BufShmChunk, shared_batch_meta: SharedBatchMeta):
     """Deserialize samples from the smem buffer and SampleMeta descriptions.
 
@@ -165,6 +281,10 @@ def deserialize_batch(buffer: BufShmChunk, shared_batch_meta: SharedBatchMeta):
     List of (idx, numpy array) or (idx, tuple of numpy arrays)
         List of indexed deserialized samples
     """
+    if shared_batch_meta.meta_size == 0:
+        return []
+    if shared_batch_meta.meta_format == SharedBatchMeta.BINARY:
+        return deserialize_binary_batch(buffer, shared_batch_meta)
     samples = deserialize_sample_meta(buffer, shared_batch_meta)
     return [deserialize_sample(buffer, sample) for sample in samples]
 
@@ -207,11 +327,14 @@ class SharedBatchWriter:
     SAMPLE_ALIGNMENT = 128
     BUFFER_ALIGNMENT = 4096
 
-    def __init__(self, shm_chunk: BufShmChunk, batch, min_trailing_offset=1024*1024):
+    def __init__(self, shm_chunk: BufShmChunk, batch, min_trailing_offset=1024*1024, allocator=None):
         import_numpy()
         self.shm_chunk = shm_chunk
+        # optional ShmSampleAllocator that placed some of the arrays from the `batch` directly in the `shm_chunk`
+        self.allocator = allocator
         self.data_size = 0
         self.meta_data_size = 0
+        self.meta_format = SharedBatchMeta.BINARY
         self.total_size = 0
         # hint how much space should be left in case of the resize at the end of the shm chunk
         # after batch data to accommodate meta data of the task
@@ -220,10 +343,13 @@ class SharedBatchWriter:
 
     def _prepare_samples_meta(self, samples):
         """Calculate metadata and total size of data to be serialized"""
-        data_size = 0
+        data_size = self._get_allocated_size()
 
         def make_meta(np_array):
             nonlocal data_size
+            offset = self._get_allocated_offset(np_array)
+            if offset is not None:
+                return SampleMeta(offset, np_array.shape, np_array.dtype, np_array.nbytes)
             offset = _align_up(data_size, self.SAMPLE_ALIGNMENT)
             data_size = offset + np_array.nbytes
             return SampleMeta(offset, np_array.shape, np_array.dtype, np_array.nbytes)
@@ -231,26 +357,101 @@ class SharedBatchWriter:
         meta = [_apply_to_sample(make_meta, sample) for sample in samples]
         return meta, data_size
 
-    def _add_array_to_batch(self, np_array, meta, memview):
-        sample_size = meta.nbytes
-        offset = meta.offset
-        buffer = memview[offset:(offset + sample_size)]
+    def _prepare_arrays_offsets(self, arrays):
+        """Calculate offsets of the flattened arrays and total size of data to be serialized.
+        Arrays already placed in the shm chunk by the allocator are marked with False in the
+        returned `needs_copy` list."""
+        data_size = self._get_allocated_size()
+        offsets = []
+        needs_copy = []
+        for np_array in arrays:
+            offset = self._get_allocated_offset(np_array)
+            if offset is not None:
+                offsets.append(offset)
+                needs_copy.append(False)
+                continue
+            offset = _align_up(data_size, self.SAMPLE_ALIGNMENT)
+            offsets.append(offset)
+            needs_copy.append(True)
+            data_size = offset + np_array.nbytes
+        return offsets, needs_copy, data_size
+
+    def _get_allocated_size(self):
+        if self.allocator is None:
+            return 0
+        return self.allocator.data_size
+
+    def _get_allocated_offset(self, np_array):
+        if self.allocator is None:
+            return None
+        return self.allocator.get_offset(np_array)
+
+    def _copy_array(self, np_array, offset, memview):
+        buffer = memview[offset:(offset + np_array.nbytes)]
         shared_array = np.ndarray(
             np_array.shape, dtype=np_array.dtype, buffer=buffer)
         shared_array.ravel()[:] = np_array.ravel()[:]
 
+    def _add_array_to_batch(self, np_array, meta, memview):
+        if self._get_allocated_offset(np_array) is None:
+            self._copy_array(np_array, meta.offset, memview)
+
+    def _binary_meta_size(self, arrays):
+        max_ndim = max((np_array.ndim for np_array in arrays), default=0)
+        header_size = _align_up(BinaryBatchMetaHeader().get_size(), _META_RECORD_ALIGNMENT)
+        return header_size + len(arrays) * sample_meta_dtype(max_ndim).itemsize
+
+    def _encode_binary_meta(self, arrays, offsets, layout, memview):
+        num_fields, container = layout
+        max_ndim = max((np_array.ndim for np_array in arrays), default=0)
+        header = BinaryBatchMetaHeader(len(arrays), num_fields, container, max_ndim)
+        header.pack_into(memview, self.data_size)
+        records_offset = self.data_size + _align_up(header.get_size(), _META_RECORD_ALIGNMENT)
+        records = np.ndarray(
+            (len(arrays),), dtype=sample_meta_dtype(max_ndim), buffer=memview, offset=records_offset)
+        records['offset'] = offsets
+        records['nbytes'] = [np_array.nbytes for np_array in arrays]
+        records['ndim'] = [np_array.ndim for np_array in arrays]
+        records['dtype'] = [np_array.dtype.str for np_array in arrays]
+        shapes = records['shape']
+        shapes[:] = 0
+        for shape, np_array in zip(shapes, arrays):
+            shape[:np_array.ndim] = np_array.shape
+
+    def _reserve(self, data_size, meta_data_size):
+        self.meta_data_size = meta_data_size
+        self.data_size = _align_up(data_size, self.SAMPLE_ALIGNMENT)
+        self.total_size = _align_up(self.data_size + self.meta_data_size, self.SAMPLE_ALIGNMENT)
+        if self.shm_chunk.capacity < self.total_size:
+            resize_shm_chunk(self.shm_chunk, self.total_size + self.min_trailing_offset)
+
     def _write_batch(self, batch):
         if not batch:
             return
         batch = [_apply_to_sample(lambda x: _sample_to_numpy(x, _sample_error_msg), sample)
                  for sample in batch]
+        layout = _get_batch_layout(batch)
+        arrays = None if layout is None else _flatten_batch(batch, layout[0])
+        if arrays is None or not all(_has_simple_dtype(np_array) for np_array in arrays):
+            self._write_pickled_batch(batch)
+        else:
+            self._write_binary_batch(arrays, layout)
+
+    def _write_binary_batch(self, arrays, layout):
+        offsets, needs_copy, data_size = self._prepare_arrays_offsets(arrays)
+        self.meta_format = SharedBatchMeta.BINARY
+        self._reserve(data_size, self._binary_meta_size(arrays))
+        memview = self.shm_chunk.buf
+        for np_array, offset, copy in zip(arrays, offsets, needs_copy):
+            if copy:
+                self._copy_array(np_array, offset, memview)
+        self._encode_binary_meta(arrays, offsets, layout, memview)
+
+    def _write_pickled_batch(self, batch):
         meta, data_size = self._prepare_samples_meta(batch)
         serialized_meta = pickle.dumps(meta)
-        self.meta_data_size = len(serialized_meta)
-        self.data_size = _align_up(data_size, self.SAMPLE_ALIGNMENT)
-        self.total_size = _align_up(self.data_size + self.meta_data_size, self.SAMPLE_ALIGNMENT)
-        if self.shm_chunk.capacity < self.total_size:
-            resize_shm_chunk(self.shm_chunk, self.total_size + self.min_trailing_offset)
+        self.meta_format = SharedBatchMeta.PICKLED
+        self._reserve(data_size, len(serialized_meta))
         memview = self.shm_chunk.buf
         for sample, sample_meta in zip(batch, meta):
             _apply_to_sample(self._add_array_to_batch, sample, sample_meta, memview, nest_with_sample=1)
@@ -259,10 +460,85 @@ class SharedBatchWriter:
         buffer[:] = serialized_meta
 
 
+class ShmSampleAllocator:
+    """Hands out writable NumPy arrays placed directly in the shared memory chunk, so that
+    a callback can produce the samples in place and `SharedBatchWriter` does not need to copy them.
+
+    The space for all the samples of a task must be reserved (with `reserve`) before any array
+    is allocated, as resizing the chunk afterwards would invalidate already allocated arrays.
+    """
+
+    def __init__(self, shm_chunk: BufShmChunk, min_trailing_offset=1024*1024):
+        import_numpy()
+        self.shm_chunk = shm_chunk
+        self.min_trailing_offset = min_trailing_offset
+        # end of the data placed in the chunk so far
+        self.data_size = 0
+        self.reserved_size = 0
+        # id of the allocated array -> (array, offset), the array is kept to make sure its id is not reused
+        self._allocated = {}
+
+    def _sample_nbytes(self, shapes, dtypes):
+        sample_nbytes = 0
+        for shape, dtype in zip(shapes, dtypes):
+            nbytes = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+            sample_nbytes += _align_up(nbytes, SharedBatchWriter.SAMPLE_ALIGNMENT)
+        return sample_nbytes
+
+    def reserve(self, shapes, dtypes, num_samples):
+        """Makes sure there is enough space in the chunk to allocate ``num_samples`` samples,
+        each consisting of arrays of given ``shapes`` and ``dtypes``."""
+        if self._allocated:
+            raise RuntimeError("Cannot reserve more space in the shared memory chunk "
+                               "once any of the arrays have been allocated")
+        data_size = _align_up(self.data_size, SharedBatchWriter.SAMPLE_ALIGNMENT)
+        self.reserved_size = data_size + num_samples * self._sample_nbytes(shapes, dtypes)
+        if self.shm_chunk.capacity < self.reserved_size:
+            resize_shm_chunk(self.shm_chunk, self.reserved_size + self.min_trailing_offset)
+
+    def allocate(self, shapes, dtypes):
+        """Returns a list of writable arrays of given ``shapes`` and ``dtypes`` placed in the shm chunk."""
+        memview = self.shm_chunk.buf
+        arrays = []
+        for shape, dtype in zip(shapes, dtypes):
+            dtype = np.dtype(dtype)
+            offset = _align_up(self.data_size, SharedBatchWriter.SAMPLE_ALIGNMENT)
+            nbytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            if offset + nbytes > self.reserved_size:
+                raise RuntimeError("Not enough space reserved in the shared memory chunk to allocate the sample")
+            np_array = np.ndarray(shape, dtype=dtype, buffer=memview, offset=offset)
+            self._allocated[id(np_array)] = (np_array, offset)
+            self.data_size = offset + nbytes
+            arrays.append(np_array)
+        return arrays
+
+    def get_offset(self, np_array):
+        """Returns offset of the ``np_array`` in the shm chunk if it was allocated by the allocator, None otherwise."""
+        allocated = self._allocated.get(id(np_array))
+        if allocated is None or allocated[0] is not np_array:
+            return None
+        return allocated[1]
+
+
+def shm_size_class(capacity):
+    """Rounds up the ``capacity`` to the size class of shm chunks, i.e. to the smallest power of two
+    multiple of `SharedBatchWriter.BUFFER_ALIGNMENT` not less than the ``capacity``.
+    Growing chunks in size classes keeps the number of resizes logarithmic and lets a grown chunk
+    fit other batches of similar size."""
+    alignment = SharedBatchWriter.BUFFER_ALIGNMENT
+    num_blocks = max(1, (capacity + alignment - 1) // alignment)
+    return alignment * (1 << (num_blocks - 1).bit_length())
+
+
 def resize_shm_chunk(shm_chunk, needed_capacity):
-    new_capacity = max(needed_capacity, 2 * shm_chunk.capacity)
-    new_capacity = _align_up(new_capacity, SharedBatchWriter.BUFFER_ALIGNMENT)
-    shm_chunk.resize(new_capacity, trunc=True)
+    shm_chunk.resize(shm_size_class(needed_capacity), trunc=True)
+
+
+def shrink_shm_chunk(shm_chunk, capacity):
+    """Shrinks the chunk to the ``capacity`` if it is larger. It must be called only when
+    the chunk contains no data that may still be in use."""
+    if capacity < shm_chunk.capacity:
+        shm_chunk.resize(capacity, trunc=True)
 
 
 def read_shm_message(shm_chunk : BufShmChunk, shm_message):
@@ -1,4 +1,4 @@
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -14,7 +14,9 @@
 
 from typing import List, Optional
 import os
+import struct
 import threading
+import multiprocessing.connection
 from nvidia.dali._multiproc import shared_mem
 from nvidia.dali._multiproc.messages import Structure, ShmMessageDesc
 from nvidia.dali._multiproc.shared_batch import _align_up as align_up
@@ -177,6 +179,215 @@ class ShmQueue:
         return recv
 
 
+_barrier_lock = threading.Lock()
+
+
+def _memory_barrier():
+    """Acts as a full memory barrier. POSIX requires mutex operations to synchronize memory,
+    which orders the stores and loads of the counters in the shared memory around the call."""
+    _barrier_lock.acquire()
+    _barrier_lock.release()
+
+
+class ShmRing:
+
+    """
+    Lock-free, fixed capacity, single-producer single-consumer ring of fixed size messages placed in shared memory.
+    The producer advances the `tail` and the consumer advances the `head` counter, each of the counters is
+    written only by one side and placed in a separate cache line.
+    The ring does not block, instead the producer writes a byte to the `wakeup_fd` pipe whenever it puts
+    messages into an empty ring - the consumer waits on the pipe if all of its rings are empty.
+    Writing to a full ring fails.
+    """
+
+    MSG_CLASS = ShmMessageDesc
+    ALIGN_UP_MSG = 4
+    ALIGN_UP_BUFFER = 4096
+    COUNTER = struct.Struct("@Q")
+    FLAG = struct.Struct("@i")
+    HEAD_OFFSET = 0
+    TAIL_OFFSET = 64
+    IS_CLOSED_OFFSET = 128
+    META_SIZE = 192
+
+    def __init__(self, capacity, wakeup_fd):
+        self.capacity = capacity
+        dummy_msg = self.MSG_CLASS()
+        self.msg_size = align_up(dummy_msg.get_size(), self.ALIGN_UP_MSG)
+        self.shm_capacity = align_up(self.META_SIZE + capacity * self.msg_size, self.ALIGN_UP_BUFFER)
+        self.shm = shared_mem.SharedMem.allocate(self.shm_capacity)
+        self.wakeup_fd = wakeup_fd
+        self.is_closed = False
+        self._write_counter(self.HEAD_OFFSET, 0)
+        self._write_counter(self.TAIL_OFFSET, 0)
+        self.FLAG.pack_into(self.shm.buf, self.IS_CLOSED_OFFSET, 0)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['shm'] = None
+        state['wakeup_fd'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _read_counter(self, offset):
+        return self.COUNTER.unpack_from(self.shm.buf, offset)[0]
+
+    def _write_counter(self, offset, value):
+        self.COUNTER.pack_into(self.shm.buf, offset, value)
+
+    def _msg_offset(self, i):
+        return self.META_SIZE + (i % self.capacity) * self.msg_size
+
+    def open_shm(self, handle, close_handle=True):
+        try:
+            shm = shared_mem.SharedMem.open(handle, self.shm_capacity)
+            self.shm = shm
+            if close_handle:
+                shm.close_handle()
+        except:
+            if close_handle:
+                os.close(handle)
+            raise
+
+    def set_wakeup_fd(self, wakeup_fd):
+        self.wakeup_fd = wakeup_fd
+
+    def close_handle(self):
+        self.shm.close_handle()
+
+    def is_closed_remotely(self):
+        return self.FLAG.unpack_from(self.shm.buf, self.IS_CLOSED_OFFSET)[0] != 0
+
+    def wakeup(self):
+        try:
+            os.write(self.wakeup_fd, b'\0')
+        except BlockingIOError:
+            # the pipe is full, so the consumer has pending wake up notifications anyway
+            pass
+
+    def close(self):
+        if self.is_closed:
+            return
+        self.is_closed = True
+        self.FLAG.pack_into(self.shm.buf, self.IS_CLOSED_OFFSET, 1)
+        self.wakeup()
+
+    def put(self, msgs : List[MSG_CLASS]) -> Optional[int]:
+        """Called by the producer only."""
+        assert len(msgs), "Cannot write an empty list of messages"
+        if self.is_closed:
+            return
+        if self.is_closed_remotely():
+            self.is_closed = True
+            return
+        tail = self._read_counter(self.TAIL_OFFSET)
+        head = self._read_counter(self.HEAD_OFFSET)
+        if tail - head + len(msgs) > self.capacity:
+            raise RuntimeError("The queue is full")
+        buf = self.shm.buf
+        for i, msg in enumerate(msgs):
+            msg.pack_into(buf, self._msg_offset(tail + i))
+        # make sure the messages are visible before the consumer can see the advanced tail
+        _memory_barrier()
+        self._write_counter(self.TAIL_OFFSET, tail + len(msgs))
+        # order the store of the tail with the load of the head, so that either the consumer sees
+        # the new messages or the producer sees the ring was drained and notifies the consumer
+        _memory_barrier()
+        if self._read_counter(self.HEAD_OFFSET) == tail:
+            self.wakeup()
+        return len(msgs)
+
+    def get_nowait(self) -> List[MSG_CLASS]:
+        """Called by the consumer only. Returns all the messages available in the ring without blocking."""
+        head = self._read_counter(self.HEAD_OFFSET)
+        tail = self._read_counter(self.TAIL_OFFSET)
+        if head == tail:
+            return []
+        _memory_barrier()
+        buf = self.shm.buf
+        recv = []
+        for i in range(head, tail):
+            msg = self.MSG_CLASS()
+            msg.unpack_from(buf, self._msg_offset(i))
+            recv.append(msg)
+        self._write_counter(self.HEAD_OFFSET, tail)
+        _memory_barrier()
+        return recv
+
+
+class ShmRingsQueue:
+
+    """
+    Multiple-producers single-consumer queue made of `ShmRing` instances - one ring for each producer,
+    so that the producers never contend with each other nor with the consumer. Producers share the
+    wake up pipe used to notify the consumer about new messages after it found all the rings empty.
+    The get method blocks until data is available in any of the rings or the queue is closed.
+    Closing the queue or any of the rings (by the producer) closes the whole queue.
+    """
+
+    def __init__(self, num_producers, capacity):
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self.rings = [ShmRing(capacity, self._wakeup_w) for _ in range(num_producers)]
+        self.is_closed = False
+
+    @property
+    def wakeup_fd(self):
+        return self._wakeup_w
+
+    def close_handle(self):
+        for ring in self.rings:
+            ring.close_handle()
+
+    def close(self):
+        if self.is_closed:
+            return
+        self.is_closed = True
+        for ring in self.rings:
+            ring.FLAG.pack_into(ring.shm.buf, ring.IS_CLOSED_OFFSET, 1)
+        # wake up the consumer that may be waiting for the data
+        self.rings[0].wakeup()
+
+    def release(self):
+        """Closes the wake up pipe, the queue cannot be used afterwards."""
+        self.close()
+        if self._wakeup_r is not None:
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            self._wakeup_r = self._wakeup_w = None
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def get(self, num_samples=None) -> Optional[List[ShmMessageDesc]]:
+        """
+        Returns all the messages available in the rings. The call blocks until there are any messages
+        available and returns None iff the queue was closed. `num_samples` is accepted for
+        compatibility with `ShmQueue` and must be None.
+        """
+        assert num_samples is None, "ShmRingsQueue returns all available messages"
+        while True:
+            if self.is_closed:
+                return
+            recv = []
+            for ring in self.rings:
+                if ring.is_closed_remotely():
+                    self.is_closed = True
+                    return
+                recv.extend(ring.get_nowait())
+            if recv:
+                return recv
+            multiprocessing.connection.wait([self._wakeup_r])
+            self._drain_wakeups()
+
+
 class Dispatcher:
 
     """Wrapper around the queue that enables writing to the queue in a separate thread, just in case
@@ -0,0 +1,230 @@
+# Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from nvidia.dali._utils.external_source_impl import SourceKind
+from nvidia.dali._multiproc.worker import get_source_from_desc
+from nvidia.dali._multiproc.messages import ScheduledTask, TaskArgs
+from nvidia.dali._multiproc.shared_batch import assert_valid_data_type, import_numpy
+from nvidia.dali._multiproc.pool import WorkerPool
+
+
+"""
+`ThreadWorkerPool` is a counterpart of `WorkerPool` that runs parallel external source callbacks
+in threads of the main process instead of the worker processes. It is meant for callbacks
+that spend most of the time in code that releases the GIL (such as NumPy, PIL or OpenCV calls).
+The callbacks are neither pickled nor started in a separate interpreter and the arrays they
+return are passed as they are to the pipeline, with no copy through the shared memory.
+Stateless callbacks are run in the threads of a common executor, the work is split into
+minibatches the same way as in `WorkerPool`. Stateful sources (iterators and generators) get
+a dedicated single-thread executor so that consecutive batches are computed in order.
+"""
+
+np = None
+
+
+def _import_numpy():
+    global np
+    import_numpy()
+    import numpy as np
+
+
+class _NumpySampleAllocator:
+    """Allocates the preallocated outputs for the callbacks run with ``sample_out=True``
+    as regular NumPy arrays, it mimics `ShmSampleAllocator` interface."""
+
+    def reserve(self, shapes, dtypes, num_samples):
+        pass
+
+    def allocate(self, shapes, dtypes):
+        return [np.empty(shape, dtype=dtype) for shape, dtype in zip(shapes, dtypes)]
+
+
+class ThreadCallbackContext:
+    """Keeps track of batches scheduled for a given source and of the batches that
+    were recently returned and may still be used by the pipeline."""
+
+    def __init__(self, source_desc, executor, num_minibatches, keep_alive_queue_size):
+        self.source = get_source_from_desc(source_desc)
+        self.executor = executor
+        self.num_minibatches = num_minibatches
+        self.scheduled_i = 0
+        self.epoch_start = 0
+        # futures of the minibatches of consecutive scheduled batches
+        self.task_queue = deque()
+        # The arrays returned by callbacks are passed to the pipeline without copying,
+        # they must outlive the batches in the pipeline's prefetch queue
+        self.keep_alive = deque(maxlen=keep_alive_queue_size)
+        # protects the stateful sources shared by many minibatches (only the sample
+        # layout in `sample_out` mode) from concurrent modification
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Drops all the batches scheduled so far, so that the next batch is computed
+        from the beginning of the new epoch"""
+        self.epoch_start = self.scheduled_i
+        for _, futures in self.task_queue:
+            for future in futures:
+                future.cancel()
+        self.task_queue.clear()
+
+    def is_failed(self):
+        return any(
+            future.done() and not future.cancelled() and future.exception() is not None
+            for _, futures in self.task_queue for future in futures)
+
+    @property
+    def scheduled_ahead(self):
+        return len(self.task_queue)
+
+
+class ThreadWorkerPool:
+    """Runs the parallel external source callbacks in threads, implements the same
+    `schedule_batch`/`receive_batch` contract as `WorkerPool`."""
+
+    def __init__(self, contexts : List[ThreadCallbackContext], executors):
+        self.contexts = contexts
+        self._executors = executors
+
+    @classmethod
+    def from_groups(cls, groups, keep_alive_queue_size, num_workers=1):
+        """Creates new ThreadWorkerPool instance for given list of ExternalSource groups.
+
+        Parameters
+        ----------
+        `groups` : _ExternalSourceGroup list
+            List of external source groups.
+        `keep_alive_queue_size` : int
+            Number of the most recently produced batches that are kept alive
+            (because they might still be referenced further in the pipeline).
+        `num_workers` : int
+            Number of threads that run stateless callbacks.
+        """
+        _import_numpy()
+        WorkerPool.check_groups(groups)
+        if num_workers < 1:
+            raise RuntimeError("Number of Python workers for parallel ExternalSource must be positive")
+        executor = None
+        if not all(cls.is_iterable_group(group) for group in groups):
+            executor = ThreadPoolExecutor(max_workers=num_workers)
+        executors = [executor] if executor is not None else []
+        contexts = []
+        for group in groups:
+            source_desc = WorkerPool.get_source_desc(group)
+            if cls.is_iterable_group(group):
+                context_executor = ThreadPoolExecutor(max_workers=1)
+                executors.append(context_executor)
+                num_minibatches = 1
+            else:
+                context_executor = executor
+                num_minibatches = 1 if group.batch else num_workers * group.minibatches_per_worker
+            contexts.append(ThreadCallbackContext(
+                source_desc, context_executor, num_minibatches, keep_alive_queue_size))
+        return cls(contexts, executors)
+
+    @classmethod
+    def is_iterable_group(cls, group):
+        return group.source_desc.kind != SourceKind.CALLABLE
+
+    def schedule_batch(self, context_i, work_batch : TaskArgs):
+        """Submit `work_batch` to be computed by the threads.
+
+        Parameters
+        ----------
+        `context_i` : int
+            Specifies which callback will be used to run the task, it must be the index corresponding
+            to the order of callbacks passed when constructing ThreadWorkerPool.
+        `work_batch` : TaskArgs
+            Wrapper around parameters produced by the ExternalSource describing the next batch.
+        """
+        if self._executors is None:
+            raise RuntimeError("Cannot schedule tasks in the pool that has been closed")
+        context = self.contexts[context_i]
+        if context.is_failed():
+            # there is no point in scheduling anything for the context that has reached the end of data
+            # or failed with an error, see `WorkerPool.schedule_batch`
+            return False
+        minibatches = WorkerPool.split_work(work_batch, context.num_minibatches)
+        scheduled_i = context.scheduled_i
+        context.scheduled_i += 1
+        futures = [
+            context.executor.submit(
+                self._run_task, context, ScheduledTask(context_i, scheduled_i, context.epoch_start, task))
+            for task in minibatches]
+        context.task_queue.append((scheduled_i, futures))
+        return True
+
+    def _run_task(self, context, scheduled : ScheduledTask):
+        source = context.source
+        allocator = None
+        if getattr(source, "sample_out_desc", None) is not None and scheduled.task.is_sample_mode():
+            allocator = _NumpySampleAllocator()
+            if source.sample_shapes is None:
+                # the first minibatch to run determines the sample layout
+                with context.lock:
+                    return self._validate(source(scheduled, allocator))
+        return self._validate(source(scheduled, allocator))
+
+    @staticmethod
+    def _validate(data_batch):
+        for sample in data_batch:
+            assert_valid_data_type(sample)
+        return data_batch
+
+    def receive_batch(self, context_i):
+        """Returns the next produced batch (in the order of schedule_batch calls) for the
+        ``context_i``th callaback, waiting for the threads to compute it if needed.
+        Exceptions raised by the callback are reraised here.
+
+        Parameters
+        ----------
+        `context_i` : int
+            Specifies which callback you want the results from, ordering corresponds to the order of
+            callbacks passed when constructing the pool.
+        """
+        context = self.contexts[context_i]
+        assert len(context.task_queue) > 0, "No task has been scheduled"
+        _, futures = context.task_queue.popleft()
+        minibatches = [future.result() for future in futures]
+        if len(minibatches) == 1:
+            batch = minibatches[0]
+        else:
+            batch = [sample for minibatch in minibatches for sample in minibatch]
+        context.keep_alive.append(batch)
+        return batch
+
+    def pids(self):
+        """Get pids of the processes running the callbacks, i.e. the current process.
+        """
+        return [os.getpid()]
+
+    def reset(self):
+        for context in self.contexts:
+            context.reset()
+
+    def reset_context(self, context_i):
+        self.contexts[context_i].reset()
+
+    def close(self):
+        if self._executors is None:
+            return
+        executors, self._executors = self._executors, None
+        for context in self.contexts:
+            context.reset()
+        for executor in executors:
+            executor.shutdown(wait=False)
@@ -1,4 +1,4 @@
-# Copyright (c) 2020-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2020-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -19,8 +19,10 @@ import socket
 from collections import deque
 from multiprocessing import reduction
 from nvidia.dali._utils.external_source_impl import SourceKind, _is_generator_function
+from nvidia.dali._utils.external_source_impl import sample_to_numpy as _sample_to_numpy
 from nvidia.dali._multiproc.shared_batch import SharedBatchWriter, SharedBatchMeta, BufShmChunk, \
-    assert_valid_data_type, read_shm_message, write_shm_message
+    ShmSampleAllocator, assert_valid_data_type, read_shm_message, write_shm_message, shrink_shm_chunk, \
+    deserialize_batch, _apply_to_sample, _sample_error_msg
 from nvidia.dali._multiproc.messages import CompletedTask, WorkerArgs, ShmMessageDesc, ScheduledTask
 from nvidia.dali._multiproc.shared_queue import Dispatcher
 
@@ -31,7 +33,7 @@ class _WorkerProcessingResult:
     forwards the result as `CompletedTask` to the main process"""
 
     def __init__(self, scheduled, shm_chunk, data_batch=None, exception=None,
-                 traceback_str=None):
+                 traceback_str=None, allocator=None):
         self.context_i = scheduled.context_i
         self.scheduled_i = scheduled.scheduled_i
         self.minibatch_i = scheduled.task.minibatch_i
@@ -39,10 +41,11 @@ class _WorkerProcessingResult:
         self.data_batch = data_batch
         self.exception = exception
         self.traceback_str = traceback_str
+        self.allocator = allocator
 
     @classmethod
-    def done(cls, scheduled, shm_chunk, data_batch):
-        return cls(scheduled, shm_chunk, data_batch)
+    def done(cls, scheduled, shm_chunk, data_batch, allocator=None):
+        return cls(scheduled, shm_chunk, data_batch, allocator=allocator)
 
     @classmethod
     def failed(cls, scheduled, shm_chunk, exception, traceback_str=None):
@@ -88,14 +91,14 @@ class SharedBatchDispatcher(Dispatcher):
         [1. samples from the batch | 2. batch meta-data | 3. completed task].
         1. Binary encoded samples from the batch (underlying data of numpy arrays),
            aimed to be used as initialization buffers for arrays with no additional copy or deserialization.
-        2. Pickled list of meta-data of each sample, such as the sample's binary data offset in the chunk,
-           a shape and a type of the array.
+        2. Binary encoded meta-data of each sample, such as the sample's binary data offset in the chunk,
+           a shape and a type of the array (pickled list of meta-data if the samples have irregular nesting).
         3. Pickled CompletedTask instance (that contains offset and size of the serialized list from the second point).
         Returns `ShmMessageDesc` instance, that describes shared memory chunk and placement (offset, size) of the
         serialized CompletedTask instance in the chunk.
         """
         shm_chunk = processed_task.shm_chunk
-        sbw = SharedBatchWriter(shm_chunk, processed_task.data_batch)
+        sbw = SharedBatchWriter(shm_chunk, processed_task.data_batch, allocator=processed_task.allocator)
         batch_meta = SharedBatchMeta.from_writer(sbw)
         completed_task = CompletedTask.done(self.worker_id, processed_task, batch_meta)
         return write_shm_message(
@@ -291,7 +294,7 @@ class IterableSource:
         self.source_desc = source_desc
         self._reset_iter(0)
 
-    def __call__(self, scheduled : ScheduledTask):
+    def __call__(self, scheduled : ScheduledTask, allocator=None):
         if self.raised_stop_iter:
             # if iterator runs in "raise" mode and a new epoch started (i.e. source context was reset)
             if self.source_desc.cycle == "raise" and self.epoch_start < scheduled.epoch_start:
@@ -333,15 +336,58 @@ class CallableSource:
 
     def __init__(self, source_desc):
         self.callback = source_desc.source
+        self.sample_out_desc = source_desc.sample_out_desc
+        if self.sample_out_desc is not None:
+            self.sample_shapes = self.sample_out_desc.shapes
+            self.sample_dtypes = self.sample_out_desc.dtypes
 
-    def __call__(self, scheduled : ScheduledTask):
+    def __call__(self, scheduled : ScheduledTask, allocator=None):
         task = scheduled.task
+        if task.has_inputs():
+            # the callback processes the inputs of the whole minibatch at once
+            return self.callback(task.sample_inputs)
         if task.is_sample_mode():
+            if allocator is not None:
+                return self._call_with_sample_out(task.sample_range, allocator)
             data_batch = [self.callback(sample_info) for sample_info in task.sample_range]
         else:
             data_batch = self.callback(*task.batch_args)
         return data_batch
 
+    def _call_with_sample_out(self, sample_range, allocator):
+        """Runs the callback passing it the preallocated output arrays placed in the shm chunk.
+        If the shapes of the outputs were not declared, the first sample computed by the worker
+        is produced by the callback without preallocated outputs and determines the shapes
+        and types of the outputs for all the following samples."""
+        data_batch = []
+        num_samples = len(sample_range)
+        if self.sample_shapes is not None:
+            allocator.reserve(self.sample_shapes, self.sample_dtypes, num_samples)
+        for sample_i, sample_info in enumerate(sample_range):
+            if self.sample_shapes is None:
+                sample = self.callback(sample_info, None)
+                self._set_sample_layout(sample)
+                allocator.reserve(self.sample_shapes, self.sample_dtypes, num_samples - sample_i - 1)
+            else:
+                out = allocator.allocate(self.sample_shapes, self.sample_dtypes)
+                out = tuple(out) if self.sample_out_desc.is_multioutput else out[0]
+                sample = self.callback(sample_info, out)
+                if sample is None:
+                    sample = out
+            data_batch.append(sample)
+        return data_batch
+
+    def _set_sample_layout(self, sample):
+        if sample is None:
+            raise RuntimeError(
+                "The parallel external source callback run with ``sample_out=True`` must return the sample "
+                "when it is called with ``out=None``.")
+        if not self.sample_out_desc.is_multioutput:
+            sample = (sample,)
+        arrays = [_sample_to_numpy(array, _sample_error_msg) for array in sample]
+        self.sample_shapes = [array.shape for array in arrays]
+        self.sample_dtypes = [array.dtype for array in arrays]
+
 
 def get_source_from_desc(source_descs):
     if source_descs.kind == SourceKind.CALLABLE:
@@ -351,6 +397,61 @@ def get_source_from_desc(source_descs):
     raise RuntimeError("Unsupported source type")
 
 
+class SourcesRegistry:
+    """Registers new sources (and shared memory chunks assigned to them) in the running worker
+    and removes the sources that are no longer used. The requests are received from the
+    main process through `control_conn` and handled in a separate thread, so that the worker does
+    not need to be restarted when a new pipeline starts using it. Each request is confirmed
+    by sending back None or the traceback of the error that occurred when handling the request.
+    It is safe to modify the worker's dictionaries of callbacks and chunks in the thread,
+    as the main process schedules tasks for a new source only after the registration is confirmed
+    and removes a source only after all the tasks scheduled for it were completed."""
+
+    def __init__(self, worker_context, control_conn, callback_pickler):
+        self.worker_context = worker_context
+        self.control_conn = control_conn
+        self.callback_pickler = callback_pickler
+        self.thread = threading.Thread(target=self._control_loop, daemon=True)
+        self.thread.start()
+
+    def _control_loop(self):
+        while True:
+            try:
+                command, args = self.control_conn.recv()
+            except (EOFError, OSError):
+                break
+            # file descriptors follow the request, they must be received even if the request fails
+            # to keep the connection in a consistent state
+            handles = [reduction.recv_handle(self.control_conn)
+                       for _ in range(len(args[1]) if command == "register" else 0)]
+            try:
+                if command == "register":
+                    self._register(*args, handles)
+                elif command == "unregister":
+                    self._unregister(*args)
+                else:
+                    raise RuntimeError("Unknown control request: {}".format(command))
+                self.control_conn.send(None)
+            except Exception:
+                self.control_conn.send(traceback.format_exc())
+
+    def _register(self, source_descs, shm_chunks, handles):
+        for shm_chunk, handle in zip(shm_chunks, handles):
+            shm_chunk.open_shm(handle)
+        callbacks = self.worker_context._init_callbacks(source_descs, self.callback_pickler)
+        self.worker_context.shm_chunks.update(
+            (shm_chunk.shm_chunk_id, shm_chunk) for shm_chunk in shm_chunks)
+        self.worker_context.callbacks.update(callbacks)
+
+    def _unregister(self, context_ids, shm_chunk_ids):
+        for context_i in context_ids:
+            self.worker_context.callbacks.pop(context_i, None)
+        for shm_chunk_id in shm_chunk_ids:
+            shm_chunk = self.worker_context.shm_chunks.pop(shm_chunk_id, None)
+            if shm_chunk is not None:
+                shm_chunk.close()
+
+
 class WorkerContext:
     """Initializes structures necessary for a worker process to receive,
     compute and send back tasks."""
@@ -374,10 +475,14 @@ class WorkerContext:
         self.shm_chunks = {shm_chunk.shm_chunk_id : shm_chunk for shm_chunk in shm_chunks}
         self.task_receiver = None
         self.batch_dispatcher = None
+        self.sources_registry = None
         try:
             self.task_receiver = self._init_task_receiver()
             self.batch_dispatcher = SharedBatchDispatcher(
                 worker_args.worker_id, worker_args.result_queue, self.task_receiver.get_recv_queues())
+            if worker_args.control_conn is not None:
+                self.sources_registry = SourcesRegistry(
+                    self, worker_args.control_conn, worker_args.callback_pickler)
         except:
             self.close()
             raise
@@ -394,6 +499,7 @@ class WorkerContext:
 
     def _recv_queue_handles(self, setup_socket):
         self.result_queue.open_shm(reduction.recv_handle(setup_socket))
+        self.result_queue.set_wakeup_fd(reduction.recv_handle(setup_socket))
         if self.general_task_queue is not None:
             self.general_task_queue.open_shm(reduction.recv_handle(setup_socket))
         if self.dedicated_task_queue is not None:
@@ -414,11 +520,31 @@ class WorkerContext:
             return None, None
         shm_chunk = self.shm_chunks[scheduled_meta.shm_chunk_id]
         scheduled = read_shm_message(shm_chunk, scheduled_meta)
+        if scheduled.shrink_to is not None:
+            shrink_shm_chunk(shm_chunk, scheduled.shrink_to)
+        task = scheduled.task
+        if task.inputs_meta is not None:
+            # the results are written to the same chunk, so the inputs cannot be used in place
+            task.sample_inputs = [
+                _apply_to_sample(lambda array: array.copy(), sample)
+                for sample in deserialize_batch(shm_chunk, task.inputs_meta)]
+            task.inputs_meta = None
         return scheduled, shm_chunk
 
     def get_callback(self, scheduled):
         return self.callbacks[scheduled.context_i]
 
+    def get_allocator(self, scheduled, shm_chunk) -> Optional[ShmSampleAllocator]:
+        """
+        Returns allocator for the samples to be written directly into the `shm_chunk` if the callback
+        runs with preallocated outputs, None otherwise.
+        """
+        callback = self.callbacks[scheduled.context_i]
+        if not isinstance(callback, CallableSource) or callback.sample_out_desc is None or \
+                not scheduled.task.is_sample_mode():
+            return None
+        return ShmSampleAllocator(shm_chunk)
+
     def dispatch(self, processed : _WorkerProcessingResult):
         return self.batch_dispatcher.append(processed)
 
@@ -442,14 +568,15 @@ def worker(worker_args : WorkerArgs):
                 break
             callback = worker_context.get_callback(scheduled)
             try:
-                data_batch = callback(scheduled)
+                allocator = worker_context.get_allocator(scheduled, shm_chunk)
+                data_batch = callback(scheduled, allocator)
                 for sample in data_batch:
                     assert_valid_data_type(sample)
             except Exception as exception:
                 tb_str = traceback.format_exc()
                 processed = _WorkerProcessingResult.failed(scheduled, shm_chunk, exception, tb_str)
             else:
-                processed = _WorkerProcessingResult.done(scheduled, shm_chunk, data_batch)
+                processed = _WorkerProcessingResult.done(scheduled, shm_chunk, data_batch, allocator)
             worker_context.dispatch(processed)
     finally:
         worker_context.close()
@@ -41,12 +41,16 @@ class SourceKind(Enum):
 class SourceDescription:
     """Keep the metadata about the source parameter that was originally passed
     """
-    def __init__(self, source, kind: SourceKind, has_inputs: bool, cycle: str, batch_info = False):
+    def __init__(self, source, kind: SourceKind, has_inputs: bool, cycle: str, batch_info = False,
+                 sample_out_desc = None):
         self.source = source
         self.kind = kind
         self.has_inputs = has_inputs
         self.cycle = cycle
         self.batch_info = batch_info
+        # nvidia.dali._multiproc.messages.SampleOutDesc if the parallel callback writes
+        # samples directly into preallocated shared memory
+        self.sample_out_desc = sample_out_desc
 
     def __str__(self) -> str:
         if self.kind == SourceKind.CALLABLE:
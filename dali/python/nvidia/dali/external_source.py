@@ -16,7 +16,8 @@
 from nvidia.dali import backend as _b
 from nvidia.dali import tensors as _tensors
 from nvidia.dali import types as _types
-from nvidia.dali._multiproc.messages import TaskArgs as _TaskArgs, SampleRange as _SampleRange
+from nvidia.dali._multiproc.messages import TaskArgs as _TaskArgs, SampleRange as _SampleRange, \
+        SampleOutDesc as _SampleOutDesc
 import nvidia.dali.types
 from nvidia.dali._utils.external_source_impl import \
         get_callback_from_source as _get_callback_from_source, \
@@ -131,7 +132,7 @@ class _ExternalSourceGroup(object):
     def __init__(
             self, callback, source_desc, is_multioutput, instances=[], *,
             cuda_stream=None, use_copy_kernel=None, batch=True, parallel=False,
-            prefetch_queue_depth=None, batch_info=None):
+            prefetch_queue_depth=None, batch_info=None, sample_out_desc=None, minibatches_per_worker=1):
         self.instances = list(instances)  # we need a copy!
         self.is_multioutput = is_multioutput
         self.callback = callback
@@ -147,9 +148,15 @@ class _ExternalSourceGroup(object):
         self.current_sample = 0
         self.parallel = parallel
         self.prefetch_queue_depth = prefetch_queue_depth
+        self.sample_out_desc = sample_out_desc
+        self.minibatches_per_worker = minibatches_per_worker
         if callback is not None:
             arg_count = _accepted_arg_count(callback)
-            if arg_count not in [0, 1]:
+            if sample_out_desc is not None:
+                if arg_count != 2:
+                    raise TypeError("External source callback run with ``sample_out=True`` must be "
+                                    "a callable with 2 arguments")
+            elif arg_count not in [0, 1]:
                 raise TypeError("External source callback must be a callable with 0 or 1 argument")
             self.accepts_arg = arg_count > 0
 
@@ -178,6 +185,9 @@ class _ExternalSourceGroup(object):
                 epoch_idx)
         else:
             arg = self.current_iter + lead
+        if self.sample_out_desc is not None:
+            # when not run by the parallel pool, there is no preallocated output to pass
+            return (arg, None)
         return (arg,)
 
     def reset_indices(self):
@@ -493,12 +503,41 @@ Keyword Args
 `prefetch_queue_depth` : int, option, default = 1
     When run in ``parallel=True`` mode, specifies the number of batches to be computed in advance and stored
     in the internal buffer, otherwise parameter is ignored.
+
+`sample_out` : bool, optional, default = False
+    Valid only with ``parallel=True`` and ``batch=False``. If set to True, the ``source`` must accept
+    two arguments: :class:`~nvidia.dali.types.SampleInfo` instance and ``out`` - a writable NumPy array
+    (or a tuple of arrays if ``num_outputs`` is specified) placed directly in the shared memory used to
+    pass the samples to the main process. The callback can write the sample into ``out`` and return
+    ``out`` or None, which saves a copy of the sample. If the callback returns any other array, it is
+    copied as usual.
+
+    The shapes of the ``out`` arrays are specified with ``sample_shape`` and their types with ``dtype``.
+    If ``sample_shape`` is not specified, the first sample computed by each worker is produced with
+    ``out=None`` (in that case the callback must return the sample) and its shape and type are used
+    for all the following samples. ``out`` is None as well if the ``source`` is not run by the
+    Python workers (for instance when ``py_num_workers=0``).
+
+`sample_shape` : tuple of int or list of tuples of int, optional
+    Shape of the ``out`` array passed to the ``source`` when ``sample_out`` is set to True.
+    If ``num_outputs`` is specified, it must be a list with a shape for each of the outputs.
+
+`minibatches_per_worker` : int, optional, default = 1
+    Valid only with ``parallel=True`` and ``batch=False``. Specifies into how many minibatches
+    (per worker) a batch is split when computed by the Python workers.
+
+    With the default value, each worker computes a single, equal share of the batch, so
+    a few costly samples may delay the whole batch while the other workers are idle.
+    With greater values, the workers take the consecutive minibatches of the batch one by one,
+    so the idle workers take over the remaining work. Note, that each minibatch uses a separate
+    shared memory chunk, so the memory used by the source grows with the value.
 """
 
     def __init__(
             self, source=None, num_outputs=None, *, cycle=None, layout=None, dtype=None, ndim=None, name=None,
             device="cpu", cuda_stream=None, use_copy_kernel=None, batch=None, parallel=None,
-            no_copy=None, prefetch_queue_depth=None, batch_info=None, **kwargs):
+            no_copy=None, prefetch_queue_depth=None, batch_info=None, sample_out=None, sample_shape=None,
+            minibatches_per_worker=None, **kwargs):
         self._schema = _b.GetSchema("ExternalSource")
         self._spec = _b.OpSpec("ExternalSource")
         self._device = device
@@ -525,6 +564,9 @@ Keyword Args
         self._no_copy = no_copy
         self._prefetch_queue_depth = prefetch_queue_depth
         self._batch_info = batch_info
+        self._sample_out = sample_out
+        self._sample_shape = sample_shape
+        self._minibatches_per_worker = minibatches_per_worker
 
         self._spec.AddArg("device", device)
         for key, value in kwargs.items():
@@ -549,7 +591,8 @@ Keyword Args
     def __call__(
             self, *, source=None, cycle=None, name=None, layout=None, dtype=None, ndim=None, cuda_stream=None,
             use_copy_kernel=None, batch=None, parallel=None, no_copy=None,
-            prefetch_queue_depth=None, batch_info=None, **kwargs):
+            prefetch_queue_depth=None, batch_info=None, sample_out=None, sample_shape=None,
+            minibatches_per_worker=None, **kwargs):
         ""
         from nvidia.dali.ops import _OperatorInstance
         if batch_info is None:
@@ -602,6 +645,37 @@ Keyword Args
         elif self._no_copy is not None:
             raise ValueError("The argument ``no_copy`` already specified in constructor.")
 
+        if sample_out is None:
+            sample_out = self._sample_out or False
+        elif self._sample_out is not None:
+            raise ValueError("The argument ``sample_out`` already specified in constructor.")
+
+        if sample_shape is None:
+            sample_shape = self._sample_shape
+        elif self._sample_shape is not None:
+            raise ValueError("The argument ``sample_shape`` already specified in constructor.")
+
+        if sample_out:
+            if not parallel or batch or source_desc is None or source_desc.kind != _SourceKind.CALLABLE:
+                raise ValueError("The argument ``sample_out`` is valid only for parallel external sources "
+                                 "run with a callable ``source`` in per-sample mode (``batch=False``).")
+        elif sample_shape is not None:
+            raise ValueError("The argument ``sample_shape`` is valid only when ``sample_out`` is set to True.")
+
+        if minibatches_per_worker is None:
+            minibatches_per_worker = self._minibatches_per_worker
+        elif self._minibatches_per_worker is not None:
+            raise ValueError("The argument ``minibatches_per_worker`` already specified in constructor.")
+
+        if minibatches_per_worker is None:
+            minibatches_per_worker = 1
+        elif not parallel or batch:
+            raise ValueError("The argument ``minibatches_per_worker`` is valid only for parallel "
+                             "external sources in per-sample mode (``batch=False``).")
+        elif minibatches_per_worker < 1:
+            raise ValueError("``minibatches_per_worker`` must be a positive integer, got {}.".format(
+                minibatches_per_worker))
+
         if parallel:
             if prefetch_queue_depth is None:
                 prefetch_queue_depth = 1
@@ -669,6 +743,10 @@ Keyword Args
         if name is not None and self._num_outputs is not None:
             raise RuntimeError("``num_outputs`` is not compatible with named ``ExternalSource``.")
 
+        sample_out_desc = None
+        if sample_out:
+            sample_out_desc = _get_sample_out_desc(sample_shape, dtype, self._num_outputs)
+
         group_common_kwargs = {
             'cuda_stream': cuda_stream,
             'use_copy_kernel': use_copy_kernel,
@@ -676,6 +754,8 @@ Keyword Args
             'batch_info': batch_info,
             'parallel': parallel,
             'prefetch_queue_depth': prefetch_queue_depth,
+            'sample_out_desc': sample_out_desc,
+            'minibatches_per_worker': minibatches_per_worker,
         }
 
         if self._num_outputs is not None:
@@ -737,6 +817,22 @@ Keyword Args
     __call__.__doc__ += _args_doc
 
 
+def _get_sample_out_desc(sample_shape, dtype, num_outputs):
+    is_multioutput = num_outputs is not None
+    if sample_shape is None:
+        return _SampleOutDesc(is_multioutput)
+    if dtype is None:
+        raise ValueError("The argument ``dtype`` must be specified along with ``sample_shape``.")
+    num_arrays = num_outputs if is_multioutput else 1
+    shapes = list(sample_shape) if is_multioutput else [sample_shape]
+    dtypes = list(dtype) if isinstance(dtype, (list, tuple)) else [dtype] * num_arrays
+    if len(shapes) != num_arrays or len(dtypes) != num_arrays:
+        raise ValueError("Expected {} shapes and types of the outputs, got ``sample_shape``: {} and "
+                         "``dtype``: {}.".format(num_arrays, sample_shape, dtype))
+    return _SampleOutDesc(
+        is_multioutput, [tuple(shape) for shape in shapes], [_types.to_numpy_type(t) for t in dtypes])
+
+
 def _is_external_source_with_callback(op_instance):
     return isinstance(op_instance._op, ExternalSource) and op_instance._callback is not None
 
@@ -1,4 +1,5 @@
 import sys
+import threading
 import types
 
 def get_submodule(root, path):
@@ -35,3 +36,75 @@ Parameters
                 root, part, m))
         root = m
     return root
+
+
+# Guards the creation of the lazy attributes. It is reentrant, as creating an attribute may
+# access the lazy attributes of the same or other modules.
+_lazy_attributes_lock = threading.RLock()
+
+
+def _lazy_attributes(module):
+    """Returns the dictionary of lazy attributes of the `module`, installing the module-level
+    ``__getattr__`` and ``__dir__`` that resolve them, if needed.
+
+    Unless the module defines its own ``__all__``, ``__getattr__`` also provides ``__all__``
+    listing the public (regular and lazy) attributes, so that ``from module import *`` exports
+    the lazy attributes as well."""
+    lazy_attrs = module.__dict__.get('_lazy_attributes')
+    if lazy_attrs is not None:
+        return lazy_attrs
+    lazy_attrs = {}
+
+    def __getattr__(name):
+        if name == '__all__':
+            return sorted(attr for attr in set(module.__dict__.keys()).union(lazy_attrs.keys())
+                          if not attr.startswith('_'))
+        with _lazy_attributes_lock:
+            # the attribute could have been created by another thread in the meantime
+            if name in module.__dict__:
+                return module.__dict__[name]
+            factory = lazy_attrs.get(name)
+            if factory is None:
+                raise AttributeError(
+                    "module '{}' has no attribute '{}'".format(module.__name__, name))
+            value = factory()
+            setattr(module, name, value)
+            del lazy_attrs[name]
+            return value
+
+    def __dir__():
+        return sorted(set(module.__dict__.keys()).union(lazy_attrs.keys()))
+
+    module._lazy_attributes = lazy_attrs
+    module.__getattr__ = __getattr__
+    module.__dir__ = __dir__
+    return lazy_attrs
+
+
+def add_lazy_attribute(module, name, factory):
+    """Adds an attribute to the `module` that is created with a call to `factory` on the first access.
+Does nothing if the module already has such (lazy or regular) attribute. Returns True if the
+attribute was added.
+
+Parameters
+----------
+    `module`
+        module object
+    `name`
+        name of the attribute
+    `factory`
+        callable with no arguments returning the value of the attribute"""
+    lazy_attrs = _lazy_attributes(module)
+    with _lazy_attributes_lock:
+        if name in module.__dict__ or name in lazy_attrs:
+            return False
+        lazy_attrs[name] = factory
+        explicit_all = module.__dict__.get('__all__')
+        if explicit_all is not None and name not in explicit_all:
+            explicit_all.append(name)
+    return True
+
+
+def has_attribute(module, name):
+    """Checks if the `module` has (lazy or regular) attribute `name`, without creating it."""
+    return name in module.__dict__ or name in module.__dict__.get('_lazy_attributes', {})
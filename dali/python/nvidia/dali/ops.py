@@ -14,6 +14,7 @@
 
 #pylint: disable=no-member
 import ast
+import functools
 import sys
 import threading
 import warnings
@@ -25,6 +26,9 @@ from nvidia.dali import fn as _functional
 from nvidia.dali import internal as _internal
 from nvidia.dali.data_node import DataNode as _DataNode
 from nvidia.dali.pipeline import Pipeline as _Pipeline
+from nvidia.dali._utils.external_source_impl import \
+        SourceDescription as _SourceDescription, SourceKind as _SourceKind
+from nvidia.dali._multiproc.messages import TaskArgs as _TaskArgs
 from nvidia.dali.types import \
         _type_name_convert_to_string, _type_convert_value, _default_converter, \
         _vector_element_type, _bool_types, _int_like_types, _float_types, \
@@ -324,6 +328,71 @@ def _instantiate_constant_node(device, constant):
     return _Constant(device=device, value=constant.value, dtype=constant.dtype, shape=constant.shape)
 
 
+# Schemas of the operators that produce random results, apart from the ones with "random"
+# in the name and the noise generators. They are never merged by the common subexpression elimination.
+_random_schemas = {"BatchPermutation", "CoinFlip", "Jitter", "NormalDistribution", "Uniform"}
+
+
+def _is_random_schema(schema_name):
+    return ("random" in schema_name.lower() or schema_name.startswith("noise__")
+            or schema_name in _random_schemas)
+
+
+def _cse_freeze(value):
+    """Converts the argument value to a hashable key, raises TypeError if it is not possible."""
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_cse_freeze(x) for x in value)
+    if hasattr(value, "dtype") and hasattr(value, "tobytes"):
+        return ("array", str(value.dtype), getattr(value, "shape", ()), value.tobytes())
+    if isinstance(value, float):
+        # distinguishes -0.0 from 0.0 and nan from other nans
+        return (float, value.hex())
+    hash(value)
+    return (type(value), value)
+
+
+def _cse_key(op_instance):
+    """Returns the key identifying the result of the operator instance or None if
+    the instance must not be merged with other instances."""
+    op = op_instance._op
+    schema_name = _schema_name(type(op))
+    op_spec_kwargs = getattr(op, "_spec_kwargs", None)
+    if op_spec_kwargs is None or op.preserve or _is_random_schema(schema_name) \
+            or op_instance._call_args.get("name") is not None:
+        return None
+    # sources (such as readers) are stateful, only the constants can be merged
+    if not op_instance.inputs and schema_name != "Constant":
+        return None
+    try:
+        spec_args = {**op_spec_kwargs, **op_instance._spec_args}
+        args = tuple(sorted((key, _cse_freeze(value)) for key, value in spec_args.items()))
+    except TypeError:
+        return None
+    call_arg_names = tuple(sorted(
+        key for key, value in op_instance._call_args.items() if key != "name" and value is not None))
+    inputs = tuple((inp.name, inp.device) for inp in op_instance.inputs)
+    return schema_name, op.device, args, call_arg_names, inputs
+
+
+def _find_common_instance(op_instance):
+    """Common subexpression elimination: if the current pipeline has it enabled, returns
+    previously created operator instance that computes the same outputs as `op_instance`
+    (or None and registers the `op_instance` for the subsequent lookups)."""
+    pipeline = _Pipeline.current()
+    instances = getattr(pipeline, "_cse_instances", None)
+    if instances is None:
+        return None
+    key = _cse_key(op_instance)
+    if key is None:
+        return None
+    common_instance = instances.get(key)
+    if common_instance is None:
+        instances[key] = op_instance
+    else:
+        pipeline._merged_ops.setdefault(common_instance.id, []).append(op_instance)
+    return common_instance
+
+
 def _separate_kwargs(kwargs):
     """Separates arguments into ones that should go to operator's __init__ and to __call__.
 
@@ -394,6 +463,7 @@ class _OperatorInstance(object):
 
         spec_args, kwargs = _separate_kwargs(kwargs)
         _add_spec_args(op._schema, self._spec, spec_args)
+        self._spec_args = spec_args
 
         call_args = {**self._default_call_args}
         for k, v in kwargs.items():
@@ -403,6 +473,7 @@ class _OperatorInstance(object):
                 raise ValueError("The argument `{}` was already specified in __init__.".format(k))
             call_args[k] = v
 
+        self._call_args = call_args
         name = call_args.get("name", None)
         if name is not None:
             self._name = name
@@ -452,6 +523,11 @@ class _OperatorInstance(object):
                 warnings.simplefilter("default")
                 warnings.warn(msg, DeprecationWarning, stacklevel=2)
 
+        # keep track of the operators defined in the pipeline for its optimization report
+        defined_ops = getattr(_Pipeline.current(), "_defined_ops", None)
+        if defined_ops is not None:
+            defined_ops.append(self)
+
     def check_args(self):
         self._op.schema.CheckArgs(self._spec)
 
@@ -583,6 +659,7 @@ def python_op_factory(name, schema_name = None):
 
             # Store the specified arguments
             _add_spec_args(self._schema, self._spec, kwargs)
+            self._spec_kwargs = kwargs
 
         @property
         def spec(self):
@@ -607,6 +684,14 @@ def python_op_factory(name, schema_name = None):
 
             input_sets = self._build_input_sets(inputs)
 
+            if len(input_sets) == 1:
+                op_instance = _OperatorInstance(input_sets[0], self, **kwargs)
+                common_instance = _find_common_instance(op_instance)
+                if common_instance is not None:
+                    return common_instance.unwrapped_outputs
+                op_instance.generate_outputs()
+                return op_instance.unwrapped_outputs
+
             # Create OperatorInstance for every input set
             op_instances = []
             for input_set in input_sets:
@@ -755,7 +840,30 @@ def _op_name(op_schema_name, api="fn"):
 def _wrap_op(op_class, submodule = [], parent_module=None):
     return _functional._wrap_op(op_class, submodule, parent_module, _docstring_generator_fn(op_class))
 
+def _create_op_class(op_reg_name, submodule, op_name, make_hidden):
+    ops_module = sys.modules[__name__]
+    module = _internal.get_submodule(ops_module, submodule)
+    op_class = python_op_factory(op_name, op_reg_name)
+    op_class.__module__ = module.__name__
+    setattr(module, op_name, op_class)
+    # The operator was inserted into nvidia.dali.ops.hidden module, let's import it here
+    # so it would be usable, but not documented as coming from other module
+    if make_hidden:
+        parent_module = _internal.get_submodule(ops_module, submodule[:-1])
+        setattr(parent_module, op_name, op_class)
+    return op_class
+
+
+def _create_op_fn(submodule, op_name, wrapper_name):
+    op_class = getattr(_internal.get_submodule(sys.modules[__name__], submodule), op_name)
+    _wrap_op(op_class, submodule)
+    return getattr(_internal.get_submodule(_functional, submodule), wrapper_name)
+
+
 def _load_ops():
+    """Registers the operators from the backend. The operator classes (and their fn API wrappers)
+    are not created here, but on the first access to the corresponding module attribute, so that
+    importing the modules does not pay for creating (and documenting) all the operators."""
     global _cpu_ops
     global _gpu_ops
     global _mixed_ops
@@ -770,19 +878,24 @@ def _load_ops():
         make_hidden = schema.IsDocHidden() if schema else False
         _, submodule, op_name = _process_op_name(op_reg_name, make_hidden)
         module = _internal.get_submodule(ops_module, submodule)
-        if not hasattr(module, op_name):
-            op_class = python_op_factory(op_name, op_reg_name)
-            op_class.__module__ = module.__name__
-            setattr(module, op_name, op_class)
-
-            if op_name not in ["ExternalSource"]:
-                _wrap_op(op_class, submodule)
-
-            # The operator was inserted into nvidia.dali.ops.hidden module, let's import it here
-            # so it would be usable, but not documented as coming from other module
+        if _internal.has_attribute(module, op_name):
+            continue
+        create_op_class = functools.partial(
+            _create_op_class, op_reg_name, submodule, op_name, make_hidden)
+        modules = [module]
+        if make_hidden:
+            modules.append(_internal.get_submodule(ops_module, submodule[:-1]))
+        for m in modules:
+            _internal.add_lazy_attribute(m, op_name, create_op_class)
+
+        if op_name not in ["ExternalSource"]:
+            wrapper_name = _functional._to_snake_case(op_name)
+            create_op_fn = functools.partial(_create_op_fn, submodule, op_name, wrapper_name)
+            fn_modules = [_internal.get_submodule(_functional, submodule)]
             if make_hidden:
-                parent_module = _internal.get_submodule(ops_module, submodule[:-1])
-                setattr(parent_module, op_name, op_class)
+                fn_modules.append(_internal.get_submodule(_functional, submodule[:-1]))
+            for m in fn_modules:
+                _internal.add_lazy_attribute(m, wrapper_name, create_op_fn)
 
 def Reload():
     _load_ops()
@@ -893,6 +1006,8 @@ class PythonFunctionBase(metaclass=_DaliOperatorMeta):
         self.function = function
         self.num_outputs = num_outputs
         self._preserve = True
+        # _PythonFunctionGroup if the function is run by the Python workers
+        self._parallel_group = None
 
     @property
     def spec(self):
@@ -915,9 +1030,11 @@ class PythonFunctionBase(metaclass=_DaliOperatorMeta):
         pipeline = _Pipeline.current()
         if pipeline is None:
             _Pipeline._raise_pipeline_required("PythonFunction operator")
-        if pipeline.exec_async or pipeline.exec_pipelined:
+        if self._parallel_group is None and (pipeline.exec_async or pipeline.exec_pipelined):
             raise RuntimeError("PythonFunction can be used only in pipelines with `exec_async` and "
-                               "`exec_pipelined` set to False.")
+                               "`exec_pipelined` set to False, unless it is run with `parallel=True`.")
+        if self._parallel_group is not None and len(inputs) == 0:
+            raise ValueError("PythonFunction with `parallel=True` must have at least one input.")
         if (len(inputs) > self._schema.MaxNumInput() or
                 len(inputs) < self._schema.MinNumInput()):
             raise ValueError(
@@ -956,6 +1073,74 @@ class PythonFunctionBase(metaclass=_DaliOperatorMeta):
             outputs.append(t)
         return outputs[0] if len(outputs) == 1 else outputs
 
+def _is_parallel_python_function(op_instance):
+    return isinstance(op_instance._op, PythonFunctionBase) and op_instance._op._parallel_group is not None
+
+
+class _ParallelPythonFunction:
+    """Runs the function of a parallel PythonFunction in the Python worker. It is called with
+    a list of tuples of input arrays, one for each sample of the minibatch, and returns
+    the list of the output samples."""
+
+    def __init__(self, function, num_outputs, batch_processing):
+        self.function = function
+        self.num_outputs = num_outputs
+        self.batch_processing = batch_processing
+
+    def __call__(self, sample_inputs):
+        if not self.batch_processing:
+            samples = []
+            for inputs in sample_inputs:
+                outputs = self.function(*inputs)
+                PythonFunction.check_outputs(outputs, self.num_outputs)
+                samples.append(outputs)
+            return samples
+        outputs = self.function(*[list(batch) for batch in zip(*sample_inputs)])
+        PythonFunction.check_outputs(outputs, self.num_outputs)
+        if self.num_outputs == 1:
+            return list(outputs)
+        if any(len(batch) != len(sample_inputs) for batch in outputs):
+            raise ValueError("Every output of the Python function operator must have {} samples, got: {}"
+                             .format(len(sample_inputs), [len(batch) for batch in outputs]))
+        return list(zip(*outputs))
+
+
+class _PythonFunctionGroup:
+    """Describes the parallel PythonFunction to the Python workers pool, the same way
+    ``_ExternalSourceGroup`` describes the parallel external source. The instance is the function
+    called by the operator's backend: it passes the inputs to the workers and waits for the results."""
+
+    def __init__(self, function, num_outputs, batch_processing):
+        self.source_desc = _SourceDescription(
+            _ParallelPythonFunction(function, num_outputs, batch_processing), _SourceKind.CALLABLE,
+            has_inputs=True, cycle=None)
+        self.num_outputs = num_outputs
+        # the batch is processed by a single worker only if the function expects the whole batch
+        self.batch = batch_processing
+        self.parallel = True
+        self.prefetch_queue_depth = 1
+        self.minibatches_per_worker = 1
+        self.sample_out_desc = None
+        self._pool = None
+        self._context_i = None
+
+    def attach(self, pool, context_i):
+        self._pool = pool
+        self._context_i = context_i
+
+    def __call__(self, *dlpack_inputs):
+        if self._pool is None:
+            raise RuntimeError("The Python workers that run the parallel PythonFunction were not started.")
+        batches = [[_dlpack_to_array(dlpack) for dlpack in dl_input] for dl_input in dlpack_inputs]
+        if not self._pool.schedule_batch(self._context_i, _TaskArgs.make_inputs(list(zip(*batches)))):
+            raise RuntimeError("Could not schedule the parallel PythonFunction in the Python workers.")
+        samples = self._pool.receive_batch(self._context_i)
+        if self.num_outputs == 1:
+            return [_dlpack_from_array(sample) for sample in samples]
+        return tuple([_dlpack_from_array(sample[i]) for sample in samples]
+                     for i in range(self.num_outputs))
+
+
 def _dlpack_to_array(dlpack):
     return nvidia.dali.python_function_plugin.DLTensorToArray(dlpack)
 
@@ -1045,7 +1230,22 @@ class PythonFunction(PythonFunctionBase):
                                                               lambda t: t.toDlpack(),
                                                               *dlpack_inputs)
 
-    def __init__(self, function, num_outputs=1, device='cpu', batch_processing=False, **kwargs):
+    def __init__(self, function, num_outputs=1, device='cpu', batch_processing=False, parallel=False,
+                 **kwargs):
+        if parallel:
+            if device != 'cpu':
+                raise ValueError("Only CPU PythonFunction can be run with `parallel=True`.")
+            if num_outputs < 1:
+                raise ValueError("PythonFunction with `parallel=True` must have at least one output.")
+            group = _PythonFunctionGroup(function, num_outputs, batch_processing)
+            # the backend passes the whole batch to the group, which splits it between the workers
+            super(PythonFunction, self).__init__(impl_name="DLTensorPythonFunctionImpl",
+                                                 function=group,
+                                                 num_outputs=num_outputs, device=device,
+                                                 synchronize_stream=False,
+                                                 batch_processing=True, **kwargs)
+            self._parallel_group = group
+            return
         if device == 'gpu':
             _setup_cupy()
         func = (lambda *ts: PythonFunction._function_wrapper_cpu(batch_processing, function, num_outputs, *ts))\
@@ -17,7 +17,8 @@ from collections import deque
 from nvidia.dali import backend as b
 from nvidia.dali import types
 from nvidia.dali import internal
-from nvidia.dali._multiproc.pool import WorkerPool
+from nvidia.dali._multiproc.pool import WorkerPool, PythonWorkerPool
+from nvidia.dali._multiproc.thread_pool import ThreadWorkerPool
 from nvidia.dali import pickling as dali_pickle
 from threading import local as tls
 from . import data_node as _data_node
@@ -114,13 +115,20 @@ Parameters
     The pool starts only if there is at least one ExternalSource with ``parallel`` set to True.
     Setting it to 0 disables the pool and all ExternalSource operators fall back to non-parallel
     mode even if ``parallel`` is set to True.
+    PythonFunction operators with ``parallel`` set to True are run by a separate pool of
+    ``py_num_workers`` workers, started the same way. They cannot be used if ``py_num_workers`` is 0.
 `py_start_method` : str, default = "fork"
     Determines how Python workers are started. Supported methods:
 
       * ``"fork"`` - start by forking the process
       * ``"spawn"`` - start a fresh interpreter process
+      * ``"thread"`` - run the callbacks in ``py_num_workers`` threads of the current process
 
     If ``spawn`` method is used, ExternalSource's callback must be picklable.
+    The ``thread`` method is suitable for callbacks that spend most of the time in code that
+    releases the GIL (for example NumPy, PIL or OpenCV calls). The callbacks do not need to be
+    picklable and the arrays they return are passed to the pipeline without copying them through
+    the shared memory.
     In order to use ``fork``, there must be no CUDA contexts acquired at the moment of starting
     the workers. For this reason, if you need to build multiple pipelines that use Python workers,
     you will need to call :meth:`start_py_workers` before calling :meth:`build` of any
@@ -152,6 +160,29 @@ Parameters
     by decorating them with `@dali.pickling.pickle_by_value`. It may be especially useful when
     working with Jupyter notebook to work around the issue of worker process being unable to import
     the callback defined as a global function inside the notebook.
+`py_worker_pool` : PythonWorkerPool, optional, default = None
+    An instance of :class:`nvidia.dali.pipeline.PythonWorkerPool` to run parallel ExternalSource
+    callbacks of the pipeline. If provided, the pipeline does not start its own Python workers,
+    but registers its callbacks in the workers of the pool, which are reused by any pipeline
+    created with the same pool. The callbacks are removed from the pool once the pipeline
+    is garbage collected. It lets you avoid the cost of starting the workers each time
+    a pipeline is rebuilt, for instance in evaluation loops.
+    If set, ``py_num_workers``, ``py_start_method`` and ``py_callback_pickler`` are taken from the pool.
+`py_shm_budget` : int, optional, default = None
+    Limit (in bytes) of the total shared memory used by the Python workers to pass the results
+    of parallel ExternalSource callbacks. The shared memory chunks grow when a batch does not fit
+    into them and are shrunk once they are no longer needed for the recent batches. If the limit is exceeded,
+    the pipeline stops prefetching the batches ahead, until the usage gets back below the limit,
+    instead of exhausting the shared memory. None means no limit. It has no effect if ``py_worker_pool``
+    is specified (use the ``shm_budget`` of the pool instead) or if ``py_start_method`` is ``"thread"``.
+`enable_cse` : bool, optional, default = False
+    Enables common subexpression elimination: identical operator instances (the same operator
+    with the same arguments applied to the same inputs), including the constant nodes
+    with the same values, are merged and computed only once.
+    The operators that produce random results, have side effects or were given an explicit
+    ``name`` are never merged. The instances are merged when the operators are called, so it
+    applies only to the operators called when the pipeline is the current one (in ``define_graph``,
+    in a function decorated with :meth:`pipeline_def` or inside ``with pipeline:`` block).
 """
     def __init__(self, batch_size = -1, num_threads = -1, device_id = -1, seed = -1,
                  exec_pipelined=True, prefetch_queue_depth=2,
@@ -159,7 +190,8 @@ Parameters
                  set_affinity=False, max_streams=-1, default_cuda_stream_priority = 0,
                  *,
                  enable_memory_stats=False, py_num_workers=1, py_start_method="fork",
-                 py_callback_pickler=None):
+                 py_callback_pickler=None, py_worker_pool=None, py_shm_budget=None,
+                 enable_cse=False):
         self._sinks = []
         self._max_batch_size = batch_size
         self._num_threads = num_threads
@@ -189,10 +221,20 @@ Parameters
         self._set_affinity = set_affinity
         self._max_streams = max_streams
         self._default_cuda_stream_priority = default_cuda_stream_priority
+        self._py_worker_pool = py_worker_pool
+        self._py_shm_budget = py_shm_budget
+        if py_worker_pool is not None:
+            if not isinstance(py_worker_pool, PythonWorkerPool):
+                raise TypeError("``py_worker_pool`` must be an instance of PythonWorkerPool, got {}.".format(
+                    type(py_worker_pool)))
+            py_num_workers = py_worker_pool.num_workers
+            py_start_method = py_worker_pool.start_method
+            py_callback_pickler = None
         self._py_num_workers = py_num_workers
         self._py_start_method = py_start_method
-        if py_callback_pickler is not None and py_start_method == "fork":
-            raise ValueError("``py_callback_pickler`` should not be set when 'fork' start method is used.")
+        if py_callback_pickler is not None and py_start_method in ("fork", "thread"):
+            raise ValueError("``py_callback_pickler`` should not be set when '{}' start method is used.".format(
+                py_start_method))
         if py_callback_pickler is None and py_start_method == "spawn":
            py_callback_pickler = dali_pickle._DaliPickle
         self._py_callback_pickler = py_callback_pickler
@@ -202,10 +244,19 @@ Parameters
         self._ops = None
         self._graph_outputs = None
         self._py_pool = None
+        self._py_function_pool = None
+        self._parallel_py_functions = None
         self._input_callbacks = None
         self._parallel_input_callbacks = None
         self._seq_input_callbacks = None
         self._enable_memory_stats = enable_memory_stats
+        # operator instances created in this pipeline, by their arguments and inputs, see `ops._cse_key`
+        self._cse_instances = {} if enable_cse else None
+        # all the operator instances created when the pipeline was the current one
+        self._defined_ops = []
+        # ids of operator instances mapped to the instances merged into them
+        self._merged_ops = {}
+        self._optimization_report = None
         self._prefetch_queue_depth = prefetch_queue_depth
         if type(prefetch_queue_depth) is dict:
             self._exec_separated = True
@@ -347,6 +398,28 @@ Parameters
             raise RuntimeError("Pipeline must be built first.")
         return self._pipe.executor_statistics()
 
+    def optimization_report(self):
+        """Returns the summary of the graph optimizations applied when the pipeline graph was built,
+        describing the effective graph that is executed, as a dictionary.
+
+        Available keys:
+
+            * ``ops`` - list of names of the operators that are run by the pipeline, in the order
+              they are added to the backend pipeline.
+
+            * ``pruned`` - list of names of the operators defined in the pipeline that are not run,
+              because they do not contribute to the pipeline outputs.
+
+            * ``merged`` - dictionary mapping the names of the operators to the lists of names
+              of identical operators merged into them (see ``enable_cse``).
+
+            * ``unused_outputs`` - list of names of the outputs that are computed by the operators,
+              but are neither consumed by other operators nor returned from the pipeline.
+        """
+        if not self._py_graph_built:
+            raise RuntimeError("Pipeline must be built first.")
+        return self._optimization_report
+
     def reader_meta(self, name = None):
         """Returns provided reader metadata as a dictionary. If no name is provided if provides
         a dictionary with data for all readers as {reader_name : meta}
@@ -365,6 +438,17 @@ Parameters
 
         ``stick_to_shard``:    if given reader should stick to its shard
 
+        ``read_throughput``:   number of samples read per second spent on reading them,
+        -1 if nothing was read yet
+
+        ``sequential_read_ratio``: fraction of the samples read right after the preceding sample
+        of the dataset (1 for the sequential reading), -1 if not tracked by the reader
+
+        ``shuffle_displacement``: mean distance between the position of a sample in the epoch and
+        in the dataset, relative to the dataset size (0 for the sequential reading, about 1/3
+        for a random permutation), -1 if not tracked by the reader. The shuffling buffer of
+        ``random_shuffle`` is not accounted for
+
         Parameters
         ----------
         name : str, optional, default = None
@@ -534,46 +618,86 @@ Parameters
 
             _data_node._check(outputs[i])
 
-        # Backtrack to construct the graph
-        op_ids = set()
-        edges = deque(list(outputs) + self._sinks)
+        # Backtrack to discover the ops contributing to the outputs
         ops = []
+        ops_ids = {}
+        producers = []  # for each op, the indices of the ops producing its inputs
+        num_consumers = []
+        edges = deque((edge, None) for edge in list(outputs) + self._sinks)
         while edges:
-            current_edge = edges.popleft()
+            current_edge, consumer_idx = edges.popleft()
             source_op = current_edge.source
             if source_op is None:
                 raise RuntimeError(
                     "Pipeline encountered "
                     "Edge with no source op.")
-
-            # To make sure we don't double count ops in
-            # the case that they produce more than one
-            # output, we keep track of the unique op ids
-            # for each op we encounter and only add the
-            # op if we have not already
-            if source_op.id not in op_ids:
-                op_ids.add(source_op.id)
+            # Make sure we don't double count ops in the case that
+            # they produce more than one output or have multiple consumers
+            op_idx = ops_ids.get(source_op.id)
+            if op_idx is None:
+                op_idx = len(ops)
+                ops_ids[source_op.id] = op_idx
                 source_op.check_args()
                 ops.append(source_op)
-            else:
-                # If the op was already added, we need to
-                # change its position to the top of the list.
-                # This ensures topological ordering of ops
-                # when adding to the backend pipeline
-                ops.remove(source_op)
-                ops.append(source_op)
-            for edge in source_op.inputs:
-                if isinstance(edge, list):
-                    for e in edge:
-                        edges.append(e)
-                else:
-                    edges.append(edge)
-        ops.reverse()
+                producers.append(set())
+                num_consumers.append(0)
+                for edge in source_op.inputs:
+                    if isinstance(edge, list):
+                        for e in edge:
+                            edges.append((e, op_idx))
+                    else:
+                        edges.append((edge, op_idx))
+            if consumer_idx is not None and op_idx not in producers[consumer_idx]:
+                producers[consumer_idx].add(op_idx)
+                num_consumers[op_idx] += 1
+
+        # Order the ops topologically, by the length of the longest path to any of the outputs
+        # (the ops farther from the outputs go first), so that the ops are added to
+        # the backend pipeline after their inputs. Within the same distance, the ops discovered
+        # later go first.
+        depth = [0] * len(ops)
+        ready = deque(idx for idx in range(len(ops)) if num_consumers[idx] == 0)
+        while ready:
+            op_idx = ready.popleft()
+            for producer_idx in producers[op_idx]:
+                depth[producer_idx] = max(depth[producer_idx], depth[op_idx] + 1)
+                num_consumers[producer_idx] -= 1
+                if num_consumers[producer_idx] == 0:
+                    ready.append(producer_idx)
+        ops_by_depth = [[] for _ in range(max(depth, default=-1) + 1)]
+        for op_idx in reversed(range(len(ops))):
+            ops_by_depth[depth[op_idx]].append(ops[op_idx])
+        ops = [op for same_depth_ops in reversed(ops_by_depth) for op in same_depth_ops]
         self._ops = ops
         self._graph_outputs = outputs
+        self._optimization_report = self._get_optimization_report(ops, outputs)
         self._setup_input_callbacks()
         self._py_graph_built = True
 
+    def _get_optimization_report(self, ops, outputs):
+        ops_ids = set(op.id for op in ops)
+        merged_ids = set(
+            merged_op.id for merged_ops in self._merged_ops.values() for merged_op in merged_ops)
+        pruned = [op.name for op in self._defined_ops
+                  if op.id not in ops_ids and op.id not in merged_ids]
+        merged = {op.name: [merged_op.name for merged_op in self._merged_ops[op.id]]
+                  for op in ops if op.id in self._merged_ops}
+        used_outputs = set(edge.name for edge in list(outputs) + self._sinks)
+        for op in ops:
+            for edge in op.inputs:
+                if isinstance(edge, list):
+                    used_outputs.update(e.name for e in edge)
+                else:
+                    used_outputs.add(edge.name)
+        unused_outputs = [
+            output.name for op in ops for output in op.outputs if output.name not in used_outputs]
+        return {
+            "ops": [op.name for op in ops],
+            "pruned": pruned,
+            "merged": merged,
+            "unused_outputs": unused_outputs,
+        }
+
     def _setup_pipe_pool_dependency(self):
         if self._py_pool_started:
             # The sole point of this call is to ensure the lifetime of the pool exceeds the lifetime
@@ -581,15 +705,43 @@ Parameters
             # before pipline's backend is garbage collected.
             # Otherwise the backend may try to access unmmaped memory which leads to crashes at the Python teardown.
             self._pipe.SetPyObjDependency(self._py_pool)
+            self._pipe.SetPyObjDependency(self._py_function_pool)
 
     def _start_py_workers(self):
-        if not self._parallel_input_callbacks:
+        if not self._parallel_input_callbacks and not self._parallel_py_functions:
             return
-        self._py_pool = WorkerPool.from_groups(
-            self._parallel_input_callbacks, self._prefetch_queue_depth, self._py_start_method,
-            self._py_num_workers, py_callback_pickler=self._py_callback_pickler)
-        # ensure processes started by the pool are termineted when pipeline is no longer used
-        weakref.finalize(self, lambda pool : pool.close(), self._py_pool)
+        if not self._parallel_input_callbacks:
+            self._py_pool = None
+        elif self._py_worker_pool is not None:
+            self._py_pool = self._py_worker_pool.attach(
+                self._parallel_input_callbacks, self._prefetch_queue_depth)
+        elif self._py_start_method == "thread":
+            self._py_pool = ThreadWorkerPool.from_groups(
+                self._parallel_input_callbacks, self._prefetch_queue_depth, self._py_num_workers)
+        else:
+            self._py_pool = WorkerPool.from_groups(
+                self._parallel_input_callbacks, self._prefetch_queue_depth, self._py_start_method,
+                self._py_num_workers, py_callback_pickler=self._py_callback_pickler,
+                shm_budget=self._py_shm_budget)
+        if self._parallel_py_functions:
+            # Parallel PythonFunctions are called from the executor's thread, concurrently with
+            # the external sources run from the main thread, so they get a pool of their own.
+            # Their results are copied into the operator's outputs right away, so there is
+            # no need to keep any batches alive.
+            if self._py_start_method == "thread":
+                self._py_function_pool = ThreadWorkerPool.from_groups(
+                    self._parallel_py_functions, 0, self._py_num_workers)
+            else:
+                self._py_function_pool = WorkerPool.from_groups(
+                    self._parallel_py_functions, 0, self._py_start_method, self._py_num_workers,
+                    py_callback_pickler=self._py_callback_pickler, shm_budget=self._py_shm_budget)
+            for i, group in enumerate(self._parallel_py_functions):
+                group.attach(self._py_function_pool, i)
+        # ensure processes started by the pool are termineted (or, if the pool is shared,
+        # the callbacks are removed from the workers) when pipeline is no longer used
+        for pool in (self._py_pool, self._py_function_pool):
+            if pool is not None:
+                weakref.finalize(self, lambda pool : pool.close(), pool)
         self._py_pool_started = True
 
     def _init_pipeline_backend(self):
@@ -624,12 +776,19 @@ Parameters
 
     def _setup_input_callbacks(self):
         from nvidia.dali.external_source import _is_external_source_with_callback
+        from nvidia.dali.ops import _is_parallel_python_function
         groups = set()
         for op in self._ops:
             if _is_external_source_with_callback(op):
                 group = op._group
                 groups.add(group)
         groups = list(groups)
+        # the same operator object may be called more than once, its function is run in a single context
+        self._parallel_py_functions = list(dict.fromkeys(
+            op._op._parallel_group for op in self._ops if _is_parallel_python_function(op)))
+        if self._parallel_py_functions and self._py_num_workers == 0:
+            raise RuntimeError("PythonFunction with `parallel=True` cannot be used in a pipeline "
+                               "with `py_num_workers` set to 0.")
         self._input_callbacks = groups
         if self._py_num_workers == 0:
             self._parallel_input_callbacks = []
@@ -13,11 +13,17 @@
 # limitations under the License.
 
 from nvidia.dali import types
+import concurrent.futures
+import gc
 import math
 import logging
 import numpy as np
+import threading
+import traceback
 import warnings
+import weakref
 from enum import Enum, unique
+from collections import deque
 from collections.abc import Iterable
 
 def _iterator_deprecation_warning():
@@ -43,6 +49,124 @@ class LastBatchPolicy(Enum):
     DROP = 1
     PARTIAL = 2
 
+class _OutputsToken(object):
+    """
+    Marks the pipelines' outputs of a single iteration that were exposed to the framework
+    without a copy. The framework tensors sharing the memory with the outputs keep the token alive,
+    the outputs can be released once all the references to the token are gone.
+    """
+    __slots__ = ("__weakref__",)
+
+class _PrefetchState(object):
+    """
+    Queue of the batches produced by the iterator's background thread, along with the state
+    shared by the thread and the iterator. It doesn't reference the iterator, so that the thread
+    doesn't keep it alive.
+
+    When producing a batch fails (with StopIteration at the end of data or with an error),
+    the thread passes the exception through the queue and waits until the iterator is reset.
+    """
+    def __init__(self, queue_depth):
+        self.queue_depth = queue_depth
+        # pairs (batches, exception)
+        self.queue = deque()
+        self.cv = threading.Condition()
+        # held by the thread when it uses the pipelines
+        self.pipelines_lock = threading.Lock()
+        self.parked = False
+        self.stopped = False
+
+    def wait_for_space(self):
+        """Waits until the thread can produce the next batch, returns False if it should exit"""
+        with self.cv:
+            self.cv.wait_for(lambda: self.stopped or
+                             (not self.parked and len(self.queue) < self.queue_depth))
+            return not self.stopped
+
+    def push(self, batches, exception=None):
+        with self.cv:
+            self.queue.append((batches, exception))
+            if exception is not None:
+                self.parked = True
+            self.cv.notify_all()
+
+    def pop(self):
+        with self.cv:
+            self.cv.wait_for(lambda: self.queue)
+            batches, exception = self.queue.popleft()
+            self.cv.notify_all()
+        if exception is not None:
+            raise exception
+        return batches
+
+    def reset(self, reset_pipelines):
+        """Resets the pipelines when the thread doesn't use them and lets it continue"""
+        with self.pipelines_lock, self.cv:
+            # the end of data may have been reached ahead of the iterator's epoch end
+            if self.queue and self.queue[-1][1] is not None:
+                self.queue.pop()
+            reset_pipelines()
+            self.parked = False
+            self.cv.notify_all()
+
+    def stop(self):
+        with self.cv:
+            self.stopped = True
+            self.cv.notify_all()
+
+
+def _prefetch_worker(iterator_ref, state):
+    while state.wait_for_space():
+        iterator = iterator_ref()
+        if iterator is None:
+            return
+        batches, exception = None, None
+        try:
+            with state.pipelines_lock:
+                batches = iterator._produce_batch()
+        except Exception as e:
+            # StopIteration included
+            exception = e
+            # the locals of the traceback's frames would keep the iterator alive
+            traceback.clear_frames(e.__traceback__)
+        # don't keep the iterator alive while waiting
+        del iterator
+        state.push(batches, exception)
+        batches, exception = None, None
+
+
+def _shape_bucket(volume):
+    """
+    Rounds up the number of elements of the buffer to the power of two, so that the buffers are not
+    reallocated each time the outputs grow slightly
+    """
+    return 1 << max(volume - 1, 0).bit_length()
+
+class _OutputBufferPool(object):
+    """
+    Ring of the sets of framework buffers for the iterator outputs. Each iteration uses the next
+    slot of the ring, so the buffers of a batch are reused after ``num_slots`` iterations. Within
+    a slot, the buffers are kept by the key identifying the output (for example the pipeline index
+    and the output category, the device of a given output doesn't change) and are reallocated only
+    when the output outgrows them or changes its type.
+    """
+    def __init__(self, num_slots):
+        self._slots = [dict() for _ in range(num_slots)]
+        self._current = -1
+
+    def next_slot(self):
+        self._current = (self._current + 1) % len(self._slots)
+
+    def get(self, key, shape, dtype, device, allocate, view):
+        volume = int(np.prod(shape, dtype=np.int64))
+        slot = self._slots[self._current]
+        entry = slot.get(key)
+        if entry is None or entry[1] != dtype or entry[2] < volume:
+            capacity = _shape_bucket(volume)
+            entry = (allocate([capacity], dtype, device), dtype, capacity)
+            slot[key] = entry
+        return view(entry[0], shape)
+
 class _DaliBaseIterator(object):
     """
     DALI base iterator class. Shouldn't be used directly.
@@ -99,6 +223,27 @@ class _DaliBaseIterator(object):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output buffers
+                and copies the outputs to the buffers of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The buffers are reallocated
+                only when the outputs outgrow them. 0 disables the reuse
+    background_prefetch : int, optional, default = 0
+                Number of the batches converted to the framework's format ahead of time.
+                When positive, a background thread waits for the pipelines' outputs, copies them
+                to the framework's tensors and passes them to the iterator through a queue
+                of that size, so that the copy is not done when the batch is requested.
+                0 disables the background thread
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -124,7 +269,11 @@ class _DaliBaseIterator(object):
                  fill_last_batch=None,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
         assert pipelines is not None, "Number of provided pipelines has to be at least 1"
         if not isinstance(pipelines, list):
             pipelines = [pipelines]
@@ -173,6 +322,37 @@ class _DaliBaseIterator(object):
         self._reader_name = reader_name
         self._extract_from_reader_and_validate()
         self._ever_scheduled = False
+        # When set, the outputs are not released in `_schedule_runs` right away, but only when
+        # the tensors exposing them without a copy are gone, see `_hold_outputs`
+        self._deferred_release = False
+        # weak references to the tokens of the outputs in use, in the order of `share_outputs` calls,
+        # along with the optional callbacks to be run before the outputs are released
+        self._outputs_in_use = deque()
+        if reuse_outputs < 0:
+            raise ValueError(f"`reuse_outputs` must be non-negative, got {reuse_outputs}")
+        if background_prefetch < 0:
+            raise ValueError(f"`background_prefetch` must be non-negative, got {background_prefetch}")
+        self._output_pool = None
+        if reuse_outputs > 0:
+            # the batches in the queue and the one being converted need their buffers too
+            num_slots = reuse_outputs + background_prefetch + 1 if background_prefetch else reuse_outputs
+            self._output_pool = _OutputBufferPool(num_slots)
+        self._prefetch_state = _PrefetchState(background_prefetch) if background_prefetch else None
+        self._prefetch_thread = None
+        if completion_order and not pipeline_threads:
+            raise ValueError("`completion_order` requires `pipeline_threads`")
+        self._completion_order = completion_order
+        # a single thread for each pipeline, so each one is always driven by the same thread
+        self._pipeline_executors = None
+        if pipeline_threads and len(self._pipes) > 1:
+            self._pipeline_executors = [
+                concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                      thread_name_prefix=f"DALI pipeline {i}")
+                for i in range(len(self._pipes))]
+        # the order of the pipelines' outputs obtained by the last `_share_outputs` call
+        self._share_order = list(range(len(self._pipes)))
+        # the order of the pipelines' batches returned by the last `_next_batch` call
+        self._pipeline_order = list(range(len(self._pipes)))
 
     def _calculate_shard_sizes(self, shard_nums):
         shards_beg = np.floor(shard_nums * self._size_no_pad / self._shards_num).astype(np.int)
@@ -238,30 +418,132 @@ class _DaliBaseIterator(object):
             # from iterator counter the shard size, then go though all GPUs and check how much data needs to be dropped
             left = self.batch_size - (self._counter - self._shard_sizes_per_gpu_initial[self._shards_id])
             if_drop = np.less(left, self.batch_size)
+            if self._completion_order:
+                # match the order of the returned batches
+                left = left[self._pipeline_order]
+                if_drop = if_drop[self._pipeline_order]
         return if_drop, left
 
-    def _get_outputs(self):
+    def _share_outputs(self):
         """
-        Checks iterator stop condition, gets DALI outputs and perform reset in case of StopIteration
+        Gets DALI outputs of all the pipelines
         """
         # if pipeline was not scheduled ever do it here
         if not self._ever_scheduled:
             self._schedule_runs(False)
+        if self._deferred_release:
+            self._reserve_outputs()
+
+        def share_outputs(p):
+            with p._check_api_type_scope(types.PipelineAPIType.ITERATOR):
+                return p.share_outputs()
+
+        outputs, self._share_order = self._for_each_pipeline(share_outputs)
+        self._check_batch_size(outputs)
+        if self._output_pool is not None:
+            self._output_pool.next_slot()
+        return outputs
+
+    def _convert_outputs(self, outputs):
+        """
+        Converts the DALI outputs of all the pipelines to the framework's batches
+        """
+        raise NotImplementedError
+
+    def _for_each_pipeline(self, func):
+        """
+        Calls `func` for each pipeline, in the pipelines' threads if there are any.
+        Returns the results in the order of the pipelines and the indices of the pipelines
+        in the order of completion
+        """
+        if self._pipeline_executors is None:
+            return [func(p) for p in self._pipes], list(range(len(self._pipes)))
+        futures = {executor.submit(func, p): i
+                   for i, (executor, p) in enumerate(zip(self._pipeline_executors, self._pipes))}
+        results = [None] * len(self._pipes)
+        order = []
+        error = None
+        # wait for all the pipelines even if some fail, so none of them is in use
+        # when the error is handled
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+                order.append(i)
+            except Exception as e:
+                # StopIteration included
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+        return results, order
+
+    def _produce_batch(self):
+        """
+        Gets DALI outputs, converts them to the framework's batches and schedules the next runs.
+        Returns the batches along with the order in which the pipelines produced them
+        """
+        batches = self._convert_outputs(self._share_outputs())
+        order = self._share_order
+        self._schedule_runs()
+        return batches, order
+
+    def _next_batch(self):
+        """
+        Checks iterator stop condition and returns the next batches converted with `_convert_outputs`,
+        either produced right away or taken from the queue filled by the background thread.
+        Performs reset in case of StopIteration.
+        """
         if self._size > 0 and self._counter >= self._size:
             self._end_iteration()
-
-        outputs = []
         try:
-            for p in self._pipes:
-                with p._check_api_type_scope(types.PipelineAPIType.ITERATOR):
-                    outputs.append(p.share_outputs())
+            if self._prefetch_state is None:
+                batches, order = self._produce_batch()
+            else:
+                if self._prefetch_thread is None:
+                    self._prefetch_thread = threading.Thread(
+                        target=_prefetch_worker, args=(weakref.ref(self), self._prefetch_state),
+                        name="DALI iterator prefetch", daemon=True)
+                    self._prefetch_thread.start()
+                batches, order = self._prefetch_state.pop()
         except StopIteration as e:
             # in case ExternalSource returns StopIteration
             if self._size < 0 and self._auto_reset:
                 self.reset()
             raise e
-        self._check_batch_size(outputs)
-        return outputs
+        if self._completion_order:
+            self._pipeline_order = order
+            batches = [batches[i] for i in order]
+        return batches
+
+    def __del__(self):
+        if getattr(self, "_prefetch_state", None) is not None:
+            self._prefetch_state.stop()
+        for executor in getattr(self, "_pipeline_executors", None) or []:
+            executor.shutdown(wait=False)
+
+    def _output_buffer(self, key, shape, dtype, device):
+        """
+        Returns the framework's buffer of given shape, type and device, for the output identified
+        by the ``key``. If the outputs are reused, the buffer comes from the current slot
+        of the output pool, otherwise a new one is allocated.
+        """
+        if self._output_pool is None:
+            return self._allocate_output_buffer(shape, dtype, device)
+        return self._output_pool.get(key, shape, dtype, device,
+                                     self._allocate_output_buffer, self._view_output_buffer)
+
+    def _allocate_output_buffer(self, shape, dtype, device):
+        """
+        Allocates the framework's buffer of given shape, type and device
+        """
+        raise NotImplementedError
+
+    def _view_output_buffer(self, buffer, shape):
+        """
+        Returns a view of the first elements of the one-dimensional ``buffer`` with given shape
+        """
+        raise NotImplementedError
 
     def _check_batch_size(self, outs):
         if not isinstance(outs, Iterable):
@@ -284,12 +566,71 @@ class _DaliBaseIterator(object):
         Schedule DALI runs
         """
         self._ever_scheduled = True
-        for p in self._pipes:
+        if release_outputs and self._deferred_release:
+            self._release_unused_outputs()
+            release_outputs = False
+
+        def schedule_run(p):
             with p._check_api_type_scope(types.PipelineAPIType.ITERATOR):
                 if release_outputs:
                     p.release_outputs()
                 p.schedule_run()
 
+        self._for_each_pipeline(schedule_run)
+
+    def _max_outputs_in_use(self):
+        """
+        Number of the iterations whose outputs can be in use at the same time - it is bounded by
+        the number of the output buffers of the pipelines
+        """
+        return min(min(p._cpu_queue_size, p._gpu_queue_size) for p in self._pipes)
+
+    def _hold_outputs(self, before_release=None):
+        """
+        Marks the outputs obtained by the last `_share_outputs` call as used without a copy.
+        Returns the token that must be kept alive by all the framework tensors sharing the memory
+        with the outputs. The outputs are returned to the pipelines only when the token is gone.
+
+        Parameters
+        ----------
+        before_release : callable, optional, default = None
+            Called right before the outputs are released, for example, to wait until the work
+            scheduled by the framework using the outputs is done
+        """
+        token = _OutputsToken()
+        self._outputs_in_use.append((weakref.ref(token), before_release))
+        return token
+
+    def _release_unused_outputs(self):
+        """
+        Releases the outputs no longer in use. The pipeline releases its outputs in the order
+        they were obtained, so the releasing stops at the oldest outputs that are still used.
+        """
+        while self._outputs_in_use and self._outputs_in_use[0][0]() is None:
+            _, before_release = self._outputs_in_use.popleft()
+            if before_release is not None:
+                before_release()
+            for p in self._pipes:
+                with p._check_api_type_scope(types.PipelineAPIType.ITERATOR):
+                    p.release_outputs()
+
+    def _reserve_outputs(self):
+        """
+        Makes sure that the pipelines have an output buffer left for the next `share_outputs` call,
+        otherwise it would wait forever for the buffers held by the tensors from previous iterations.
+        """
+        self._release_unused_outputs()
+        max_in_use = self._max_outputs_in_use()
+        if len(self._outputs_in_use) >= max_in_use:
+            # the tensors may be kept alive only by reference cycles
+            gc.collect()
+            self._release_unused_outputs()
+        if len(self._outputs_in_use) >= max_in_use:
+            raise RuntimeError(
+                f"All {max_in_use} output buffers of the pipeline are used by the tensors "
+                "returned by the iterator without a copy. Drop the references to the tensors "
+                "from the previous iterations or increase `prefetch_queue_depth` of the pipeline.")
+
     def _advance_and_check_drop_last(self):
         """
         Checks whether the current batch is not fully filled and whether it should be dropped.
@@ -360,14 +701,22 @@ class _DaliBaseIterator(object):
                         # read_in_next_epoch = self._shard_sizes_per_gpu
                         self._size = math.ceil(max(self._shard_sizes_per_gpu) / self.batch_size) * self.batch_size
 
-            for p in self._pipes:
-                p.reset()
-                if p.empty():
-                    with p._check_api_type_scope(types.PipelineAPIType.ITERATOR):
-                        p.schedule_run()
+            if self._prefetch_state is None:
+                self._reset_pipelines()
+            else:
+                self._prefetch_state.reset(self._reset_pipelines)
         else:
             logging.warning("DALI iterator does not support resetting while epoch is not finished. Ignoring...")
 
+    def _reset_pipelines(self):
+        def reset(p):
+            p.reset()
+            if p.empty():
+                with p._check_api_type_scope(types.PipelineAPIType.ITERATOR):
+                    p.schedule_run()
+
+        self._for_each_pipeline(reset)
+
     def next(self):
         """
         Returns the next batch of data.
@@ -384,6 +733,13 @@ class _DaliBaseIterator(object):
     def size(self):
         return self._size
 
+    @property
+    def pipeline_order(self):
+        """
+        Indices of the pipelines the per-pipeline batches returned last come from
+        """
+        return self._pipeline_order
+
     def __len__(self):
         if self._reader_name:
             if self._last_batch_policy != LastBatchPolicy.DROP:
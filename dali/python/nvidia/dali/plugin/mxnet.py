@@ -85,7 +85,11 @@ class _DALIMXNetIteratorBase(mx.io.DataIter, _DaliBaseIterator):
                  last_batch_padded=False,
                  auto_reset=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
         _DaliBaseIterator.__init__(self,
                                    pipelines,
                                    size,
@@ -94,7 +98,11 @@ class _DALIMXNetIteratorBase(mx.io.DataIter, _DaliBaseIterator):
                                    fill_last_batch,
                                    last_batch_padded,
                                    last_batch_policy,
-                                   prepare_first_batch=prepare_first_batch)
+                                   prepare_first_batch=prepare_first_batch,
+                                   reuse_outputs=reuse_outputs,
+                                   background_prefetch=background_prefetch,
+                                   pipeline_threads=pipeline_threads,
+                                   completion_order=completion_order)
 
     def next(self):
         """
@@ -110,6 +118,12 @@ class _DALIMXNetIteratorBase(mx.io.DataIter, _DaliBaseIterator):
         """
         _DaliBaseIterator.reset(self)
 
+    def _allocate_output_buffer(self, shape, dtype, device):
+        return get_mx_array(shape, device, dtype=dtype)
+
+    def _view_output_buffer(self, buffer, shape):
+        return buffer[0:int(np.prod(shape, dtype=np.int64))].reshape(shape)
+
 def get_mx_array(shape, ctx=None, dtype=None):
     # WAR
     # ToDo (jlisiecki) - fix when upstream MXNet fixes this
@@ -199,6 +213,26 @@ class DALIGenericIterator(_DALIMXNetIteratorBase):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output arrays
+                and copies the outputs to the arrays of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The arrays are reallocated
+                only when the outputs outgrow them. 0 disables the reuse
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to MXNet arrays ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the arrays to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
     Example
     -------
     With the data set ``[1,2,3,4,5,6,7]`` and the batch size 2:
@@ -227,7 +261,11 @@ class DALIGenericIterator(_DALIMXNetIteratorBase):
                  dynamic_shape=False,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
 
         # check the assert first as _DaliBaseIterator would run the prefetch
         self._output_names_map = [x[0] for x in output_map]
@@ -246,7 +284,11 @@ class DALIGenericIterator(_DALIMXNetIteratorBase):
                          last_batch_padded,
                          auto_reset,
                          last_batch_policy,
-                         prepare_first_batch=prepare_first_batch)
+                         prepare_first_batch=prepare_first_batch,
+                         reuse_outputs=reuse_outputs,
+                         background_prefetch=background_prefetch,
+                         pipeline_threads=pipeline_threads,
+                         completion_order=completion_order)
         self._squeeze_labels = squeeze_labels
 
         self._first_batch = None
@@ -298,9 +340,41 @@ class DALIGenericIterator(_DALIMXNetIteratorBase):
             self._first_batch = None
             return batch
 
-        # Gather outputs
-        outputs = self._get_outputs()
+        # Gather outputs and copy them to MXNet arrays
+        data_batches = self._next_batch()
+
+        self._advance_and_check_drop_last()
+
+        if self._reader_name:
+            if_drop, left = self._remove_padded()
+            if np.any(if_drop):
+                left = [self.batch_size - l for l in left]
+                for i, to_pad in zip(range(self._num_gpus), left):
+                    data_batches[i].pad = to_pad
+            else:
+                for batch in data_batches:
+                    batch.pad = 0
+
+        else:
+            # padding the last batch
+            if self._last_batch_policy == LastBatchPolicy.PARTIAL and (self._counter > self._size) and self._size > 0:
+                # this is the last batch and we need to pad
+                overflow = self._counter - self._size
+                overflow_per_device = overflow // self._num_gpus
+                difference = self._num_gpus - (overflow % self._num_gpus)
+                for i in range(self._num_gpus):
+                    if i < difference:
+                        data_batches[i].pad = overflow_per_device
+                    else:
+                        data_batches[i].pad = overflow_per_device + 1
+            else:
+                for db in data_batches:
+                    db.pad = 0
+
+        self._populate_descriptors(data_batches)
+        return data_batches
 
+    def _convert_outputs(self, outputs):
         data_batches = [None for i in range(self._num_gpus)]
 
         for i in range(self._num_gpus):
@@ -339,9 +413,11 @@ class DALIGenericIterator(_DALIMXNetIteratorBase):
             d = []
             l = []
             for j, (shape, dtype) in enumerate(category_info[DALIGenericIterator.DATA_TAG]):
-                d.append(get_mx_array(shape, category_device[DALIGenericIterator.DATA_TAG][j], dtype = dtype))
+                d.append(self._output_buffer((i, DALIGenericIterator.DATA_TAG, j), shape, dtype,
+                                             category_device[DALIGenericIterator.DATA_TAG][j]))
             for j, (shape, dtype) in enumerate(category_info[DALIGenericIterator.LABEL_TAG]):
-                l.append(get_mx_array(shape, category_device[DALIGenericIterator.LABEL_TAG][j], dtype = dtype))
+                l.append(self._output_buffer((i, DALIGenericIterator.LABEL_TAG, j), shape, dtype,
+                                             category_device[DALIGenericIterator.LABEL_TAG][j]))
 
             data_batches[i] = mx.io.DataBatch(data=d, label=l)
 
@@ -352,37 +428,6 @@ class DALIGenericIterator(_DALIMXNetIteratorBase):
             for j, l_arr in enumerate(l):
                 feed_ndarray(category_tensors[DALIGenericIterator.LABEL_TAG][j], l_arr)
 
-        self._schedule_runs()
-
-        self._advance_and_check_drop_last()
-
-        if self._reader_name:
-            if_drop, left = self._remove_padded()
-            if np.any(if_drop):
-                left = [self.batch_size - l for l in left]
-                for i, to_pad in zip(range(self._num_gpus), left):
-                    data_batches[i].pad = to_pad
-            else:
-                for batch in data_batches:
-                    batch.pad = 0
-
-        else:
-            # padding the last batch
-            if self._last_batch_policy == LastBatchPolicy.PARTIAL and (self._counter > self._size) and self._size > 0:
-                # this is the last batch and we need to pad
-                overflow = self._counter - self._size
-                overflow_per_device = overflow // self._num_gpus
-                difference = self._num_gpus - (overflow % self._num_gpus)
-                for i in range(self._num_gpus):
-                    if i < difference:
-                        data_batches[i].pad = overflow_per_device
-                    else:
-                        data_batches[i].pad = overflow_per_device + 1
-            else:
-                for db in data_batches:
-                    db.pad = 0
-
-        self._populate_descriptors(data_batches)
         return data_batches
 
     DATA_TAG = "data"
@@ -468,6 +513,26 @@ class DALIClassificationIterator(DALIGenericIterator):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output arrays
+                and copies the outputs to the arrays of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The arrays are reallocated
+                only when the outputs outgrow them. 0 disables the reuse
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to MXNet arrays ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the arrays to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -498,7 +563,11 @@ class DALIClassificationIterator(DALIGenericIterator):
                  dynamic_shape=False,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
         super(DALIClassificationIterator, self).__init__(pipelines,
                                                          [(data_name, DALIClassificationIterator.DATA_TAG),
                                                           (label_name, DALIClassificationIterator.LABEL_TAG)],
@@ -511,7 +580,11 @@ class DALIClassificationIterator(DALIGenericIterator):
                                                          dynamic_shape=dynamic_shape,
                                                          last_batch_padded = last_batch_padded,
                                                          last_batch_policy = last_batch_policy,
-                                                         prepare_first_batch = prepare_first_batch)
+                                                         prepare_first_batch = prepare_first_batch,
+                                                         reuse_outputs = reuse_outputs,
+                                                         background_prefetch = background_prefetch,
+                                                         pipeline_threads = pipeline_threads,
+                                                         completion_order = completion_order)
 
 ###############################################
 ###############################################
@@ -582,6 +655,26 @@ class DALIGluonIterator(_DALIMXNetIteratorBase):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output arrays
+                and copies the outputs to the arrays of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The arrays are reallocated
+                only when the outputs outgrow them. 0 disables the reuse
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to MXNet arrays ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the arrays to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -608,7 +701,11 @@ class DALIGluonIterator(_DALIMXNetIteratorBase):
                  fill_last_batch=None,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
 
         # check the assert first as _DaliBaseIterator would run the prefetch
         self._output_tags = {DALIGluonIterator.DENSE_TAG, DALIGluonIterator.SPARSE_TAG}
@@ -625,7 +722,11 @@ class DALIGluonIterator(_DALIMXNetIteratorBase):
             last_batch_padded,
             auto_reset,
             last_batch_policy,
-            prepare_first_batch = prepare_first_batch)
+            prepare_first_batch = prepare_first_batch,
+            reuse_outputs = reuse_outputs,
+            background_prefetch = background_prefetch,
+            pipeline_threads = pipeline_threads,
+            completion_order = completion_order)
 
         self._first_batch = None
         if self._prepare_first_batch:
@@ -640,38 +741,8 @@ class DALIGluonIterator(_DALIMXNetIteratorBase):
             self._first_batch = None
             return batch
 
-        # Gather outputs
-        dali_outputs = self._get_outputs()
-
-        data_batches = [None for i in range(self._num_gpus)]
-        for i in range(self._num_gpus):
-            output_elements = []
-            shapes = []
-            for j, out in enumerate(dali_outputs[i]):
-                if self._outputs_types is None or self._outputs_types[j] == DALIGluonIterator.DENSE_TAG:
-                    output_elements.append(out.as_tensor())
-                    shapes.append(output_elements[-1].shape())
-                else:
-                    output_elements.append([out[sample_idx] for sample_idx in range(self.batch_size)])
-                    s = [t.shape() for t in output_elements[-1]]
-                    shapes.append(s)
-
-            data_batches[i] = self._create_data_batch(output_elements, shapes, self._pipes[i].device_id)
-
-            batch = data_batches[i]
-            # Copy data from DALI Tensors to MXNet NDArrays
-            for j, output_el in enumerate(output_elements):
-                if self._outputs_types is None or self._outputs_types[j] == DALIGluonIterator.DENSE_TAG:
-                    feed_ndarray(output_el, batch[j])
-                else:
-                    for sample_idx in range(self.batch_size):
-                        feed_ndarray(output_el[sample_idx], batch[j][sample_idx])
-
-        batches = [[([sample for sample in output_el] if isinstance(output_el,list) else output_el)
-                    for output_el in batch]
-                   for batch in data_batches]
-
-        self._schedule_runs()
+        # Gather outputs and copy them to MXNet arrays
+        batches = self._next_batch()
 
         self._advance_and_check_drop_last()
 
@@ -709,7 +780,38 @@ class DALIGluonIterator(_DALIMXNetIteratorBase):
 
         return batches
 
-    def _create_data_batch(self, output_elements, shapes, device_id):
+    def _convert_outputs(self, outputs):
+        data_batches = [None for i in range(self._num_gpus)]
+        for i in range(self._num_gpus):
+            output_elements = []
+            shapes = []
+            for j, out in enumerate(outputs[i]):
+                if self._outputs_types is None or self._outputs_types[j] == DALIGluonIterator.DENSE_TAG:
+                    output_elements.append(out.as_tensor())
+                    shapes.append(output_elements[-1].shape())
+                else:
+                    output_elements.append([out[sample_idx] for sample_idx in range(self.batch_size)])
+                    s = [t.shape() for t in output_elements[-1]]
+                    shapes.append(s)
+
+            data_batches[i] = self._create_data_batch(i, output_elements, shapes, self._pipes[i].device_id)
+
+            batch = data_batches[i]
+            # Copy data from DALI Tensors to MXNet NDArrays
+            for j, output_el in enumerate(output_elements):
+                if self._outputs_types is None or self._outputs_types[j] == DALIGluonIterator.DENSE_TAG:
+                    feed_ndarray(output_el, batch[j])
+                else:
+                    for sample_idx in range(self.batch_size):
+                        feed_ndarray(output_el[sample_idx], batch[j][sample_idx])
+
+        batches = [[([sample for sample in output_el] if isinstance(output_el,list) else output_el)
+                    for output_el in batch]
+                   for batch in data_batches]
+
+        return batches
+
+    def _create_data_batch(self, pipe_idx, output_elements, shapes, device_id):
         mx_gpu_device = mx.gpu(device_id)
         mx_cpu_device = mx.cpu(0)
         new_batch = []
@@ -718,11 +820,11 @@ class DALIGluonIterator(_DALIMXNetIteratorBase):
             dtype = types.to_numpy_type(first_t.dtype)
             device = mx_gpu_device if type(first_t) is TensorGPU else mx_cpu_device
             if self._outputs_types is None or self._outputs_types[j] == DALIGluonIterator.DENSE_TAG:
-                new_batch.append(get_mx_array(shapes[j], device, dtype=dtype))
+                new_batch.append(self._output_buffer((pipe_idx, j), shapes[j], dtype, device))
             else:
                 l = []
                 for sample_idx in range(self.batch_size):
-                    l.append(get_mx_array(shapes[j][sample_idx], device, dtype=dtype))
+                    l.append(self._output_buffer((pipe_idx, j, sample_idx), shapes[j][sample_idx], dtype, device))
                 new_batch.append(l)
         return new_batch
 
@@ -181,6 +181,26 @@ class DALIGenericIterator(_DaliBaseIterator):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output tensors
+                and copies the outputs to the tensors of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The tensors are reallocated
+                only when the outputs outgrow them. 0 disables the reuse
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to Paddle tensors ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the tensors to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -209,7 +229,11 @@ class DALIGenericIterator(_DaliBaseIterator):
                  dynamic_shape=False,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
 
         normalized_map = {}
         for v in output_map:
@@ -233,7 +257,11 @@ class DALIGenericIterator(_DaliBaseIterator):
                                    fill_last_batch,
                                    last_batch_padded,
                                    last_batch_policy,
-                                   prepare_first_batch=prepare_first_batch)
+                                   prepare_first_batch=prepare_first_batch,
+                                   reuse_outputs=reuse_outputs,
+                                   background_prefetch=background_prefetch,
+                                   pipeline_threads=pipeline_threads,
+                                   completion_order=completion_order)
 
         self._counter = 0
 
@@ -250,9 +278,51 @@ class DALIGenericIterator(_DaliBaseIterator):
             self._first_batch = None
             return batch
 
-        # Gather outputs
-        outputs = self._get_outputs()
+        # Gather outputs and copy them to Paddle tensors
+        data_batches = self._next_batch()
 
+        self._advance_and_check_drop_last()
+
+        if self._reader_name:
+            if_drop, left = self._remove_padded()
+            if np.any(if_drop):
+                output = []
+                for batch, to_copy in zip(data_batches, left):
+                    batch = batch.copy()
+                    for cat in self.output_map:
+                        batch[cat] = lod_tensor_clip(batch[cat], to_copy)
+                    output.append(batch)
+                return output
+
+        else:
+            if self._last_batch_policy == LastBatchPolicy.PARTIAL and (self._counter > self._size) and self._size > 0:
+                # First calculate how much data is required to
+                # return exactly self._size entries.
+                diff = self._num_gpus * self.batch_size - (self._counter
+                                                           - self._size)
+                # Figure out how many GPUs to grab from.
+                num_gpus_to_grab = int(math.ceil(diff / self.batch_size))
+                # Figure out how many results to grab from the last GPU
+                # (as a fractional GPU batch may be required to bring us
+                # right up to self._size).
+                mod_diff = diff % self.batch_size
+                data_from_last_gpu = mod_diff if mod_diff else self.batch_size
+
+                # Grab the relevant data.
+                # 1) Grab everything from the relevant GPUs.
+                # 2) Grab the right data from the last GPU.
+                # 3) Append data together correctly and return.
+                output = data_batches[0:num_gpus_to_grab]
+                output[-1] = output[-1].copy()
+                for cat in self.output_map:
+                    lod_tensor = output[-1][cat]
+                    output[-1][cat] = lod_tensor_clip(
+                        lod_tensor, data_from_last_gpu)
+                return output
+
+        return data_batches
+
+    def _convert_outputs(self, outputs):
         data_batches = [None for i in range(self._num_gpus)]
 
         for i in range(self._num_gpus):
@@ -299,13 +369,11 @@ class DALIGenericIterator(_DaliBaseIterator):
 
             pd_tensors = {}
             for cat, tensor in category_tensors.items():
-                lod_tensor = fluid.core.LoDTensor()
+                lod_tensor = self._output_buffer((i, cat), category_shapes[cat],
+                                                 category_pd_type[cat], category_place[cat])
                 pd_tensors[cat] = lod_tensor
-                lod_tensor._set_dims(category_shapes[cat])
                 seq_len = category_lengths[cat]
                 lod_tensor.set_recursive_sequence_lengths(seq_len)
-                lod_tensor._mutable_data(category_place[cat],
-                                         category_pd_type[cat])
             data_batches[i] = pd_tensors
 
             stream = paddle.device.cuda.current_stream(dev_id).cuda_stream
@@ -314,48 +382,18 @@ class DALIGenericIterator(_DaliBaseIterator):
                                                category_pd_type[cat])
                 feed_ndarray(tensor, ptr, stream)
 
-        self._schedule_runs()
-
-        self._advance_and_check_drop_last()
-
-        if self._reader_name:
-            if_drop, left = self._remove_padded()
-            if np.any(if_drop):
-                output = []
-                for batch, to_copy in zip(data_batches, left):
-                    batch = batch.copy()
-                    for cat in self.output_map:
-                        batch[cat] = lod_tensor_clip(batch[cat], to_copy)
-                    output.append(batch)
-                return output
-
-        else:
-            if self._last_batch_policy == LastBatchPolicy.PARTIAL and (self._counter > self._size) and self._size > 0:
-                # First calculate how much data is required to
-                # return exactly self._size entries.
-                diff = self._num_gpus * self.batch_size - (self._counter
-                                                           - self._size)
-                # Figure out how many GPUs to grab from.
-                num_gpus_to_grab = int(math.ceil(diff / self.batch_size))
-                # Figure out how many results to grab from the last GPU
-                # (as a fractional GPU batch may be required to bring us
-                # right up to self._size).
-                mod_diff = diff % self.batch_size
-                data_from_last_gpu = mod_diff if mod_diff else self.batch_size
+        return data_batches
 
-                # Grab the relevant data.
-                # 1) Grab everything from the relevant GPUs.
-                # 2) Grab the right data from the last GPU.
-                # 3) Append data together correctly and return.
-                output = data_batches[0:num_gpus_to_grab]
-                output[-1] = output[-1].copy()
-                for cat in self.output_map:
-                    lod_tensor = output[-1][cat]
-                    output[-1][cat] = lod_tensor_clip(
-                        lod_tensor, data_from_last_gpu)
-                return output
+    def _allocate_output_buffer(self, shape, dtype, place):
+        lod_tensor = fluid.core.LoDTensor()
+        lod_tensor._set_dims(shape)
+        lod_tensor._mutable_data(place, dtype)
+        return lod_tensor
 
-        return data_batches
+    def _view_output_buffer(self, lod_tensor, shape):
+        # the memory is not reallocated as long as the new shape doesn't need more of it
+        lod_tensor._set_dims(shape)
+        return lod_tensor
 
 
 class DALIClassificationIterator(DALIGenericIterator):
@@ -421,6 +459,26 @@ class DALIClassificationIterator(DALIGenericIterator):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output tensors
+                and copies the outputs to the tensors of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The tensors are reallocated
+                only when the outputs outgrow them. 0 disables the reuse
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to Paddle tensors ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the tensors to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -448,7 +506,11 @@ class DALIClassificationIterator(DALIGenericIterator):
                  dynamic_shape=False,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 reuse_outputs=0,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
         super(DALIClassificationIterator, self).__init__(
             pipelines, ["data", "label"], size, reader_name=reader_name,
             auto_reset=auto_reset,
@@ -456,4 +518,8 @@ class DALIClassificationIterator(DALIGenericIterator):
             dynamic_shape=dynamic_shape,
             last_batch_padded=last_batch_padded,
             last_batch_policy=last_batch_policy,
-            prepare_first_batch=prepare_first_batch)
+            prepare_first_batch=prepare_first_batch,
+            reuse_outputs=reuse_outputs,
+            background_prefetch=background_prefetch,
+            pipeline_threads=pipeline_threads,
+            completion_order=completion_order)
@@ -20,7 +20,9 @@ from nvidia.dali.plugin.base_iterator import _DaliBaseIterator
 from nvidia.dali.plugin.base_iterator import LastBatchPolicy
 import torch
 import torch.utils.dlpack as torch_dlpack
+import collections
 import ctypes
+import functools
 import numpy as np
 
 to_torch_type = {
@@ -67,6 +69,42 @@ def feed_ndarray(dali_tensor, arr, cuda_stream = None):
         dali_tensor.copy_to_external(c_type_pointer)
     return arr
 
+class RaggedBatch(collections.namedtuple("RaggedBatch", ["data", "offsets", "shapes"])):
+    """
+    Batch of samples of different shapes returned by the iterator for the outputs listed
+    in its ``ragged_outputs``.
+
+    Parameters
+    ----------
+    `data` : torch.Tensor
+             One-dimensional tensor with the samples stored one after another
+    `offsets` : torch.Tensor
+                CPU tensor of ``int64`` with ``batch_size + 1`` elements: the positions of the samples
+                in ``data``, the ``i``-th sample spans from ``offsets[i]`` to ``offsets[i + 1]``
+    `shapes` : torch.Tensor
+               CPU tensor of ``int64`` of shape ``(batch_size, sample_dim)`` with the shapes
+               of the samples
+    """
+    __slots__ = ()
+
+    def sample(self, idx):
+        """
+        Returns the ``idx``-th sample of the batch as a view of ``data`` of the sample's shape.
+        """
+        return self.data[self.offsets[idx]:self.offsets[idx + 1]].view(self.shapes[idx].tolist())
+
+def _head(batch, num_samples):
+    """Returns the first ``num_samples`` samples of a tensor or of a RaggedBatch"""
+    if isinstance(batch, RaggedBatch):
+        return RaggedBatch(batch.data[0:batch.offsets[num_samples]],
+                           batch.offsets[0:num_samples + 1],
+                           batch.shapes[0:num_samples])
+    return batch[0:num_samples]
+
+def _synchronize_streams(device_ids):
+    for device_id in device_ids:
+        torch.cuda.current_stream(device=device_id).synchronize()
+
 class DALIGenericIterator(_DaliBaseIterator):
     """
     General DALI iterator for PyTorch. It can return any number of
@@ -124,6 +162,43 @@ class DALIGenericIterator(_DaliBaseIterator):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    zero_copy : bool, optional, default = False
+                Whether the outputs should be passed to PyTorch through DLPack, without a copy.
+                The memory of the returned tensors belongs to the pipeline and it is returned
+                to the pipeline only when all the tensors (and their views) sharing it are gone.
+                The number of batches that can be kept alive when the next one is requested is
+                limited to ``prefetch_queue_depth - 1``.
+                For GPU outputs, the current PyTorch stream is synchronized before the memory
+                is returned to the pipeline. The pipelines need to use ``exec_async``
+                and ``exec_pipelined``
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output tensors
+                and copies the outputs to the tensors of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The tensors are reallocated
+                only when the outputs outgrow them. 0 disables the reuse.
+                Mutually exclusive with ``zero_copy``
+    ragged_outputs : list of str, optional, default = None
+                Names (from ``output_map``) of the outputs whose samples may differ in shape.
+                Instead of a tensor of the whole batch, such outputs are returned as
+                a :class:`RaggedBatch`: a flat tensor with all the samples, filled with
+                a single copy, along with the offsets and the shapes of the samples.
+                The outputs are copied even when ``zero_copy`` is set
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to PyTorch tensors ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the tensors to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread.
+                Mutually exclusive with ``zero_copy``
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -151,12 +226,28 @@ class DALIGenericIterator(_DaliBaseIterator):
                  dynamic_shape=False,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 zero_copy=False,
+                 reuse_outputs=0,
+                 ragged_outputs=None,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
 
         # check the assert first as _DaliBaseIterator would run the prefetch
         assert len(set(output_map)) == len(output_map), "output_map names should be distinct"
+        if zero_copy and reuse_outputs:
+            raise ValueError("`zero_copy` and `reuse_outputs` are mutually exclusive")
+        if zero_copy and background_prefetch:
+            raise ValueError("`zero_copy` and `background_prefetch` are mutually exclusive")
+        pipes = pipelines if isinstance(pipelines, list) else [pipelines]
+        if zero_copy and not all(p.exec_async and p.exec_pipelined for p in pipes):
+            raise ValueError("`zero_copy` requires the pipelines to use `exec_async` and `exec_pipelined`")
         self._output_categories = set(output_map)
         self.output_map = output_map
+        self._ragged_outputs = set(ragged_outputs or [])
+        assert self._ragged_outputs <= self._output_categories, \
+            "ragged_outputs should be the names from output_map"
 
         _DaliBaseIterator.__init__(self,
                                    pipelines,
@@ -166,7 +257,14 @@ class DALIGenericIterator(_DaliBaseIterator):
                                    fill_last_batch,
                                    last_batch_padded,
                                    last_batch_policy,
-                                   prepare_first_batch=prepare_first_batch)
+                                   prepare_first_batch=prepare_first_batch,
+                                   reuse_outputs=reuse_outputs,
+                                   background_prefetch=background_prefetch,
+                                   pipeline_threads=pipeline_threads,
+                                   completion_order=completion_order)
+
+        self._zero_copy = zero_copy
+        self._deferred_release = zero_copy
 
         self._first_batch = None
         if self._prepare_first_batch:
@@ -181,8 +279,52 @@ class DALIGenericIterator(_DaliBaseIterator):
             self._first_batch = None
             return batch
 
-        # Gather outputs
-        outputs = self._get_outputs()
+        # Gather outputs and copy them to torch tensors
+        data_batches = self._next_batch()
+
+        self._advance_and_check_drop_last()
+
+        if self._reader_name:
+            if_drop, left = self._remove_padded()
+            if np.any(if_drop):
+                output = []
+                for batch, to_copy in zip(data_batches, left):
+                    batch = batch.copy()
+                    for category in self._output_categories:
+                        batch[category] = _head(batch[category], to_copy)
+                    output.append(batch)
+                return output
+
+        else:
+            if self._last_batch_policy == LastBatchPolicy.PARTIAL and (self._counter > self._size) and self._size > 0:
+                # First calculate how much data is required to return exactly self._size entries.
+                diff = self._num_gpus * self.batch_size - (self._counter - self._size)
+                # Figure out how many GPUs to grab from.
+                numGPUs_tograb = int(np.ceil(diff/self.batch_size))
+                # Figure out how many results to grab from the last GPU (as a fractional GPU batch may be required to
+                # bring us right up to self._size).
+                mod_diff = diff % self.batch_size
+                data_fromlastGPU = mod_diff if mod_diff else self.batch_size
+
+                # Grab the relevant data.
+                # 1) Grab everything from the relevant GPUs.
+                # 2) Grab the right data from the last GPU.
+                # 3) Append data together correctly and return.
+                output = data_batches[0:numGPUs_tograb]
+                output[-1] = output[-1].copy()
+                for category in self._output_categories:
+                    output[-1][category] = _head(output[-1][category], data_fromlastGPU)
+                return output
+
+        return data_batches
+
+    def _convert_outputs(self, outputs):
+        outputs_token = None
+        if self._zero_copy:
+            gpu_ids = set(self._pipes[i].device_id for i, outs in enumerate(outputs)
+                          if any(isinstance(out, TensorListGPU) for out in outs))
+            outputs_token = self._hold_outputs(
+                functools.partial(_synchronize_streams, gpu_ids) if gpu_ids else None)
 
         data_batches = [None for i in range(self._num_gpus)]
         for i in range(self._num_gpus):
@@ -193,10 +335,14 @@ class DALIGenericIterator(_DaliBaseIterator):
             for j, out in enumerate(outputs[i]):
                 category_outputs[self.output_map[j]] = out
 
-            # Change DALI TensorLists into Tensors
+            # Change DALI TensorLists into Tensors, the ragged outputs are copied
+            # from the TensorLists directly
             category_tensors = dict()
             category_shapes = dict()
             for category, out in category_outputs.items():
+                if category in self._ragged_outputs:
+                    category_tensors[category] = out
+                    continue
                 category_tensors[category] = out.as_tensor()
                 category_shapes[category] = category_tensors[category].shape()
 
@@ -207,7 +353,7 @@ class DALIGenericIterator(_DaliBaseIterator):
             # check category and device
             for category in self._output_categories:
                 category_torch_type[category] = to_torch_type[category_tensors[category].dtype]
-                if type(category_tensors[category]) is TensorGPU:
+                if isinstance(category_tensors[category], (TensorGPU, TensorListGPU)):
                     if not torch_gpu_device:
                         torch_gpu_device = torch.device('cuda', dev_id)
                     category_device[category] = torch_gpu_device
@@ -215,13 +361,28 @@ class DALIGenericIterator(_DaliBaseIterator):
                     category_device[category] = torch_cpu_device
 
             pyt_tensors = dict()
-            for category in self._output_categories:
-                pyt_tensors[category] = torch.empty(category_shapes[category],
-                                                    dtype=category_torch_type[category],
-                                                    device=category_device[category])
-
             data_batches[i] = pyt_tensors
 
+            for category in self._ragged_outputs:
+                pyt_tensors[category] = self._ragged_batch((i, category),
+                                                           category_tensors.pop(category),
+                                                           category_torch_type[category],
+                                                           category_device[category])
+
+            if self._zero_copy:
+                # Share the memory of DALI Tensors with torch tensors, the tensors keep
+                # the token alive, so the outputs are not released while they are in use
+                for category, tensor in category_tensors.items():
+                    pyt_tensors[category] = torch_dlpack.from_dlpack(
+                        tensor._expose_dlpack_capsule(outputs_token))
+                continue
+
+            for category in category_tensors:
+                pyt_tensors[category] = self._output_buffer((i, category),
+                                                            category_shapes[category],
+                                                            category_torch_type[category],
+                                                            category_device[category])
+
             # Copy data from DALI Tensors to torch tensors
             for category, tensor in category_tensors.items():
                 if isinstance(tensor, (TensorGPU, TensorListGPU)):
@@ -231,44 +392,27 @@ class DALIGenericIterator(_DaliBaseIterator):
                 else:
                     feed_ndarray(tensor, pyt_tensors[category])
 
-        self._schedule_runs()
-
-        self._advance_and_check_drop_last()
-
-        if self._reader_name:
-            if_drop, left = self._remove_padded()
-            if np.any(if_drop):
-                output = []
-                for batch, to_copy in zip(data_batches, left):
-                    batch = batch.copy()
-                    for category in self._output_categories:
-                        batch[category] = batch[category][0:to_copy]
-                    output.append(batch)
-                return output
-
-        else:
-            if self._last_batch_policy == LastBatchPolicy.PARTIAL and (self._counter > self._size) and self._size > 0:
-                # First calculate how much data is required to return exactly self._size entries.
-                diff = self._num_gpus * self.batch_size - (self._counter - self._size)
-                # Figure out how many GPUs to grab from.
-                numGPUs_tograb = int(np.ceil(diff/self.batch_size))
-                # Figure out how many results to grab from the last GPU (as a fractional GPU batch may be required to
-                # bring us right up to self._size).
-                mod_diff = diff % self.batch_size
-                data_fromlastGPU = mod_diff if mod_diff else self.batch_size
-
-                # Grab the relevant data.
-                # 1) Grab everything from the relevant GPUs.
-                # 2) Grab the right data from the last GPU.
-                # 3) Append data together correctly and return.
-                output = data_batches[0:numGPUs_tograb]
-                output[-1] = output[-1].copy()
-                for category in self._output_categories:
-                    output[-1][category] = output[-1][category][0:data_fromlastGPU]
-                return output
-
         return data_batches
 
+    def _ragged_batch(self, key, tensor_list, dtype, device):
+        # the shapes and offsets are computed by the backend, all the samples are copied at once
+        shapes, offsets = tensor_list._shapes_and_offsets()
+        data = self._output_buffer(key, [int(offsets[-1])], dtype, device)
+        if data.numel() > 0:
+            ptr = ctypes.c_void_p(data.data_ptr())
+            if isinstance(tensor_list, TensorListGPU):
+                stream = types._raw_cuda_stream(torch.cuda.current_stream(device=device))
+                tensor_list.copy_to_external(ptr, ctypes.c_void_p(stream))
+            else:
+                tensor_list.copy_to_external(ptr)
+        return RaggedBatch(data, torch.from_numpy(offsets), torch.from_numpy(shapes))
+
+    def _allocate_output_buffer(self, shape, dtype, device):
+        return torch.empty(shape, dtype=dtype, device=device)
+
+    def _view_output_buffer(self, buffer, shape):
+        return buffer[:int(np.prod(shape, dtype=np.int64))].view(shape)
+
 class DALIClassificationIterator(DALIGenericIterator):
     """
     DALI iterator for classification tasks for PyTorch. It returns 2 outputs
@@ -332,6 +476,43 @@ class DALIClassificationIterator(DALIGenericIterator):
     prepare_first_batch : bool, optional, default = True
                 Whether DALI should buffer the first batch right after the creation of the iterator,
                 so one batch is already prepared when the iterator is prompted for the data
+    zero_copy : bool, optional, default = False
+                Whether the outputs should be passed to PyTorch through DLPack, without a copy.
+                The memory of the returned tensors belongs to the pipeline and it is returned
+                to the pipeline only when all the tensors (and their views) sharing it are gone.
+                The number of batches that can be kept alive when the next one is requested is
+                limited to ``prefetch_queue_depth - 1``.
+                For GPU outputs, the current PyTorch stream is synchronized before the memory
+                is returned to the pipeline. The pipelines need to use ``exec_async``
+                and ``exec_pipelined``
+    reuse_outputs : int, optional, default = 0
+                Number of the batches returned by the iterator that can be used at the same time.
+                When positive, the iterator keeps a ring of that many sets of output tensors
+                and copies the outputs to the tensors of the batch returned ``reuse_outputs``
+                iterations earlier, instead of allocating new ones. The tensors are reallocated
+                only when the outputs outgrow them. 0 disables the reuse.
+                Mutually exclusive with ``zero_copy``
+    ragged_outputs : list of str, optional, default = None
+                Names (from ``output_map``) of the outputs whose samples may differ in shape.
+                Instead of a tensor of the whole batch, such outputs are returned as
+                a :class:`RaggedBatch`: a flat tensor with all the samples, filled with
+                a single copy, along with the offsets and the shapes of the samples.
+                The outputs are copied even when ``zero_copy`` is set
+    background_prefetch : int, optional, default = 0
+                Number of the batches copied to PyTorch tensors ahead of time. When positive,
+                a background thread waits for the pipelines' outputs, copies them and passes
+                the tensors to the iterator through a queue of that size, so that the copy
+                does not delay the training loop. 0 disables the background thread.
+                Mutually exclusive with ``zero_copy``
+    pipeline_threads : bool, optional, default = False
+                Whether each pipeline should be driven by its own thread. When set, the outputs
+                of all the pipelines are waited for and the next runs are scheduled concurrently,
+                so a slow pipeline doesn't delay the collection of the outputs from the others
+    completion_order : bool, optional, default = False
+                Whether the per-pipeline batches should be returned in the order in which
+                the pipelines produced them, instead of the order of the pipelines. The indices of
+                the pipelines the batches come from are available in ``pipeline_order``.
+                Requires ``pipeline_threads``
 
     Example
     -------
@@ -358,7 +539,13 @@ class DALIClassificationIterator(DALIGenericIterator):
                  dynamic_shape=False,
                  last_batch_padded=False,
                  last_batch_policy=LastBatchPolicy.FILL,
-                 prepare_first_batch=True):
+                 prepare_first_batch=True,
+                 zero_copy=False,
+                 reuse_outputs=0,
+                 ragged_outputs=None,
+                 background_prefetch=0,
+                 pipeline_threads=False,
+                 completion_order=False):
         super(DALIClassificationIterator, self).__init__(pipelines, ["data", "label"],
                                                          size,
                                                          reader_name=reader_name,
@@ -367,7 +554,13 @@ class DALIClassificationIterator(DALIGenericIterator):
                                                          dynamic_shape=dynamic_shape,
                                                          last_batch_padded=last_batch_padded,
                                                          last_batch_policy=last_batch_policy,
-                                                         prepare_first_batch=prepare_first_batch)
+                                                         prepare_first_batch=prepare_first_batch,
+                                                         zero_copy=zero_copy,
+                                                         reuse_outputs=reuse_outputs,
+                                                         ragged_outputs=ragged_outputs,
+                                                         background_prefetch=background_prefetch,
+                                                         pipeline_threads=pipeline_threads,
+                                                         completion_order=completion_order)
 
 
 class TorchPythonFunction(ops.PythonFunctionBase):
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import numpy as np
 from nose.tools import with_setup
 from nose_utils import raises
@@ -305,6 +306,32 @@ def test_generator_vs_non_parallel():
         yield _test_vs_non_parallel, 50, cb, cb, True, 1
 
 
+def _test_thread_vs_non_parallel(batch_size, cb_parallel, cb_seq, batch, py_num_workers):
+    pipe = dali.Pipeline(batch_size=batch_size, device_id=None, num_threads=5, py_num_workers=py_num_workers,
+                         py_start_method='thread')
+    with pipe:
+        ext_seq = dali.fn.external_source(cb_seq, batch=batch, parallel=False)
+        ext_par = dali.fn.external_source(cb_parallel, batch=batch, parallel=True)
+        pipe.set_outputs(ext_seq, ext_par)
+    pipe.build()
+    # no worker processes are started
+    assert pipe._py_pool.pids() == [os.getpid()]
+    for i in range(10):
+        seq, par = pipe.run()
+        for j in range(batch_size):
+            assert np.array_equal(seq.at(j), par.at(j))
+
+
+def test_thread_vs_non_parallel():
+    for shape in [[], [10], [100, 100, 100]]:
+        for batch_size, cb_parallel, cb_seq, batch, py_num_workers in [
+            (50, ext_cb("cb 1", shape), ext_cb("cb 2", shape), False, 4),
+            (50, Iterable(50, shape), Iterable(50, shape), True, 1)]:
+            yield _test_thread_vs_non_parallel, batch_size, cb_parallel, cb_seq, batch, py_num_workers
+    for cb in [generator_shape_10, generator_shape_100x3]:
+        yield _test_thread_vs_non_parallel, 50, cb, cb, True, 1
+
+
 @with_setup(setup_function, teardown_function)
 def _test_cycle_raise(cb, is_gen_fun, batch_size, epoch_size, reader_queue_size):
     pipe = create_pipe(
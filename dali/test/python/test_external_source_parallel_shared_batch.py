@@ -19,8 +19,9 @@ import socket
 from contextlib import closing, contextmanager
 import numpy as np
 
-from nvidia.dali._multiproc.shared_batch import BufShmChunk, SharedBatchWriter, SharedBatchMeta, deserialize_batch
-from nvidia.dali._multiproc.shared_queue import ShmQueue
+from nvidia.dali._multiproc.shared_batch import BufShmChunk, SharedBatchWriter, SharedBatchMeta, deserialize_batch, \
+    ShmSampleAllocator
+from nvidia.dali._multiproc.shared_queue import ShmQueue, ShmRingsQueue
 from nvidia.dali._multiproc.messages import ShmMessageDesc
 
 from test_utils import RandomlyShapedDataIterator
@@ -56,6 +57,72 @@ def test_serialize_deserialize_random():
                 yield check_serialize_deserialize, batch
 
 
+def test_serialize_deserialize_tuples():
+    for num_fields in [1, 2, 3]:
+        for container in [tuple, list]:
+            for dtype in [np.uint8, np.float32, np.int64]:
+                batch = [container(np.full((i + 1, j + 2), i, dtype=dtype) for j in range(num_fields))
+                         for i in range(5)]
+                yield check_serialize_deserialize_meta_format, batch, SharedBatchMeta.BINARY
+
+
+def test_serialize_deserialize_irregular():
+    batches = [
+        [np.full((2, 3), 1, dtype=np.uint8), (np.full((2, 3), 2, dtype=np.uint8),)],
+        [(np.full(2, 1, dtype=np.float32),), [np.full(2, 2, dtype=np.float32)]],
+        [(np.full(2, 1, dtype=np.int16),), (np.full(2, 2, dtype=np.int16), np.full(1, 3, dtype=np.int16))],
+    ]
+    for batch in batches:
+        yield check_serialize_deserialize_meta_format, batch, SharedBatchMeta.PICKLED
+
+
+def check_serialize_deserialize_meta_format(batch, meta_format):
+    shm_chunk = BufShmChunk.allocate("chunk_0", 100)
+    with closing(shm_chunk) as shm_chunk:
+        writer = SharedBatchWriter(shm_chunk, batch)
+        batch_meta = SharedBatchMeta.from_writer(writer)
+        assert batch_meta.meta_format == meta_format
+        deserialized_batch = deserialize_batch(shm_chunk, batch_meta)
+        assert len(batch) == len(deserialized_batch), "Lengths before and after should be the same"
+        for sample, deserialized_sample in zip(batch, deserialized_batch):
+            if isinstance(sample, (tuple, list)):
+                assert type(sample) == type(deserialized_sample)
+                assert len(sample) == len(deserialized_sample)
+            else:
+                sample, deserialized_sample = (sample,), (deserialized_sample,)
+            for array, deserialized_array in zip(sample, deserialized_sample):
+                assert array.dtype == deserialized_array.dtype
+                np.testing.assert_array_equal(array, deserialized_array)
+
+
+def check_serialize_deserialize_allocated(shapes, dtype, num_allocated):
+    shm_chunk = BufShmChunk.allocate("chunk_0", 100)
+    with closing(shm_chunk) as shm_chunk:
+        allocator = ShmSampleAllocator(shm_chunk)
+        allocator.reserve([shapes[0]], [dtype], num_allocated)
+        batch = []
+        for i in range(num_allocated):
+            [out] = allocator.allocate([shapes[0]], [dtype])
+            out[:] = i
+            batch.append(out)
+        batch.extend(np.full(shape, 42, dtype=dtype) for shape in shapes[1:])
+        writer = SharedBatchWriter(shm_chunk, batch, allocator=allocator)
+        batch_meta = SharedBatchMeta.from_writer(writer)
+        deserialized_batch = deserialize_batch(shm_chunk, batch_meta)
+        assert len(batch) == len(deserialized_batch), "Lengths before and after should be the same"
+        for i, deserialized_sample in enumerate(deserialized_batch):
+            expected = i if i < num_allocated else 42
+            expected_shape = shapes[0] if i < num_allocated else shapes[i - num_allocated + 1]
+            np.testing.assert_array_equal(np.full(expected_shape, expected, dtype=dtype), deserialized_sample)
+
+
+def test_serialize_deserialize_allocated():
+    for shapes in [[(10,)], [(10, 20), (3,), (1, 2)], [(200, 300, 3), (200, 300, 3)]]:
+        for dtype in [np.uint8, np.float32]:
+            for num_allocated in [1, 5]:
+                yield check_serialize_deserialize_allocated, shapes, dtype, num_allocated
+
+
 def worker(start_method, sock, task_queue, res_queue, worker_cb, worker_params):
     if start_method == "spawn":
         task_queue.open_shm(multiprocessing.reduction.recv_handle(sock))
@@ -185,3 +252,68 @@ def test_queue_large_failure():
             start_method, [(max_int32 + 1, 0, max_uint32, max_uint32, max_uint32)]
         yield raises(RuntimeError, error_message)(_test_queue_large), \
             start_method, [(max_int32, max_int32, -1, 0, 0)]
+
+
+def ring_producer(start_method, sock, ring, producer_id, num_msgs):
+    if start_method == "spawn":
+        ring.open_shm(multiprocessing.reduction.recv_handle(sock))
+        ring.set_wakeup_fd(multiprocessing.reduction.recv_handle(sock))
+        sock.close()
+    for i in range(num_msgs):
+        ring.put([ShmMessageDesc(producer_id, i, i, i, i)])
+
+
+def _test_rings_queue(start_method, num_producers, num_msgs):
+    mp = multiprocessing.get_context(start_method)
+    queue = ShmRingsQueue(num_producers, num_msgs)
+    procs = []
+    try:
+        for producer_id, ring in enumerate(queue.rings):
+            if start_method == "spawn":
+                socket_r, socket_w = socket.socketpair()
+            else:
+                socket_r = None
+            proc = mp.Process(target=ring_producer, args=(start_method, socket_r, ring, producer_id, num_msgs))
+            proc.start()
+            procs.append(proc)
+            if start_method == "spawn":
+                pid = os.getppid()
+                multiprocessing.reduction.send_handle(socket_w, ring.shm.handle, pid)
+                multiprocessing.reduction.send_handle(socket_w, queue.wakeup_fd, pid)
+                socket_w.close()
+        received = [[] for _ in range(num_producers)]
+        while sum(len(msgs) for msgs in received) < num_producers * num_msgs:
+            msgs = queue.get()
+            assert msgs is not None and len(msgs) > 0
+            for msg in msgs:
+                received[msg.worker_id].append(msg.shm_chunk_id)
+        for producer_msgs in received:
+            assert producer_msgs == list(range(num_msgs))
+    finally:
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0
+        queue.release()
+
+
+def test_rings_queue():
+    for start_method in ("spawn", "fork"):
+        for num_producers in [1, 3, 8]:
+            for num_msgs in [1, 10, 100]:
+                yield _test_rings_queue, start_method, num_producers, num_msgs
+
+
+def test_rings_queue_closed():
+    queue = ShmRingsQueue(2, 4)
+    queue.rings[1].close()
+    assert queue.get() is None
+    assert queue.rings[0].put([ShmMessageDesc(0, 0, 0, 0, 0)]) is None
+    queue.release()
+
+
+def test_ring_full_assertion():
+    for capacity in [1, 4]:
+        for one_by_one in (True, False):
+            queue = ShmRingsQueue(1, capacity)
+            msgs = [ShmMessageDesc(i, i, i, i, i) for i in range(capacity + 1)]
+            yield raises(RuntimeError, "The queue is full")(_put_msgs), queue.rings[0], msgs, one_by_one
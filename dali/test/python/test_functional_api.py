@@ -21,6 +21,7 @@ import numpy as np
 from nose_utils import assert_raises
 import sys
 import inspect
+import subprocess
 from nose.plugins.attrib import attr
 import nose
 
@@ -217,3 +218,44 @@ def test_schema_name_torch():
 def test_schema_name_numba():
     import nvidia.dali.plugin.numba
     _test_schema_name_for_module('nvidia.dali.plugin.numba.fn.experimental')
+
+
+def test_lazy_op_creation():
+    # run in a fresh interpreter, so that no operator was accessed before
+    code = "\n".join([
+        "import nvidia.dali.fn as fn",
+        "import nvidia.dali.ops as ops",
+        "assert 'rotate' not in vars(fn) and 'Rotate' not in vars(ops)",
+        "assert 'rotate' in dir(fn) and 'Rotate' in dir(ops)",
+        "assert 'Rotate' in fn.rotate.__doc__",
+        "assert 'rotate' in vars(fn) and 'Rotate' in vars(ops)",
+        "assert 'file' not in vars(fn.readers)",
+        "from nvidia.dali.fn.readers import file",
+        "assert file is fn.readers.file and ops.readers.File.__module__ == 'nvidia.dali.ops.readers'",
+    ])
+    subprocess.check_call([sys.executable, "-c", code])
+
+
+def test_lazy_op_creation_threads():
+    # the first access from many threads at once creates the operator once
+    code = "\n".join([
+        "import threading",
+        "import nvidia.dali.fn as fn",
+        "results = []",
+        "threads = [threading.Thread(target=lambda: results.append(fn.rotate))",
+        "           for _ in range(8)]",
+        "for t in threads: t.start()",
+        "for t in threads: t.join()",
+        "assert len(results) == 8 and all(r is fn.rotate for r in results)",
+    ])
+    subprocess.check_call([sys.executable, "-c", code])
+
+
+def test_lazy_op_star_import():
+    code = "\n".join([
+        "from nvidia.dali.fn import *",
+        "from nvidia.dali.ops import *",
+        "assert callable(rotate) and callable(Rotate)",
+        "assert callable(readers.file)",
+    ])
+    subprocess.check_call([sys.executable, "-c", code])
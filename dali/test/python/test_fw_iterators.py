@@ -1,4 +1,4 @@
-# Copyright (c) 2019-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2019-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -1340,6 +1340,15 @@ def test_stop_iteration_pytorch_fail_multi():
     check_stop_iter_fail_multi(fw_iter)
 
 
+def test_stop_iteration_pytorch_background_prefetch():
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    def fw_iter(pipe, size, auto_reset): return PyTorchIterator(
+        pipe, output_map=["data"],  size=size, auto_reset=auto_reset, background_prefetch=2)
+    iter_name = "PyTorchIterator"
+    for batch_size, epochs, iter_num, total_iter_num, auto_reset, infinite in stop_iteration_case_generator():
+        yield check_stop_iter, fw_iter, iter_name, batch_size, epochs, iter_num, total_iter_num, auto_reset, infinite
+
+
 def test_stop_iteration_pytorch_fail_single():
     from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
     def fw_iter(pipe, size, auto_reset): return PyTorchIterator(
@@ -1543,3 +1552,233 @@ def test_gluon_wrong_last_batch_policy_type():
     check_iterator_build_error(ValueError, GluonIterator,
                                glob="Wrong type for `last_batch_policy`.",
                                output_types=[GluonIterator.DENSE_TAG], last_batch_policy='FILL')
+
+@pipeline_def
+def sample_source_pipeline(shape=lambda sample_info: (3, 2), device='cpu', pipe_idx=0):
+    """Returns the samples of the given `shape` (a function of the sample info) filled with
+    `pipe_idx * 1000` plus the index of the sample in the epoch"""
+    def get_data(sample_info):
+        return np.full(shape(sample_info), pipe_idx * 1000 + sample_info.idx_in_epoch,
+                       dtype=np.int32)
+    data = fn.external_source(source=get_data, batch=False)
+    return data.gpu() if device == 'gpu' else data
+
+def check_pytorch_zero_copy(device):
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    batch_size = 4
+    iters = 5
+    pipe = sample_source_pipeline(device=device, batch_size=batch_size, num_threads=1, device_id=0,
+                                  prefetch_queue_depth=3)
+    dali_iter = PyTorchIterator(pipe, ["data"], size=batch_size * iters, zero_copy=True)
+    # keep the previous batch alive as the usual training loop does
+    previous = None
+    for i, data in enumerate(dali_iter):
+        tensor = data[0]["data"]
+        assert tensor.device.type == ('cuda' if device == 'gpu' else 'cpu')
+        for j, sample in enumerate(tensor.cpu().numpy()):
+            assert np.all(sample == i * batch_size + j)
+        if previous is not None:
+            # the buffers of the previous batch were not reused while it was alive
+            for j, sample in enumerate(previous.cpu().numpy()):
+                assert np.all(sample == (i - 1) * batch_size + j)
+        previous = tensor
+    assert i == iters - 1
+
+def test_pytorch_zero_copy():
+    for device in ['cpu', 'gpu']:
+        yield check_pytorch_zero_copy, device
+
+def test_pytorch_zero_copy_too_many_batches_held():
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    batch_size = 4
+    pipe = sample_source_pipeline(batch_size=batch_size, num_threads=1, device_id=0,
+                                  prefetch_queue_depth=2)
+    dali_iter = PyTorchIterator(pipe, ["data"], size=batch_size * 10, zero_copy=True)
+    held = [next(dali_iter), next(dali_iter)]
+    with assert_raises(RuntimeError, glob="output buffers of the pipeline are used by the tensors"):
+        next(dali_iter)
+    # dropping the batches returns their buffers to the pipeline
+    held = None
+    data = next(dali_iter)
+    for j, sample in enumerate(data[0]["data"].numpy()):
+        assert np.all(sample == 2 * batch_size + j)
+
+def test_pytorch_zero_copy_sync_pipeline():
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    pipe = sample_source_pipeline(batch_size=4, num_threads=1, device_id=0, exec_async=False,
+                                  exec_pipelined=False)
+    with assert_raises(ValueError, glob="`zero_copy` requires the pipelines to use `exec_async`*"):
+        PyTorchIterator(pipe, ["data"], size=40, zero_copy=True)
+    # the pipeline is rejected before the iterator builds and runs it
+    assert not pipe._built
+
+def growing_shape(sample_info):
+    return (sample_info.iteration % 3 + 1, 2)
+
+def check_reuse_outputs(Iterator, to_np, data_ptr=None, **kwargs):
+    batch_size = 2
+    iters = 8
+    reuse_outputs = 2
+    pipe = sample_source_pipeline(growing_shape, batch_size=batch_size, num_threads=1, device_id=0)
+    dali_iter = Iterator(pipe, size=batch_size * iters, reuse_outputs=reuse_outputs, **kwargs)
+    ptrs = []
+    for i, data in enumerate(dali_iter):
+        arr = to_np(data[0])
+        assert arr.shape == (batch_size, i % 3 + 1, 2)
+        for j, sample in enumerate(arr):
+            assert np.all(sample == i * batch_size + j)
+        if data_ptr is not None:
+            ptrs.append(data_ptr(data[0]))
+    assert i == iters - 1
+    if data_ptr is not None:
+        # the buffers grew to fit the largest output in the first iterations, since then they are
+        # reused every `reuse_outputs` iterations
+        for i in range(iters - reuse_outputs, iters):
+            assert ptrs[i] == ptrs[i - reuse_outputs]
+        assert ptrs[-1] != ptrs[-2]
+
+def test_pytorch_reuse_outputs():
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    check_reuse_outputs(PyTorchIterator, to_np=lambda x: x["data"].numpy(),
+                        data_ptr=lambda x: x["data"].data_ptr(), output_map=["data"])
+
+def test_paddle_reuse_outputs():
+    from nvidia.dali.plugin.paddle import DALIGenericIterator as PaddleIterator
+    check_reuse_outputs(PaddleIterator, to_np=lambda x: np.array(x["data"]), output_map=["data"])
+
+def test_mxnet_reuse_outputs():
+    from nvidia.dali.plugin.mxnet import DALIGenericIterator as MXNetIterator
+    check_reuse_outputs(MXNetIterator, to_np=lambda x: x.data[0].asnumpy(),
+                        output_map=[("data", MXNetIterator.DATA_TAG)])
+
+def test_gluon_reuse_outputs():
+    from nvidia.dali.plugin.mxnet import DALIGluonIterator as GluonIterator
+    check_reuse_outputs(GluonIterator, to_np=lambda x: x[0].asnumpy(),
+                        output_types=[GluonIterator.DENSE_TAG])
+
+def check_background_prefetch(Iterator, to_np, **kwargs):
+    batch_size = 2
+    iters = 5
+    epochs = 2
+    pipe = sample_source_pipeline(growing_shape, batch_size=batch_size, num_threads=1, device_id=0)
+    dali_iter = Iterator(pipe, size=batch_size * iters, auto_reset=True, background_prefetch=2,
+                         **kwargs)
+    # the source doesn't end the epoch, so the iterations continue across the iterator's epochs
+    global_iter = 0
+    for _ in range(epochs):
+        for i, data in enumerate(dali_iter):
+            arr = to_np(data[0])
+            assert arr.shape == (batch_size, global_iter % 3 + 1, 2)
+            for j, sample in enumerate(arr):
+                assert np.all(sample == global_iter * batch_size + j)
+            global_iter += 1
+        assert i == iters - 1
+    del dali_iter
+
+def check_pytorch_background_prefetch(reuse_outputs):
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    check_background_prefetch(PyTorchIterator, to_np=lambda x: x["data"].numpy(),
+                              output_map=["data"], reuse_outputs=reuse_outputs)
+
+def test_pytorch_background_prefetch():
+    for reuse_outputs in [0, 2]:
+        yield check_pytorch_background_prefetch, reuse_outputs
+
+def test_paddle_background_prefetch():
+    from nvidia.dali.plugin.paddle import DALIGenericIterator as PaddleIterator
+    check_background_prefetch(PaddleIterator, to_np=lambda x: np.array(x["data"]),
+                              output_map=["data"])
+
+def test_mxnet_background_prefetch():
+    from nvidia.dali.plugin.mxnet import DALIGenericIterator as MXNetIterator
+    check_background_prefetch(MXNetIterator, to_np=lambda x: x.data[0].asnumpy(),
+                              output_map=[("data", MXNetIterator.DATA_TAG)])
+
+def test_gluon_background_prefetch():
+    from nvidia.dali.plugin.mxnet import DALIGluonIterator as GluonIterator
+    check_background_prefetch(GluonIterator, to_np=lambda x: x[0].asnumpy(),
+                              output_types=[GluonIterator.DENSE_TAG])
+
+@raises(ValueError, glob="*zero_copy*background_prefetch*")
+def test_pytorch_zero_copy_background_prefetch():
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    pipe = sample_source_pipeline(growing_shape, batch_size=2, num_threads=1, device_id=0)
+    PyTorchIterator(pipe, ["data"], size=4, zero_copy=True, background_prefetch=2)
+
+def check_fan_in(Iterator, to_np, completion_order, **kwargs):
+    batch_size = 2
+    iters = 6
+    num_pipes = 3
+    pipes = [sample_source_pipeline(pipe_idx=pipe_idx, batch_size=batch_size, num_threads=1,
+                                    device_id=0)
+             for pipe_idx in range(num_pipes)]
+    dali_iter = Iterator(pipes, size=num_pipes * batch_size * iters, pipeline_threads=True,
+                         completion_order=completion_order, **kwargs)
+    for i, data in enumerate(dali_iter):
+        order = dali_iter.pipeline_order
+        assert sorted(order) == list(range(num_pipes))
+        if not completion_order:
+            assert order == list(range(num_pipes))
+        assert len(data) == num_pipes
+        for pipe_idx, batch in zip(order, data):
+            arr = to_np(batch)
+            for j, sample in enumerate(arr):
+                assert np.all(sample == pipe_idx * 1000 + i * batch_size + j)
+    assert i == iters - 1
+
+def check_pytorch_fan_in(completion_order):
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    check_fan_in(PyTorchIterator, lambda x: x["data"].numpy(), completion_order,
+                 output_map=["data"])
+
+def check_paddle_fan_in(completion_order):
+    from nvidia.dali.plugin.paddle import DALIGenericIterator as PaddleIterator
+    check_fan_in(PaddleIterator, lambda x: np.array(x["data"]), completion_order,
+                 output_map=["data"])
+
+def check_gluon_fan_in(completion_order):
+    from nvidia.dali.plugin.mxnet import DALIGluonIterator as GluonIterator
+    check_fan_in(GluonIterator, lambda x: x[0].asnumpy(), completion_order,
+                 output_types=[GluonIterator.DENSE_TAG])
+
+def test_fan_in():
+    for check in [check_pytorch_fan_in, check_paddle_fan_in, check_gluon_fan_in]:
+        for completion_order in [False, True]:
+            yield check, completion_order
+
+@raises(ValueError, glob="*completion_order*requires*pipeline_threads*")
+def test_completion_order_without_pipeline_threads():
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator
+    pipe = sample_source_pipeline(batch_size=2, num_threads=1, device_id=0)
+    PyTorchIterator(pipe, ["data"], size=4, completion_order=True)
+
+def ragged_shape(sample_info):
+    return (sample_info.idx_in_batch + 1, 2)
+
+def check_pytorch_ragged_outputs(device, reuse_outputs):
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator as PyTorchIterator, RaggedBatch
+    batch_size = 4
+    iters = 3
+    pipe = sample_source_pipeline(ragged_shape, device, batch_size=batch_size, num_threads=1,
+                                  device_id=0)
+    # the last batch is partial
+    dali_iter = PyTorchIterator(pipe, ["data"], size=batch_size * iters - 1,
+                                last_batch_policy=LastBatchPolicy.PARTIAL,
+                                ragged_outputs=["data"], reuse_outputs=reuse_outputs)
+    for i, data in enumerate(dali_iter):
+        batch = data[0]["data"]
+        assert isinstance(batch, RaggedBatch)
+        assert batch.data.device.type == ('cuda' if device == 'gpu' else 'cpu')
+        num_samples = batch_size if i < iters - 1 else batch_size - 1
+        assert batch.shapes.tolist() == [[j + 1, 2] for j in range(num_samples)]
+        assert batch.offsets.tolist() == [j * (j + 1) for j in range(num_samples + 1)]
+        for j in range(num_samples):
+            sample = batch.sample(j).cpu().numpy()
+            assert sample.shape == (j + 1, 2)
+            assert np.all(sample == i * batch_size + j)
+    assert i == iters - 1
+
+def test_pytorch_ragged_outputs():
+    for device in ['cpu', 'gpu']:
+        for reuse_outputs in [0, 2]:
+            yield check_pytorch_ragged_outputs, device, reuse_outputs
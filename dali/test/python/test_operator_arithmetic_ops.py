@@ -1,4 +1,4 @@
-# Copyright (c) 2019, 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2019, 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -16,6 +16,7 @@ from nvidia.dali.pipeline import Pipeline, DataNode
 import nvidia.dali.ops as ops
 import nvidia.dali.types as types
 import nvidia.dali.math as math
+import nvidia.dali.fn as fn
 from nvidia.dali.tensors import TensorListGPU
 import numpy as np
 from nose.tools import assert_equals
@@ -695,3 +696,31 @@ def test_prohibit_min_max():
                         "for truth evaluation in regular Python context.")
 def test_bool_raises():
     bool(DataNode("dummy"))
+
+
+
+def check_chained_expression(device):
+    rng = np.random.default_rng(42)
+    data = [rng.uniform(-10, 10, size=shape).astype(np.float32) for shape in shape_small]
+    pipe = Pipeline(batch_size=batch_size, num_threads=4, device_id=0)
+    with pipe:
+        x = fn.external_source(source=[data], device=device, cycle=True)
+        y = math.clamp((x - 1.5) / 3 * 2 + 1, -2, x * x)
+        z = math.sqrt(math.abs(y)) - 1.5
+        pipe.set_outputs(x, y, z)
+    pipe.build()
+    # every function node of the expressions is computed by its own operator
+    arithm_ops = [op for op in pipe._ops if op.spec.name == "ArithmeticGenericOp"]
+    assert_equals(len(arithm_ops), 9)
+    x_out, y_out, z_out = pipe.run()
+    for i in range(batch_size):
+        x_np = as_cpu(x_out).at(i)
+        y_np = np.clip((x_np - np.float32(1.5)) / np.float32(3) * 2 + 1, -2, x_np * x_np)
+        np.testing.assert_allclose(as_cpu(y_out).at(i), y_np, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(as_cpu(z_out).at(i), np.sqrt(np.abs(y_np)) - 1.5,
+                                   rtol=1e-5, atol=1e-5)
+
+
+def test_chained_expression():
+    for device in ["cpu", "gpu"]:
+        yield check_chained_expression, device
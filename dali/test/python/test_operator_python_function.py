@@ -1,4 +1,4 @@
-# Copyright (c) 2019-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2019-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -563,3 +563,57 @@ def test_invalid_layouts_arg():
         pipe.set_outputs(out)
     pipe.build()
     pipe.run()
+
+
+def invert(image):
+    return 255 - image
+
+
+def invert_batch(images):
+    return [255 - image for image in images]
+
+
+def invert_and_mean(image):
+    return 255 - image, image.mean(2)
+
+
+def check_parallel(function, batch_processing, num_outputs, py_start_method):
+    pipe = Pipeline(BATCH_SIZE, NUM_WORKERS, DEVICE_ID, SEED, py_num_workers=3,
+                    py_start_method=py_start_method)
+    with pipe:
+        images, _ = fn.readers.file(file_root=images_dir)
+        images = fn.decoders.image(images, device='cpu', output_type=types.RGB)
+        processed = fn.python_function(images, function=function, num_outputs=num_outputs,
+                                       batch_processing=batch_processing, parallel=True)
+        if num_outputs == 1:
+            processed = (processed,)
+        pipe.set_outputs(images, *processed)
+    pipe.build()
+    for _ in range(ITERS):
+        images, *processed = pipe.run()
+        for i in range(BATCH_SIZE):
+            image = images.at(i)
+            assert numpy.array_equal(processed[0].at(i), 255 - image)
+            if num_outputs == 2:
+                assert numpy.allclose(processed[1].at(i), image.mean(2))
+
+
+def test_parallel():
+    for py_start_method in ["thread", "spawn"]:
+        yield check_parallel, invert, False, 1, py_start_method
+        yield check_parallel, invert_batch, True, 1, py_start_method
+        yield check_parallel, invert_and_mean, False, 2, py_start_method
+
+
+@raises(ValueError, "Only CPU PythonFunction*parallel=True")
+def test_parallel_gpu():
+    fn.python_function(function=invert, device='gpu', parallel=True)
+
+
+@raises(RuntimeError, "*cannot be used*py_num_workers*0")
+def test_parallel_no_workers():
+    pipe = Pipeline(BATCH_SIZE, NUM_WORKERS, DEVICE_ID, SEED, py_num_workers=0)
+    with pipe:
+        images, _ = fn.readers.file(file_root=images_dir)
+        pipe.set_outputs(fn.python_function(images, function=invert, parallel=True))
+    pipe.build()
@@ -1,4 +1,4 @@
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -180,3 +180,21 @@ def test_file_reader_alias():
     new_pipe = file_pipe(fn.readers.file, file_list)
     legacy_pipe = file_pipe(fn.file_reader, file_list)
     compare_pipelines(new_pipe, legacy_pipe, batch_size_alias_test, 50)
+
+@pipeline_def(batch_size=3, device_id=0, num_threads=1)
+def file_io_threads_pipe(files, num_io_threads, dont_use_mmap, shard_id):
+    files, labels = fn.readers.file(file_root=g_root, files=files, random_shuffle=True, seed=123,
+                                    num_shards=2, shard_id=shard_id, dont_use_mmap=dont_use_mmap,
+                                    num_io_threads=num_io_threads)
+    return files, labels
+
+def _test_file_reader_io_threads(dont_use_mmap, shard_id):
+    # the order of the samples doesn't depend on the number of the I/O threads
+    pipe = file_io_threads_pipe(g_files, 4, dont_use_mmap, shard_id)
+    ref_pipe = file_io_threads_pipe(g_files, 1, dont_use_mmap, shard_id)
+    compare_pipelines(pipe, ref_pipe, 3, 10)
+
+def test_file_reader_io_threads():
+    for dont_use_mmap in [False, True]:
+        for shard_id in [0, 1]:
+            yield _test_file_reader_io_threads, dont_use_mmap, shard_id
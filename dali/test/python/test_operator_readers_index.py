@@ -1,4 +1,4 @@
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -18,6 +18,8 @@ import nvidia.dali.ops as ops
 import nvidia.dali.fn as fn
 import nvidia.dali.tfrecord as tfrec
 import os.path
+import subprocess
+import sys
 import tempfile
 import numpy as np
 from test_utils import compare_pipelines, get_dali_extra_path
@@ -177,3 +179,283 @@ def test_tfrecord_reader_alias():
         data = np.array(tensor)
         assert len(data) == 0
         assert data.dtype  == np.float32
+
+@pipeline_def(batch_size=16, device_id=0, num_threads=4)
+def index_reader_io_threads_pipe(reader, num_io_threads, max_coalesced_read_size, shard_id):
+    # the concurrent and coalesced reads are used with plain file I/O
+    common_args = dict(random_shuffle=True, initial_fill=32, seed=123, num_shards=2,
+                       shard_id=shard_id, dont_use_mmap=True, num_io_threads=num_io_threads,
+                       max_coalesced_read_size=max_coalesced_read_size)
+    if reader == "tfrecord":
+        inputs = fn.readers.tfrecord(
+            path=os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train'),
+            index_path=os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train.idx'),
+            features={"image/encoded" : tfrec.FixedLenFeature((), tfrec.string, ""),
+                      "image/class/label": tfrec.FixedLenFeature([1], tfrec.int64, -1)},
+            **common_args)
+        return inputs["image/encoded"], inputs["image/class/label"]
+    return fn.readers.mxnet(
+        path=os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.rec'),
+        index_path=os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.idx'),
+        **common_args)
+
+def _test_index_reader_io_threads(reader, num_io_threads, max_coalesced_read_size, shard_id):
+    # the samples don't depend on the number of the I/O threads nor on reading them at once
+    pipe = index_reader_io_threads_pipe(reader, num_io_threads, max_coalesced_read_size, shard_id)
+    ref_pipe = index_reader_io_threads_pipe(reader, 1, 0, shard_id)
+    compare_pipelines(pipe, ref_pipe, 16, 20)
+
+def test_index_reader_io_threads():
+    for reader in ["tfrecord", "mxnet"]:
+        for num_io_threads, max_coalesced_read_size in [(4, 0), (1, 1 << 20), (4, 1 << 20)]:
+            for shard_id in [0, 1]:
+                yield _test_index_reader_io_threads, reader, num_io_threads, \
+                    max_coalesced_read_size, shard_id
+
+idx2bin_script = os.path.join(os.path.dirname(__file__), "../../../tools/idx2bin.py")
+
+@pipeline_def(batch_size=8, device_id=0, num_threads=4)
+def index_reader_pipe(reader, index_path, shard_id, dont_use_mmap):
+    common_args = dict(random_shuffle=True, initial_fill=32, seed=123, num_shards=2,
+                       shard_id=shard_id, dont_use_mmap=dont_use_mmap, name="Reader")
+    if reader == "tfrecord":
+        inputs = fn.readers.tfrecord(
+            path=os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train'),
+            index_path=index_path,
+            features={"image/encoded" : tfrec.FixedLenFeature((), tfrec.string, ""),
+                      "image/class/label": tfrec.FixedLenFeature([1], tfrec.int64, -1)},
+            **common_args)
+        return inputs["image/encoded"], inputs["image/class/label"]
+    return fn.readers.mxnet(
+        path=os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.rec'),
+        index_path=index_path, **common_args)
+
+def _test_binary_index(reader, shard_id, dont_use_mmap):
+    db_dir = os.path.join(get_dali_extra_path(), 'db', reader)
+    index_path = os.path.join(db_dir, 'train.idx')
+    data_args = ["--data", os.path.join(db_dir, 'train.rec')] if reader == "recordio" else []
+    with tempfile.TemporaryDirectory() as idx_files_dir:
+        binary_index_path = os.path.join(idx_files_dir, "train.idx")
+        subprocess.check_call([sys.executable, idx2bin_script, reader, index_path,
+                               binary_index_path] + data_args, stdout=subprocess.DEVNULL)
+        pipe = index_reader_pipe(reader, binary_index_path, shard_id, dont_use_mmap)
+        ref_pipe = index_reader_pipe(reader, index_path, shard_id, dont_use_mmap)
+        pipe.build()
+        ref_pipe.build()
+        assert pipe.epoch_size("Reader") == ref_pipe.epoch_size("Reader")
+        compare_pipelines(pipe, ref_pipe, 8, 20)
+
+def test_binary_index():
+    for reader in ["tfrecord", "recordio"]:
+        for shard_id in [0, 1]:
+            for dont_use_mmap in [False, True]:
+                yield _test_binary_index, reader, shard_id, dont_use_mmap
+
+def test_binary_index_mixed_with_text():
+    # the binary index of one of the files is read the same way as the text one
+    tfrecord = os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train')
+    index_path = os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train.idx')
+    with tempfile.TemporaryDirectory() as idx_files_dir:
+        binary_index_path = os.path.join(idx_files_dir, "train.idx")
+        subprocess.check_call([sys.executable, idx2bin_script, "tfrecord", index_path,
+                               binary_index_path], stdout=subprocess.DEVNULL)
+
+        @pipeline_def(batch_size=8, device_id=0, num_threads=4)
+        def pipe(index_paths):
+            inputs = fn.readers.tfrecord(
+                path=[tfrecord, tfrecord], index_path=index_paths,
+                features={"image/encoded" : tfrec.FixedLenFeature((), tfrec.string, "")})
+            return inputs["image/encoded"]
+
+        compare_pipelines(pipe([index_path, binary_index_path]), pipe([index_path, index_path]),
+                          8, 20)
+
+@pipeline_def(batch_size=1, device_id=0, num_threads=4)
+def index_reader_shuffle_pipe(reader, shard_id, num_shards, shuffle_after_epoch, **kwargs):
+    common_args = dict(shard_id=shard_id, num_shards=num_shards,
+                       shuffle_after_epoch=shuffle_after_epoch, name="Reader", **kwargs)
+    if reader == "tfrecord":
+        inputs = fn.readers.tfrecord(
+            path=os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train'),
+            index_path=os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train.idx'),
+            features={"image/encoded" : tfrec.FixedLenFeature((), tfrec.string, "")},
+            **common_args)
+        return inputs["image/encoded"]
+    data, _ = fn.readers.mxnet(
+        path=os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.rec'),
+        index_path=os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.idx'),
+        **common_args)
+    return data
+
+def _read_epochs(pipe, num_epochs, shard_id, num_shards):
+    pipe.build()
+    size = pipe.epoch_size("Reader")
+    shard_size = size * (shard_id + 1) // num_shards - size * shard_id // num_shards
+    return [[hash(pipe.run()[0].as_array().tobytes()) for _ in range(shard_size)]
+            for _ in range(num_epochs)]
+
+def _check_epochs_shuffled(reader, num_shards, shuffle_after_epoch, **kwargs):
+    num_epochs = 2
+    ref, = _read_epochs(index_reader_shuffle_pipe(reader, 0, 1, False), 1, 0, 1)
+    epochs = [[] for _ in range(num_epochs)]
+    for shard_id in range(num_shards):
+        pipe = index_reader_shuffle_pipe(reader, shard_id, num_shards, shuffle_after_epoch,
+                                         **kwargs)
+        for epoch, samples in zip(epochs, _read_epochs(pipe, num_epochs, shard_id, num_shards)):
+            epoch.extend(samples)
+    # the shards together visit the whole dataset once per epoch, in a different order each time
+    for epoch in epochs:
+        assert sorted(epoch) == sorted(ref)
+        assert epoch != ref
+    assert epochs[0] != epochs[1]
+
+def _test_shuffle_after_epoch(reader, num_shards, dont_use_mmap):
+    _check_epochs_shuffled(reader, num_shards, True, dont_use_mmap=dont_use_mmap)
+
+def test_shuffle_after_epoch():
+    for reader in ["tfrecord", "mxnet"]:
+        for num_shards in [1, 3]:
+            for dont_use_mmap in [False, True]:
+                yield _test_shuffle_after_epoch, reader, num_shards, dont_use_mmap
+
+def _test_shuffle_after_epoch_exclusive_args(reader, arg):
+    pipe = index_reader_shuffle_pipe(reader, 0, 1, True, **{arg: True})
+    assert_raises(RuntimeError, pipe.build,
+                  glob=f"*shuffle_after_epoch and {arg} cannot be both true*")
+
+def test_shuffle_after_epoch_exclusive_args():
+    for reader in ["tfrecord", "mxnet"]:
+        for arg in ["random_shuffle", "stick_to_shard"]:
+            yield _test_shuffle_after_epoch_exclusive_args, reader, arg
+
+def split_recordio(out_dir, num_files):
+    """Splits train.rec into `num_files` files at the record boundaries. The offsets of
+    train.idx refer to the concatenation of the files, so it describes the split files as well"""
+    db_dir = os.path.join(get_dali_extra_path(), 'db', 'recordio')
+    with open(os.path.join(db_dir, 'train.idx'), 'r') as f:
+        offsets = sorted(int(line.split()[1]) for line in f if line.strip())
+    with open(os.path.join(db_dir, 'train.rec'), 'rb') as f:
+        data = f.read()
+    bounds = [0] + [offsets[len(offsets) * i // num_files] for i in range(1, num_files)] + \
+        [len(data)]
+    paths = []
+    for i in range(num_files):
+        paths.append(os.path.join(out_dir, f"train_{i}.rec"))
+        with open(paths[-1], 'wb') as f:
+            f.write(data[bounds[i]:bounds[i + 1]])
+    return paths
+
+@pipeline_def(batch_size=1, device_id=0, num_threads=4)
+def recordio_shuffle_pipe(paths, **kwargs):
+    data, _ = fn.readers.mxnet(
+        path=paths,
+        index_path=os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.idx'),
+        name="Reader", **kwargs)
+    return data
+
+def _check_recordio_files_shuffled(num_files, **kwargs):
+    # the records are shuffled the same way, no matter which of the files they are in
+    num_epochs = 2
+    paths = [os.path.join(get_dali_extra_path(), 'db', 'recordio', 'train.rec')]
+    ref = _read_epochs(recordio_shuffle_pipe(paths, **kwargs), num_epochs, 0, 1)
+    with tempfile.TemporaryDirectory() as out_dir:
+        paths = split_recordio(out_dir, num_files)
+        epochs = _read_epochs(recordio_shuffle_pipe(paths, **kwargs), num_epochs, 0, 1)
+    assert epochs == ref
+
+def _test_shuffle_after_epoch_recordio_files(num_files, dont_use_mmap):
+    _check_recordio_files_shuffled(num_files, shuffle_after_epoch=True,
+                                   dont_use_mmap=dont_use_mmap)
+
+def test_shuffle_after_epoch_recordio_files():
+    for num_files in [2, 3]:
+        for dont_use_mmap in [False, True]:
+            yield _test_shuffle_after_epoch_recordio_files, num_files, dont_use_mmap
+
+@pipeline_def(batch_size=1, device_id=0, num_threads=4)
+def tfrecord_files_shuffle_pipe(num_files, **kwargs):
+    inputs = fn.readers.tfrecord(
+        path=[os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train')] * num_files,
+        index_path=[os.path.join(get_dali_extra_path(), 'db', 'tfrecord', 'train.idx')] * num_files,
+        features={"image/encoded" : tfrec.FixedLenFeature((), tfrec.string, "")},
+        name="Reader", **kwargs)
+    return inputs["image/encoded"]
+
+def _check_tfrecord_files_shuffled(num_files, **kwargs):
+    # the files are the same, so the records at the same offsets follow each other in different
+    # files, the mapped files are read the same way as the plain file I/O, which seeks every time
+    num_epochs = 3
+    ref = _read_epochs(tfrecord_files_shuffle_pipe(num_files, dont_use_mmap=True, **kwargs),
+                       num_epochs, 0, 1)
+    epochs = _read_epochs(tfrecord_files_shuffle_pipe(num_files, dont_use_mmap=False, **kwargs),
+                          num_epochs, 0, 1)
+    assert epochs == ref
+
+def _test_shuffle_after_epoch_tfrecord_files(num_files):
+    _check_tfrecord_files_shuffled(num_files, shuffle_after_epoch=True)
+
+def test_shuffle_after_epoch_tfrecord_files():
+    for num_files in [2, 4]:
+        yield _test_shuffle_after_epoch_tfrecord_files, num_files
+
+def _test_shuffle_chunks(reader, num_shards, shuffle_chunk_size, random_shuffle):
+    _check_epochs_shuffled(reader, num_shards, False, shuffle_chunk_size=shuffle_chunk_size,
+                           random_shuffle=random_shuffle, initial_fill=4 * shuffle_chunk_size)
+
+def test_shuffle_chunks():
+    for reader in ["tfrecord", "mxnet"]:
+        for num_shards in [1, 3]:
+            for shuffle_chunk_size, random_shuffle in [(1, False), (8, False), (8, True)]:
+                yield _test_shuffle_chunks, reader, num_shards, shuffle_chunk_size, random_shuffle
+
+def _test_shuffle_chunks_recordio_files(num_files, shuffle_chunk_size, dont_use_mmap):
+    _check_recordio_files_shuffled(num_files, shuffle_chunk_size=shuffle_chunk_size,
+                                   dont_use_mmap=dont_use_mmap)
+
+def test_shuffle_chunks_recordio_files():
+    # the chunks spanning two files are read from both of them
+    for num_files in [2, 3]:
+        for shuffle_chunk_size in [5, 8]:
+            for dont_use_mmap in [False, True]:
+                yield _test_shuffle_chunks_recordio_files, num_files, shuffle_chunk_size, \
+                    dont_use_mmap
+
+def _test_shuffle_chunks_tfrecord_files(num_files, shuffle_chunk_size):
+    _check_tfrecord_files_shuffled(num_files, shuffle_chunk_size=shuffle_chunk_size)
+
+def test_shuffle_chunks_tfrecord_files():
+    for num_files in [2, 4]:
+        for shuffle_chunk_size in [1, 5]:
+            yield _test_shuffle_chunks_tfrecord_files, num_files, shuffle_chunk_size
+
+def _test_shuffle_chunks_reader_meta(reader):
+    shuffle_chunk_size = 8
+    pipe = index_reader_shuffle_pipe(reader, 0, 1, False, shuffle_chunk_size=shuffle_chunk_size)
+    ref_pipe = index_reader_shuffle_pipe(reader, 0, 1, False)
+    _read_epochs(pipe, 1, 0, 1)
+    _read_epochs(ref_pipe, 1, 0, 1)
+    meta = pipe.reader_meta("Reader")
+    ref_meta = ref_pipe.reader_meta("Reader")
+    assert meta["read_throughput"] > 0 and ref_meta["read_throughput"] > 0
+    # the chunks are read sequentially, but they are far apart in the dataset
+    # only the wrap around to the next epoch is not sequential
+    assert ref_meta["sequential_read_ratio"] > 0.95, ref_meta
+    assert ref_meta["shuffle_displacement"] == 0, ref_meta
+    assert 0.8 < meta["sequential_read_ratio"] < ref_meta["sequential_read_ratio"], meta
+    assert meta["shuffle_displacement"] > 0.1, meta
+
+def test_shuffle_chunks_reader_meta():
+    for reader in ["tfrecord", "mxnet"]:
+        yield _test_shuffle_chunks_reader_meta, reader
+
+def _test_shuffle_chunks_exclusive_args(reader, shuffle_after_epoch, stick_to_shard, error):
+    pipe = index_reader_shuffle_pipe(reader, 0, 1, shuffle_after_epoch, shuffle_chunk_size=8,
+                                     stick_to_shard=stick_to_shard)
+    assert_raises(RuntimeError, pipe.build, glob=f"*{error} cannot be used together*")
+
+def test_shuffle_chunks_exclusive_args():
+    for reader in ["tfrecord", "mxnet"]:
+        yield _test_shuffle_chunks_exclusive_args, reader, True, False, \
+            "shuffle_after_epoch and shuffle_chunk_size"
+        yield _test_shuffle_chunks_exclusive_args, reader, False, True, \
+            "shuffle_chunk_size and stick_to_shard"
@@ -1,4 +1,4 @@
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 from webdataset_base import *
 
 
@@ -277,3 +278,29 @@ def test_index_errors():
         "db/webdataset/sample-tar/empty.tar",
         glob="offset is outside of the archive file",
     )
+
+
+def _check_index_long_names(tar_format):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tar_file_path = os.path.join(temp_dir, "long_names.tar")
+        with tarfile.open(tar_file_path, "w", format=tar_format) as archive:
+            for i in range(4):
+                data = bytes(range(i * 300 % 256)) * (i + 1)
+                member = tarfile.TarInfo(os.path.join("a" * 80, "b" * 80, f"sample_{i}.bin"))
+                member.size = len(data)
+                archive.addfile(member, io.BytesIO(data))
+        with tarfile.open(tar_file_path) as archive:
+            expected = [(member.offset_data, member.size) for member in archive if member.isfile()]
+        index_file = generate_temp_index_file(tar_file_path)
+        with open(index_file.name) as index:
+            lines = index.read().splitlines()
+        assert_equal(lines[0], f"v1.2 {len(expected)}")
+        components = [line.split() for line in lines[1:]]
+        assert_equal([(int(offset), int(size)) for _, offset, size, _ in components], expected)
+        for (_, _, _, name), i in zip(components, range(len(expected))):
+            assert name.endswith(f"sample_{i}.bin"), name
+
+
+def test_index_long_names():
+    for tar_format in (tarfile.GNU_FORMAT, tarfile.PAX_FORMAT):
+        yield _check_index_long_names, tar_format
@@ -327,3 +327,70 @@ def test_index_generation():
             test_batch_size,
             math.ceil(num_samples / num_shards / test_batch_size) * 2,
         )
+
+
+def test_binary_index():
+    global test_batch_size
+    num_samples = 1000
+    tar_file_path = os.path.join(get_dali_extra_path(), "db/webdataset/MNIST/missing.tar")
+    index_file = generate_temp_index_file(tar_file_path)
+    binary_index_file = generate_temp_binary_index_file(tar_file_path)
+
+    for dont_use_mmap in [False, True]:
+        compare_pipelines(
+            webdataset_raw_pipeline(
+                tar_file_path,
+                binary_index_file.name,
+                ["jpg", "txt"],
+                dont_use_mmap=dont_use_mmap,
+                batch_size=test_batch_size,
+                device_id=0,
+                num_threads=1,
+            ),
+            webdataset_raw_pipeline(
+                tar_file_path,
+                index_file.name,
+                ["jpg", "txt"],
+                dont_use_mmap=dont_use_mmap,
+                batch_size=test_batch_size,
+                device_id=0,
+                num_threads=1,
+            ),
+            test_batch_size,
+            math.ceil(num_samples / test_batch_size),
+        )
+
+
+def test_shuffle_chunks():
+    global test_batch_size
+    num_samples = 1000
+    num_epochs = 2
+    tar_file_path = os.path.join(get_dali_extra_path(), "db/webdataset/MNIST/devel-0.tar")
+    index_file = generate_temp_index_file(tar_file_path)
+
+    def read_epochs(pipe):
+        pipe.build()
+        return [
+            [hash(np.array(sample).tobytes()) for _ in range(num_samples // test_batch_size)
+             for sample in pipe.run()[0]]
+            for _ in range(num_epochs)
+        ]
+
+    pipe_args = dict(batch_size=test_batch_size, device_id=0, num_threads=1)
+    ref_pipe = webdataset_raw_pipeline(tar_file_path, index_file.name, ["jpg"], **pipe_args)
+    pipe = webdataset_raw_pipeline(
+        tar_file_path, index_file.name, ["jpg"], shuffle_chunk_size=16, **pipe_args)
+    ref_epochs = read_epochs(ref_pipe)
+    epochs = read_epochs(pipe)
+    # every epoch visits all the samples, in a different order
+    for epoch in epochs:
+        assert_equal(sorted(epoch), sorted(ref_epochs[0]))
+        assert epoch != ref_epochs[0]
+    assert epochs[0] != epochs[1]
+
+    meta, = pipe.reader_meta().values()
+    ref_meta, = ref_pipe.reader_meta().values()
+    assert ref_meta["shuffle_displacement"] == 0
+    assert 0.8 < meta["sequential_read_ratio"] < ref_meta["sequential_read_ratio"]
+    assert meta["shuffle_displacement"] > 0.1
+    assert meta["read_throughput"] > 0
@@ -1,4 +1,4 @@
-# Copyright (c) 2017-2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2017-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -1654,3 +1654,95 @@ def test_invoke_serialize_error_handling_string():
 @raises(TypeError, "*define_graph*callable*")
 def test_invoke_serialize_error_handling_not_string():
     _identity_pipe().serialize(42)
+
+
+def _cse_pipe(enable_cse):
+    @pipeline_def(batch_size=4, num_threads=1, device_id=0, seed=42, enable_cse=enable_cse)
+    def pipe():
+        data = fn.external_source(
+            source=lambda: [np.full((8, 8, 3), i, dtype=np.uint8) for i in range(4)])
+        crop_1 = fn.crop(data, crop=(4, 4))
+        crop_2 = fn.crop(data, crop=(4, 4))
+        flip_1 = fn.flip(crop_1, horizontal=1)
+        flip_2 = fn.flip(crop_2, horizontal=1)
+        other_crop = fn.crop(data, crop=(4, 3))
+        return flip_1 + 1, flip_2 + 1, other_crop
+
+    return pipe()
+
+
+def _op_names(pipe):
+    return [type(op._op).__name__ for op in pipe._ops]
+
+
+def test_cse():
+    pipe = _cse_pipe(True)
+    pipe.build()
+    op_names = _op_names(pipe)
+    assert op_names.count("Crop") == 2, op_names
+    assert op_names.count("Flip") == 1, op_names
+    assert op_names.count("ArithmeticGenericOp") == 1, op_names
+    ref_pipe = _cse_pipe(False)
+    ref_pipe.build()
+    assert _op_names(ref_pipe).count("Flip") == 2
+    compare_pipelines(pipe, ref_pipe, 4, 2)
+
+
+def test_cse_random_not_merged():
+    @pipeline_def(batch_size=4, num_threads=1, device_id=None, enable_cse=True)
+    def pipe():
+        data = fn.external_source(source=lambda: [np.zeros((2,), dtype=np.float32)] * 4)
+        return (fn.random.coin_flip(), fn.random.coin_flip(),
+                fn.noise.gaussian(data), fn.noise.gaussian(data))
+
+    p = pipe()
+    p.build()
+    op_names = _op_names(p)
+    assert op_names.count("CoinFlip") == 2, op_names
+    assert op_names.count("Gaussian") == 2, op_names
+
+
+def test_graph_topological_order():
+    batch_size = 2
+    pipe = Pipeline(batch_size=batch_size, num_threads=1, device_id=None)
+    with pipe:
+        data = fn.external_source(
+            source=lambda: [np.full((4,), i, dtype=np.int32) for i in range(batch_size)])
+        # diamond-shaped layers with each layer consuming all the nodes of the previous one
+        layer = [data, data]
+        for _ in range(20):
+            layer = [fn.cast(layer[0] + layer[1], dtype=types.INT32),
+                     fn.cast(layer[1] - layer[0], dtype=types.INT32)]
+        pipe.set_outputs(*layer)
+    pipe.build()
+    produced = set()
+    for op in pipe._ops:
+        for inp in op.inputs:
+            assert inp.source.id in produced
+        produced.add(op.id)
+    pipe.run()
+
+
+def test_optimization_report():
+    @pipeline_def(batch_size=4, num_threads=1, device_id=None, enable_cse=True)
+    def pipe():
+        data, unused = fn.external_source(
+            source=lambda: ([np.full((2,), i, dtype=np.float32) for i in range(4)],) * 2,
+            num_outputs=2)
+        normalized = (data - 1) / 2
+        # not used by the outputs
+        data * 2
+        return normalized, fn.cast(data, dtype=types.INT32), fn.cast(data, dtype=types.INT32)
+
+    p = pipe()
+    with assert_raises(RuntimeError, glob="Pipeline must be built first."):
+        p.optimization_report()
+    p.build()
+    report = p.optimization_report()
+    assert report["ops"] == [op.name for op in p._ops]
+    assert len(report["ops"]) == 4, report
+    assert len(report["pruned"]) == 1, report
+    assert len(report["merged"]) == 1, report
+    assert len(list(report["merged"].values())[0]) == 1, report
+    assert len(report["unused_outputs"]) == 1, report
+    p.run()
@@ -1,4 +1,4 @@
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from nvidia.dali._multiproc.pool import WorkerPool
-from nvidia.dali._multiproc.messages import TaskArgs, SampleRange
+from nvidia.dali._multiproc.pool import WorkerPool, PythonWorkerPool
+from nvidia.dali._multiproc.messages import TaskArgs, SampleRange, SampleOutDesc
 from contextlib import closing
 from nvidia.dali._utils.external_source_impl import get_callback_from_source
 from nvidia.dali.types import SampleInfo
 from functools import wraps
+import multiprocessing
 import numpy as np
 import os
 from nose.tools import with_setup
@@ -49,17 +50,25 @@ class IteratorCb:
         self.count += 1
         return [np.array([self.pid, self.count]) for i in range(self.count)]
 
+def sample_out_callback(info, out):
+    if out is None:
+        return simple_callback(info)
+    out[:] = simple_callback(info)
+
 class MockGroup:
 
-    def __init__(self, source_desc, batch, prefetch_queue_depth):
+    def __init__(self, source_desc, batch, prefetch_queue_depth, sample_out_desc=None, minibatches_per_worker=1):
         self.source_desc = source_desc
         self.batch = batch
         self.prefetch_queue_depth = prefetch_queue_depth
+        self.sample_out_desc = sample_out_desc
+        self.minibatches_per_worker = minibatches_per_worker
 
     @classmethod
-    def from_callback(cls, callback, batch=False, prefetch_queue_depth=1):
+    def from_callback(cls, callback, batch=False, prefetch_queue_depth=1, sample_out_desc=None,
+                      minibatches_per_worker=1):
         _, source_desc = get_callback_from_source(callback, cycle=None)
-        return cls(source_desc, batch, prefetch_queue_depth)
+        return cls(source_desc, batch, prefetch_queue_depth, sample_out_desc, minibatches_per_worker)
 
 
 def create_pool(groups, keep_alive_queue_size=1, num_workers=1, start_method="fork"):
@@ -163,6 +172,24 @@ def test_pool_no_overwrite_batch(start_method):
                     np.testing.assert_array_equal(answer(pid, *task), sample)
 
 
+@check_pool
+def test_pool_sample_out(start_method):
+    sample_out_descs = [SampleOutDesc(False), SampleOutDesc(False, [(4,)], [np.int64])]
+    for sample_out_desc in sample_out_descs:
+        groups = [MockGroup.from_callback(sample_out_callback, sample_out_desc=sample_out_desc)]
+        with create_pool(groups, keep_alive_queue_size=1, num_workers=1, start_method=start_method) as pool:
+            pids = get_pids(pool)
+            pid = pids[0]
+            for iteration in range(3):
+                tasks = [(SampleInfo(10 * iteration + i, i, iteration, 0),) for i in range(10)]
+                work_batch = TaskArgs.make_sample(SampleRange(10 * iteration, 10 * (iteration + 1), iteration, 0))
+                pool.schedule_batch(context_i=0, work_batch=work_batch)
+                batch = pool.receive_batch(context_i=0)
+                assert len(batch) == len(tasks)
+                for task, sample in zip(tasks, batch):
+                    np.testing.assert_array_equal(answer(pid, *task), sample)
+
+
 # ################################################################################################ #
 # 1 callback, multiple workers tests
 # ################################################################################################ #
@@ -181,6 +208,74 @@ def test_pool_work_split_multiple_tasks(start_method):
         for task, sample in zip(tasks, batch):
             np.testing.assert_array_equal(answer(-1, *task)[1:], sample[1:])
 
+class SkewedCallback:
+    """The first sample of the batch is computed only after the last one, so the worker that
+    gets it is busy with its first minibatch, while the other worker computes the rest"""
+
+    def __init__(self, last_done, last_idx):
+        self.last_done = last_done
+        self.last_idx = last_idx
+
+    def __call__(self, info):
+        if info.idx_in_batch == 0:
+            assert self.last_done.wait(timeout=60), "The last sample of the batch was not computed"
+        elif info.idx_in_batch == self.last_idx:
+            self.last_done.set()
+        return simple_callback(info)
+
+
+@check_pool
+def test_pool_work_split_minibatches(start_method):
+    num_tasks = 16
+    for minibatches_per_worker in [1, 3, 8]:
+        with multiprocessing.Manager() as manager:
+            callback = SkewedCallback(manager.Event(), num_tasks - 1)
+            groups = [MockGroup.from_callback(callback, minibatches_per_worker=minibatches_per_worker)]
+            with create_pool(groups, keep_alive_queue_size=1, num_workers=2, start_method=start_method) as pool:
+                pids = get_pids(pool)
+                assert len(pids) == 2
+                assert pool.contexts[0].shm_manager.num_minibatches == 2 * minibatches_per_worker
+                work_batch = TaskArgs.make_sample(SampleRange(0, num_tasks, 0, 0))
+                tasks = [(SampleInfo(i, i, 0, 0),) for i in range(num_tasks)]
+                pool.schedule_batch(context_i=0, work_batch=work_batch)
+                assert pool.contexts[0].scheduled_minibatches[0] == 2 * minibatches_per_worker
+                batch = pool.receive_batch(context_i=0)
+                assert len(batch) == num_tasks
+                for task, sample in zip(tasks, batch):
+                    np.testing.assert_array_equal(answer(-1, *task)[1:], sample[1:])
+                # the worker that got the first sample computes only its first minibatch,
+                # the other worker takes over the rest of the batch
+                num_minibatches = 2 * minibatches_per_worker
+                first_minibatch_size = num_tasks // num_minibatches + (num_tasks % num_minibatches > 0)
+                slow_worker_pid = batch[0][0]
+                assert sum(sample[0] == slow_worker_pid for sample in batch) == first_minibatch_size
+
+
+def outlier_callback(info):
+    # a single batch much larger than the others
+    size = 4 * 1024 * 1024 if info.iteration == 2 else 1024
+    return np.full(size, info.idx_in_epoch, dtype=np.uint8)
+
+
+@check_pool
+def test_pool_shrink_oversized_chunks(start_method):
+    groups = [MockGroup.from_callback(outlier_callback, prefetch_queue_depth=1)]
+    with create_pool(groups, keep_alive_queue_size=1, num_workers=1, start_method=start_method) as pool:
+        batch_size = 4
+        initial_usage = pool.shm_usage()
+        usage = []
+        for iteration in range(12):
+            work_batch = TaskArgs.make_sample(
+                SampleRange(iteration * batch_size, (iteration + 1) * batch_size, iteration, 0))
+            pool.schedule_batch(context_i=0, work_batch=work_batch)
+            batch = pool.receive_batch(context_i=0)
+            for i, sample in enumerate(batch):
+                assert np.all(sample == iteration * batch_size + i)
+            usage.append(pool.shm_usage())
+        assert max(usage) > initial_usage
+        # once the outlier leaves the window of recent batches, the chunks are shrunk back
+        assert usage[-1] == initial_usage
+
 # ################################################################################################ #
 # multiple callbacks
 # ################################################################################################ #
@@ -296,6 +391,80 @@ def test_multiple_stateful_sources_single_worker():
         yield _test_multiple_stateful_sources_single_worker, num_workers
 
 
+# ################################################################################################ #
+# persistent pool shared by consecutive and simultaneous users
+# ################################################################################################ #
+
+
+@check_pool
+def test_persistent_pool_reattach(start_method):
+    worker_pool = PythonWorkerPool(num_workers=2, start_method=start_method)
+    with closing(worker_pool):
+        pids = worker_pool.pids()
+        work_batch = TaskArgs.make_sample(SampleRange(0, 4, 0, 0))
+        for callback, offset in ((simple_callback, 0), (another_callback, 100), (simple_callback, 0)):
+            groups = [MockGroup.from_callback(callback), MockGroup.from_callback(IteratorCb(), batch=True)]
+            with closing(worker_pool.attach(groups, keep_alive_queue_size=1)) as pool:
+                capture_processes(pool)
+                assert get_pids(pool) == pids
+                pool.schedule_batch(context_i=0, work_batch=work_batch)
+                pool.schedule_batch(context_i=1, work_batch=TaskArgs.make_batch(()))
+                batch = pool.receive_batch(context_i=0)
+                for sample_i, sample in enumerate(batch):
+                    assert sample[0] in pids
+                    assert sample[1] == sample_i + offset
+                iter_batch = pool.receive_batch(context_i=1)
+                assert iter_batch[0][0] in pids and iter_batch[0][1] == 1
+                # the results of pending tasks are discarded when the sources are detached
+                pool.schedule_batch(context_i=0, work_batch=work_batch)
+
+
+@check_pool
+def test_persistent_pool_simultaneous_users(start_method):
+    worker_pool = PythonWorkerPool(num_workers=2, start_method=start_method)
+    with closing(worker_pool):
+        groups_0 = [MockGroup.from_callback(simple_callback)]
+        groups_1 = [MockGroup.from_callback(another_callback)]
+        with closing(worker_pool.attach(groups_0, keep_alive_queue_size=1)) as pool_0, \
+                closing(worker_pool.attach(groups_1, keep_alive_queue_size=1)) as pool_1:
+            capture_processes(pool_0)
+            work_batch = TaskArgs.make_sample(SampleRange(0, 4, 0, 0))
+            pool_0.schedule_batch(context_i=0, work_batch=work_batch)
+            pool_1.schedule_batch(context_i=0, work_batch=work_batch)
+            # results for the other user received in the meantime must not be lost
+            batch_1 = pool_1.receive_batch(context_i=0)
+            batch_0 = pool_0.receive_batch(context_i=0)
+            assert [sample[1] for sample in batch_0] == list(range(4))
+            assert [sample[1] for sample in batch_1] == list(range(100, 104))
+
+
+# ################################################################################################ #
+# callbacks processing inputs passed by the main process (parallel PythonFunction)
+# ################################################################################################ #
+
+
+def inputs_callback(sample_inputs):
+    return [(a + b, np.array([os.getpid()])) for a, b in sample_inputs]
+
+
+@check_pool
+def test_pool_inputs(start_method):
+    groups = [MockGroup.from_callback(inputs_callback)]
+    with create_pool(groups, keep_alive_queue_size=0, num_workers=3, start_method=start_method) as pool:
+        pids = get_pids(pool)
+        for iteration in range(3):
+            # the inputs grow, so that the main process needs to resize the chunks to fit them
+            sample_inputs = [
+                (np.full((i + 1, 100000 * (iteration + 1)), i + iteration, dtype=np.uint8),
+                 np.array([iteration], dtype=np.uint8)) for i in range(10)]
+            pool.schedule_batch(context_i=0, work_batch=TaskArgs.make_inputs(sample_inputs))
+            batch = pool.receive_batch(context_i=0)
+            assert len(batch) == len(sample_inputs)
+            for (a, b), (out, pid) in zip(sample_inputs, batch):
+                np.testing.assert_array_equal(out, a + b)
+                assert pid[0] in pids
+
+
 # ################################################################################################ #
 # invalid return type
 # ################################################################################################ #
@@ -1,4 +1,4 @@
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -27,6 +27,7 @@ import math
 
 test_batch_size = 4
 wds2idx_script = "../../../tools/wds2idx.py"
+idx2bin_script = "../../../tools/idx2bin.py"
 
 
 @pipeline_def()
@@ -44,6 +45,7 @@ def webdataset_raw_pipeline(
     lazy_init=False,
     read_ahead=False,
     stick_to_shard=False,
+    shuffle_chunk_size=0,
 ):
     out = readers.webdataset(
         paths=paths,
@@ -60,6 +62,7 @@ def webdataset_raw_pipeline(
         pad_last_batch=pad_last_batch,
         lazy_init=lazy_init,
         read_ahead=read_ahead,
+        shuffle_chunk_size=shuffle_chunk_size,
     )
     return out if not isinstance(out, list) else tuple(out)
 
@@ -115,6 +118,18 @@ def generate_temp_index_file(tar_file_path):
     return temp_index_file
 
 
+def generate_temp_binary_index_file(tar_file_path):
+    global idx2bin_script
+    text_index_file = generate_temp_index_file(tar_file_path)
+    temp_index_file = tempfile.NamedTemporaryFile()
+    assert_equal (
+        call([idx2bin_script, "webdataset", text_index_file.name, temp_index_file.name],
+             stdout=open(os.devnull, "wb"))
+        , 0
+    )
+    return temp_index_file
+
+
 def generate_temp_extract(tar_file_path):
     temp_extract_dir = tempfile.TemporaryDirectory()
     archive = tarfile.open(tar_file_path)
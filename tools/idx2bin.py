@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Converts the text index files of the TFRecord, RecordIO (MXNet) and webdataset readers
+to the binary format, which the readers map directly into the memory instead of parsing it.
+
+Usage::
+
+    idx2bin.py tfrecord <text index> <binary index>
+    idx2bin.py recordio <text index> <binary index> --data <.rec file> [<.rec file> ...]
+    idx2bin.py webdataset <text index> <binary index>
+
+The RecordIO index describes the records of all the data files, which are needed to compute
+the sizes of the records and to split them between the files. The binary index has the following
+layout (little endian)::
+
+    char   magic[8] = "DALI_IDX"
+    uint32 version = 1
+    uint32 flags
+    uint64 num_records
+    # if flags & PER_FILE_RECORDS (RecordIO)
+    uint64 num_files
+    uint64 file_num_records[num_files]
+    # if flags & SAMPLE_COMPONENTS (webdataset)
+    uint64 num_components
+    uint64 sample_num_components[num_records]
+    # n = num_components if flags & SAMPLE_COMPONENTS, num_records otherwise
+    uint64 offsets[n]
+    uint64 sizes[n]
+    # if flags & SAMPLE_COMPONENTS, NUL terminated extension and file name of every component
+    char   names[]
+"""
+
+import os
+import sys
+import struct
+import argparse
+from array import array
+
+BINARY_INDEX_MAGIC = b"DALI_IDX"
+BINARY_INDEX_VERSION = 1
+PER_FILE_RECORDS = 1
+SAMPLE_COMPONENTS = 2
+
+_WDS_INDEX_VERSIONS = ("v1.1", "v1.2")
+
+
+def _uint64_array(values):
+    values = array("Q", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_binary_index(idx_path, offsets, sizes, file_num_records=None,
+                       sample_num_components=None, names=None):
+    """Writes the binary index file.
+
+    Parameters
+    ----------
+    idx_path : str
+        Path to the index file, that will be created/overwritten.
+    offsets, sizes : list of int
+        Offsets and sizes of the records (or of the components of the samples).
+    file_num_records : list of int
+        Number of the records in each of the data files, if the index describes many of them.
+    sample_num_components : list of int
+        Number of the components of each of the samples (webdataset).
+    names : list of (str, str)
+        Extension and file name of each of the components (webdataset).
+    """
+    flags = 0
+    num_records = len(offsets)
+    if file_num_records is not None:
+        flags |= PER_FILE_RECORDS
+    if sample_num_components is not None:
+        flags |= SAMPLE_COMPONENTS
+        num_records = len(sample_num_components)
+    with open(idx_path, "wb") as fidx:
+        fidx.write(BINARY_INDEX_MAGIC)
+        fidx.write(struct.pack("<IIQ", BINARY_INDEX_VERSION, flags, num_records))
+        if file_num_records is not None:
+            fidx.write(struct.pack("<Q", len(file_num_records)))
+            fidx.write(_uint64_array(file_num_records))
+        if sample_num_components is not None:
+            fidx.write(struct.pack("<Q", len(offsets)))
+            fidx.write(_uint64_array(sample_num_components))
+        fidx.write(_uint64_array(offsets))
+        fidx.write(_uint64_array(sizes))
+        if sample_num_components is not None:
+            fidx.write(b"".join(
+                ext.encode() + b"\0" + filename.encode() + b"\0" for ext, filename in names))
+
+
+def convert_tfrecord_index(text_path, idx_path):
+    """Converts the ``offset size`` lines written by ``tfrecord2idx``, returns the number of
+    records"""
+    offsets = []
+    sizes = []
+    with open(text_path, "r") as fin:
+        for line in fin:
+            if not line.strip():
+                continue
+            offset, size = line.split()[:2]
+            offsets.append(int(offset))
+            sizes.append(int(size))
+    write_binary_index(idx_path, offsets, sizes)
+    return len(offsets)
+
+
+def convert_recordio_index(text_path, idx_path, data_paths):
+    """Converts the ``index offset`` lines of the MXNet RecordIO index, returns the number of
+    records.
+
+    The offsets in the text index refer to the concatenation of the data files, the binary one
+    stores the offsets within the files, the same way the reader computes them."""
+    file_offsets = [0]
+    for path in data_paths:
+        file_offsets.append(file_offsets[-1] + os.path.getsize(path))
+    with open(text_path, "r") as fin:
+        positions = sorted(int(line.split()[1]) for line in fin if line.strip())
+    if not positions:
+        raise ValueError(f"RecordIO index file doesn't contain any indices: {text_path}")
+    offsets = []
+    sizes = []
+    file_num_records = [0] * len(data_paths)
+    file_index = 0
+    for i, position in enumerate(positions):
+        if position >= file_offsets[file_index + 1]:
+            file_index += 1
+        end = positions[i + 1] if i + 1 < len(positions) else file_offsets[-1]
+        # the reader skips 0 sized records
+        if end - position:
+            offsets.append(position - file_offsets[file_index])
+            sizes.append(end - position)
+            file_num_records[file_index] += 1
+    write_binary_index(idx_path, offsets, sizes, file_num_records=file_num_records)
+    return len(offsets)
+
+
+def convert_webdataset_index(text_path, idx_path):
+    """Converts the webdataset index written by ``wds2idx.py``, returns the number of samples"""
+    offsets = []
+    sizes = []
+    names = []
+    sample_num_components = []
+    with open(text_path, "r") as fin:
+        header = fin.readline().split()
+        if len(header) < 2 or header[0] not in _WDS_INDEX_VERSIONS:
+            raise ValueError(f"Unsupported webdataset index file: {text_path}")
+        version, num_samples = header[0], int(header[1])
+        fields = 4 if version == "v1.2" else 3
+        for _ in range(num_samples):
+            line = fin.readline().split()
+            if not line or len(line) % fields:
+                raise ValueError(f"Malformed webdataset index file: {text_path}")
+            for start in range(0, len(line), fields):
+                component = line[start:start + fields]
+                offsets.append(int(component[1]))
+                sizes.append(int(component[2]))
+                names.append((component[0], component[3] if version == "v1.2" else ""))
+            sample_num_components.append(len(line) // fields)
+    write_binary_index(idx_path, offsets, sizes, sample_num_components=sample_num_components,
+                       names=names)
+    return num_samples
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Converts the text index files of the DALI readers to the binary format.")
+    parser.add_argument("reader", choices=("tfrecord", "recordio", "webdataset"),
+                        help="reader using the index file")
+    parser.add_argument("index", help="path to the text index file")
+    parser.add_argument("output", help="path to the binary index file to be created")
+    parser.add_argument("--data", nargs="+", default=None,
+                        help="paths to the RecordIO data files, in the order used by the reader")
+    args = parser.parse_args()
+    if args.reader == "recordio" and not args.data:
+        parser.error("the RecordIO data files need to be provided with --data")
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.reader == "tfrecord":
+        count = convert_tfrecord_index(args.index, args.output)
+    elif args.reader == "recordio":
+        count = convert_recordio_index(args.index, args.output, args.data)
+    else:
+        count = convert_webdataset_index(args.index, args.output)
+    print(f"converted {count} records: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Copyright (c) 2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures the time of importing `nvidia.dali.fn` in a fresh interpreter. The operators are created
+lazily, on the first access, so the `import` stage measures the cost of the plain import, while the
+`all ops` stage additionally creates all the operator classes and fn wrappers (along with their
+docstrings), which is the cost that was paid at the import time when the operators were created
+eagerly.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+_import_code = """
+import time
+start = time.perf_counter()
+import nvidia.dali.fn
+print(time.perf_counter() - start)
+"""
+
+_all_ops_code = """
+import time
+start = time.perf_counter()
+import nvidia.dali.fn
+import nvidia.dali.ops
+
+def create_all(module):
+    for name in dir(module):
+        attr = getattr(module, name)
+        if type(attr).__name__ == 'module' and attr.__name__.startswith(module.__name__ + '.'):
+            create_all(attr)
+        elif hasattr(attr, '__doc__'):
+            attr.__doc__
+
+create_all(nvidia.dali.ops)
+create_all(nvidia.dali.fn)
+print(time.perf_counter() - start)
+"""
+
+parser = argparse.ArgumentParser(description='DALI import time benchmark')
+parser.add_argument('-n', dest='repeat', help='number of the measurements', default=10, type=int)
+args = parser.parse_args()
+
+
+def measure(code):
+    times = []
+    for _ in range(args.repeat):
+        out = subprocess.check_output([sys.executable, "-c", code])
+        times.append(float(out.decode().strip().splitlines()[-1]))
+    return statistics.median(times), min(times)
+
+
+for stage, code in [("import", _import_code), ("all ops", _all_ops_code)]:
+    median, best = measure(code)
+    print(f"{stage:>8}: median {median * 1000:.1f} ms, min {best * 1000:.1f} ms")
@@ -16,14 +16,59 @@
 # under the License.
 
 import os
+import sys
+import glob
 import time
-import ctypes
-from mxnet.base import _LIB
-from mxnet.base import check_call
-import mxnet as mx
+import struct
 import argparse
+from array import array
+from multiprocessing import Pool
 
-class IndexCreator(mx.recordio.MXRecordIO):
+# RecordIO record header: magic number and `lrecord`, the upper 3 bits of which are
+# continuation flag and the lower 29 bits - the length of the record's data
+_RECORDIO_MAGIC = 0xced7230a
+_HEADER_SIZE = 8
+_LENGTH_MASK = (1 << 29) - 1
+_FLAG_SHIFT = 29
+# continuation flags of the records that begin a new logical record (whole and first part)
+_RECORD_BEGIN_FLAGS = (0, 1)
+_READ_BUFFER_SIZE = 1 << 20
+_REPORT_STEP = 100000
+
+
+class InvalidRecordIOError(Exception):
+    pass
+
+
+def _record_offsets(uri, verbose=False):
+    """Walks over the record headers of the RecordIO file, seeking over the data,
+    and returns the offsets of the logical records (that may be split into many parts)."""
+    file_size = os.path.getsize(uri)
+    offsets = array("Q")
+    pre_time = time.time()
+    offset = 0
+    with open(uri, "rb", buffering=_READ_BUFFER_SIZE) as frecord:
+        while offset < file_size:
+            header = frecord.read(_HEADER_SIZE)
+            if len(header) < _HEADER_SIZE:
+                raise InvalidRecordIOError(f"Truncated record header at offset {offset} of {uri}")
+            magic, lrecord = struct.unpack("<II", header)
+            if magic != _RECORDIO_MAGIC:
+                raise InvalidRecordIOError(f"Invalid RecordIO magic number at offset {offset} of {uri}")
+            if (lrecord >> _FLAG_SHIFT) in _RECORD_BEGIN_FLAGS:
+                offsets.append(offset)
+                if verbose and len(offsets) % _REPORT_STEP == 0:
+                    print(f"time: {time.time() - pre_time:.2f} count: {len(offsets)}")
+            # the data is padded to the multiple of 4 bytes
+            padded_length = ((lrecord & _LENGTH_MASK) + 3) & ~3
+            offset += _HEADER_SIZE + padded_length
+            frecord.seek(offset)
+    if offset != file_size:
+        raise InvalidRecordIOError(f"The last record of {uri} exceeds the file size")
+    return offsets
+
+
+class IndexCreator:
     """Reads `RecordIO` data format, and creates index file
     that enables random access.
 
@@ -37,71 +82,136 @@ class IndexCreator(mx.recordio.MXRecordIO):
 
     Parameters
     ----------
-    uri : str
-        Path to the record file.
+    uri : str or list of str
+        Path to the record file. If a list of paths is given, a single index for the
+        concatenation of the files is created, as expected by ``fn.readers.mxnet``
+        when reading multiple files.
     idx_path : str
         Path to the index file, that will be created/overwritten.
     key_type : type
         Data type for keys (optional, default = int).
+    jobs : int
+        Number of processes used to index multiple files (optional, default = number of CPUs).
     """
-    def __init__(self, uri, idx_path, key_type=int):
+    def __init__(self, uri, idx_path, key_type=int, jobs=None, verbose=True):
+        self.uris = [uri] if isinstance(uri, str) else list(uri)
         self.key_type = key_type
+        self.jobs = jobs
+        self.verbose = verbose
         self.fidx = None
         self.idx_path = idx_path
-        super(IndexCreator, self).__init__(uri, 'r')
+        self.is_open = False
+        self.open()
 
     def open(self):
-        super(IndexCreator, self).open()
         self.fidx = open(self.idx_path, 'w')
+        self.is_open = True
 
     def close(self):
-        """Closes the record and index files."""
+        """Closes the index file."""
         if not self.is_open:
             return
-        super(IndexCreator, self).close()
         self.fidx.close()
+        self.is_open = False
 
-    def tell(self):
-        """Returns the current position of read head.
-        """
-        pos = ctypes.c_size_t()
-        check_call(_LIB.MXRecordIOReaderTell(self.handle, ctypes.byref(pos)))
-        return pos.value
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _files_offsets(self):
+        if len(self.uris) == 1:
+            return [_record_offsets(self.uris[0], self.verbose)]
+        with Pool(min(self.jobs or os.cpu_count(), len(self.uris))) as pool:
+            return pool.map(_record_offsets, self.uris)
 
     def create_index(self):
-        """Creates the index file from open record file
+        """Creates the index file from the record file(s), returns the number of records
         """
-        self.reset()
-        counter = 0
         pre_time = time.time()
-        while True:
-            if counter % 1000 == 0:
-                cur_time = time.time()
-                print('time:', cur_time - pre_time, ' count:', counter)
-            pos = self.tell()
-            cont = self.read()
-            if cont is None:
-                break
-            key = self.key_type(counter)
-            self.fidx.write('%s\t%d\n'%(str(key), pos))
-            counter = counter + 1
+        counter = 0
+        file_offset = 0
+        for uri, offsets in zip(self.uris, self._files_offsets()):
+            keys = range(counter, counter + len(offsets))
+            self.fidx.write("".join(
+                f"{self.key_type(key)}\t{file_offset + pos}\n" for key, pos in zip(keys, offsets)))
+            counter += len(offsets)
+            file_offset += os.path.getsize(uri)
+        if self.verbose:
+            print(f"time: {time.time() - pre_time:.2f} count: {counter}")
+        return counter
+
+
+def default_index_path(record, index_dir=None):
+    index = os.path.splitext(record)[0] + ".idx"
+    if index_dir is not None:
+        index = os.path.join(index_dir, os.path.basename(index))
+    return index
+
+
+def _create_index(record_and_index):
+    record, index = record_and_index
+    with IndexCreator(record, index, verbose=False) as creator:
+        creator.create_index()
+    return record
+
+
+def create_indices(records, indices, jobs=None, verbose=True):
+    """Creates a separate index file for each of the record files, in parallel."""
+    pre_time = time.time()
+    with Pool(jobs) as pool:
+        for counter, record in enumerate(
+                pool.imap_unordered(_create_index, zip(records, indices)), start=1):
+            if verbose:
+                print(f"time: {time.time() - pre_time:.2f} count: {counter}/{len(records)} "
+                      f"done: {record}")
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         description='Create an index file from .rec file')
-    parser.add_argument('record', help='path to .rec file.')
-    parser.add_argument('index', help='path to index file.')
+    parser.add_argument(
+        'record',
+        help='path to .rec file, directory with .rec files or a glob pattern (in quotes).')
+    parser.add_argument(
+        'index', nargs='?',
+        help='path to index file. If multiple .rec files are given, a single index of all the '
+             'files (in the sorted order) is created, as expected by the MXNet reader. '
+             'Otherwise, a separate index is created next to each .rec file.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes, defaults to the number of CPUs')
+    parser.add_argument('--index-dir', default=None,
+                        help='directory to place the separate index files in')
     args = parser.parse_args()
-    args.record = os.path.abspath(args.record)
-    args.index = os.path.abspath(args.index)
+    if os.path.isdir(args.record):
+        args.records = sorted(glob.glob(os.path.join(args.record, '*.rec')))
+    elif glob.has_magic(args.record):
+        args.records = sorted(glob.glob(args.record))
+    else:
+        args.records = [args.record]
+    if not args.records:
+        parser.error(f'no files found matching {args.record}')
+    args.records = [os.path.abspath(record) for record in args.records]
+    if args.index is not None:
+        args.index = os.path.abspath(args.index)
     return args
 
+
 def main():
     args = parse_args()
-    creator = IndexCreator(args.record, args.index)
-    creator.create_index()
-    creator.close()
+    try:
+        if args.index is not None:
+            with IndexCreator(args.records, args.index, jobs=args.jobs) as creator:
+                creator.create_index()
+        else:
+            indices = [default_index_path(record, args.index_dir) for record in args.records]
+            create_indices(args.records, indices, args.jobs)
+    except InvalidRecordIOError as e:
+        print(f"Not a valid RecordIO file: {e}")
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     main()
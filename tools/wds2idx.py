@@ -1,5 +1,5 @@
 #!/usr/bin/python3
-# Copyright (c) 2021, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# Copyright (c) 2021-2022, NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -16,10 +16,9 @@
 import os
 import sys
 import time
+import glob
 import argparse
-import subprocess
-from shutil import which
-import tarfile
+from multiprocessing import Pool
 
 
 class IndexCreator:
@@ -79,62 +78,86 @@ class IndexCreator:
         dot_pos = filepath.find(".", filepath.rfind("/") + 1)
         return filepath[:dot_pos], filepath[dot_pos + 1 :]
 
-    def _get_data_tar(self):
-        """Retreives the data about the offset, name and size of each component
-        using the gnu tar utility, while also filtering out non-file entries"""
-
-        tar_blocks_proc = subprocess.Popen(
-            ["tar", "--list", "--block-num", "--file", self.uri],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        tar_types_sizes_proc = subprocess.Popen(
-            ["tar", "--verbose", "--list", "--file", self.uri],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-
-        tar_blocks = tar_blocks_proc.communicate()[0].split(b"\n")  # block <n>: <filepath>
-        tar_types_sizes = tar_types_sizes_proc.communicate()[0].split(
-            b"\n"
-        )  # <type>... <size> <date> <name>
-
-        # Extracting
-        for blocks_line, next_blocks_line, types_sizes_line in zip(tar_blocks, tar_blocks[1:], tar_types_sizes):
-            if not blocks_line or not types_sizes_line:
-                continue
-
-            name = str(blocks_line[blocks_line.find(b":") + 2 :], "ascii")
-            entry_type = types_sizes_line[0:1]
+    @staticmethod
+    def _parse_number(field):
+        """Parses numeric field of the tar header, stored either as an octal string or,
+        for the values that do not fit in the field, in the base-256 (GNU) encoding"""
+        if field[0] & 0x80:
+            value = int.from_bytes(field[1:], "big")
+            return value - (1 << (8 * len(field) - 8)) if field[0] & 0x40 else value
+        field = field.rstrip(b"\0 ").lstrip(b" ")
+        return int(field, 8) if field else 0
 
-            if entry_type != b"-":
-                continue
+    @staticmethod
+    def _parse_string(field):
+        return str(field[: field.find(b"\0")] if b"\0" in field else field, "utf-8")
 
-            offset = int(next_blocks_line[next_blocks_line.find(b"block") + 6 : next_blocks_line.find(b":")]) * 512
-            size = types_sizes_line[: -len(name)]
-            size = size[: size.rfind(b"-") - 8]  # "... <size> 20yy-mm-...."
-            size = int(size[size.rfind(b" ") :])
-            offset -= size
-            offset -= offset % 512
-
-            yield offset, name, size
-
-    def _get_data_tarfile(self):
-        """Retreives the data about the offset, name and size of each component
-        using the tarfile module, while also filtering out non-file entries
-        Intended as a fallback for the gnu tar version (since it is much slower)"""
-
-        print(
-            "Warning: tar utility not found. Falling back to tarfile."
-            + " Processing will most likely take much longer",
-            file=sys.stderr,
-        )
-        farchive = tarfile.open(self.uri)
-        for member in iter(farchive):
-            if member.type != tarfile.REGTYPE:
-                continue
-            offset = farchive.fileobj.tell()
-            yield offset, member.name, member.size
+    @staticmethod
+    def _parse_pax_headers(data):
+        """Parses the records of a pax extended header: "<length> <key>=<value>\\n" """
+        headers = {}
+        pos = 0
+        while pos < len(data) and data[pos] != 0:
+            space = data.index(b" ", pos)
+            length = int(data[pos:space])
+            key, value = data[space + 1 : pos + length - 1].split(b"=", 1)
+            headers[str(key, "utf-8")] = str(value, "utf-8")
+            pos += length
+        return headers
+
+    def _get_data_headers(self):
+        """Retrieves the data about the offset, name and size of each component by walking
+        the tar headers, while also filtering out non-file entries. Payloads are skipped with seeks,
+        so the archive is read only once and only its headers are actually read.
+        Supports ustar, GNU (long names) and pax (extended headers) formats."""
+        block_size = IndexCreator.tar_block_size
+        regular_types = (b"0", b"\0", b"7")
+        with open(self.uri, "rb", buffering=0) as farchive:
+            offset = 0
+            long_name = None
+            pax_headers = {}
+            global_pax_headers = {}
+            while True:
+                header = farchive.read(block_size)
+                if len(header) < block_size or header.count(0) == block_size:
+                    # end of archive marker (or truncated archive)
+                    break
+                entry_type = header[156:157]
+                size = IndexCreator._parse_number(header[124:136])
+                data_offset = offset + block_size
+                data_blocks = (size + block_size - 1) // block_size
+                if entry_type in (b"L", b"K", b"x", b"g"):
+                    # meta entries describing the next entry (or all of them for `g`),
+                    # long link names (`K`) are not needed
+                    data = farchive.read(size)
+                    farchive.seek(data_blocks * block_size - size, os.SEEK_CUR)
+                    if entry_type == b"L":
+                        long_name = str(data.rstrip(b"\0"), "utf-8")
+                    elif entry_type == b"x":
+                        pax_headers = IndexCreator._parse_pax_headers(data)
+                    elif entry_type == b"g":
+                        global_pax_headers.update(IndexCreator._parse_pax_headers(data))
+                    offset = data_offset + data_blocks * block_size
+                    continue
+                extended = dict(global_pax_headers, **pax_headers)
+                if "size" in extended:
+                    size = int(extended["size"])
+                    data_blocks = (size + block_size - 1) // block_size
+                if "path" in extended:
+                    name = extended["path"]
+                elif long_name is not None:
+                    name = long_name
+                else:
+                    name = IndexCreator._parse_string(header[0:100])
+                    if header[257:263] == b"ustar\0" and header[345] != 0:
+                        # POSIX ustar keeps the leading part of long paths in the prefix field
+                        name = IndexCreator._parse_string(header[345:500]) + "/" + name
+                long_name = None
+                pax_headers = {}
+                if entry_type in regular_types and not name.endswith("/"):
+                    yield data_offset, name, size
+                offset = data_offset + data_blocks * block_size
+                farchive.seek(offset)
 
     def create_index(self):
         """Creates the index file from a tar archive"""
@@ -151,9 +174,7 @@ class IndexCreator:
         aggregated_data = []
         last_basename = None
 
-        for offset, name, size in (
-            self._get_data_tar() if which("tar") is not None else self._get_data_tarfile()
-        ):
+        for offset, name, size in self._get_data_headers():
             if counter % report_step == 0 and counter > 0:
                 cur_time = time.time()
                 if self.verbose:
@@ -191,30 +212,89 @@ class IndexCreator:
             print(f"time: {cur_time - pre_time:.2f} count: {counter} stage: done")
 
 
+def default_index_path(archive):
+    return archive[: archive.find(".", archive.rfind("/") + 2)] + ".idx"
+
+
+def _create_index(archive_and_index):
+    archive, index = archive_and_index
+    with IndexCreator(archive, index, verbose=False) as creator:
+        creator.create_index()
+    return archive
+
+
+def create_indices(archives, indices, jobs=None, verbose=True):
+    """Creates index files for many archives (shards) in parallel using a pool of processes.
+
+    Parameters
+    ----------
+    archives : list of str
+        Paths to the archive files.
+    indices : list of str
+        Paths to the index files to be created, one for each archive.
+    jobs : int
+        Number of the processes, defaults to the number of CPUs.
+    """
+    pre_time = time.time()
+    with Pool(jobs) as pool:
+        for counter, archive in enumerate(
+                pool.imap_unordered(_create_index, zip(archives, indices)), start=1):
+            if verbose:
+                print(f"time: {time.time() - pre_time:.2f} count: {counter}/{len(archives)} done: {archive}")
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         description="Creates a webdataset index file for the use with the fn.readers.webdataset from DALI.",
     )
-    parser.add_argument("archive", help="path to .tar file.")
+    parser.add_argument(
+        "archive",
+        help="path to .tar file, directory with .tar files or a glob pattern (in quotes) matching .tar files.")
     parser.add_argument(
         "index",
-        help="path to index file",
+        help="path to index file, valid only if a single archive is processed. By default, "
+             "the index is placed next to the archive with the extension replaced with .idx",
         nargs="?",
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of archives processed in parallel, defaults to the number of CPUs")
+    parser.add_argument(
+        "--index-dir", default=None,
+        help="directory to place the index files in when processing multiple archives")
     args = parser.parse_args()
-    if args.index is None:
-        args.index = args.archive[: args.archive.find(".", args.archive.rfind("/") + 2)] + ".idx"
-    args.archive = os.path.abspath(args.archive)
-    args.index = os.path.abspath(args.index)
+    if os.path.isdir(args.archive):
+        args.archives = sorted(glob.glob(os.path.join(args.archive, "*.tar")))
+    elif glob.has_magic(args.archive):
+        args.archives = sorted(glob.glob(args.archive))
+    else:
+        args.archives = [args.archive]
+    if not args.archives:
+        parser.error(f"no archives found matching {args.archive}")
+    if args.index is not None and len(args.archives) > 1:
+        parser.error("index path can be specified only for a single archive, use --index-dir instead")
+    args.archives = [os.path.abspath(archive) for archive in args.archives]
+    if args.index is not None:
+        args.indices = [args.index]
+    elif args.index_dir is not None:
+        args.indices = [
+            os.path.join(args.index_dir, os.path.basename(default_index_path(archive)))
+            for archive in args.archives]
+    else:
+        args.indices = [default_index_path(archive) for archive in args.archives]
+    args.indices = [os.path.abspath(index) for index in args.indices]
     return args
 
 
 def main():
     args = parse_args()
-    creator = IndexCreator(args.archive, args.index)
-    creator.create_index()
-    creator.close()
+    if len(args.archives) == 1:
+        creator = IndexCreator(args.archives[0], args.indices[0])
+        creator.create_index()
+        creator.close()
+    else:
+        create_indices(args.archives, args.indices, args.jobs)
 
 
 if __name__ == "__main__":